@@ -0,0 +1,46 @@
+import firebase_admin
+from firebase_admin import credentials, firestore
+from ingest import FIRESTORE_BATCH_LIMIT
+
+# --- One-off Migration: alerts.updated_at ---
+# Delta sync on /api/notifications (?since=) range-filters on `updated_at`.
+# Alerts written before that field existed have none, and Firestore range
+# filters skip docs that lack the field, so those alerts never reached a
+# delta-syncing client. This walks the collection once and copies each such
+# alert's `timestamp` into `updated_at` (or stamps the current server time
+# when it has no timestamp either). It is safe to re-run.
+#
+# Usage (from backend/, with admin_key.json):  python backfill_updated_at.py
+
+
+def backfill_updated_at(db, collection='alerts', page_size=FIRESTORE_BATCH_LIMIT):
+    """Set updated_at on every doc missing it. Returns (scanned, updated)."""
+    base = db.collection(collection).order_by('__name__')
+    scanned = updated = 0
+    last = None
+    while True:
+        query = base.start_after(last) if last is not None else base
+        page = list(query.limit(page_size).stream())
+        if not page:
+            break
+        batch = db.batch()
+        pending = 0
+        for doc in page:
+            data = doc.to_dict()
+            if data.get('updated_at') is None:
+                batch.update(doc.reference, {'updated_at': data.get('timestamp') or firestore.SERVER_TIMESTAMP})
+                pending += 1
+        if pending:
+            batch.commit()
+        scanned += len(page)
+        updated += pending
+        last = page[-1]
+        if len(page) < page_size:
+            break
+    return scanned, updated
+
+
+if __name__ == '__main__':
+    firebase_admin.initialize_app(credentials.Certificate("admin_key.json"))
+    scanned, updated = backfill_updated_at(firestore.client())
+    print(f"Backfilled updated_at on {updated} of {scanned} alerts")
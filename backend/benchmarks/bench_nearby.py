@@ -0,0 +1,94 @@
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+# Benchmarks the /api/alerts/nearby strategy against a synthetic alert set.
+# The Firestore `geohash` index is modelled as a sorted list, so each covering
+# cell costs one bisect range scan, the same shape as the range query
+# geo.query_near issues. The baseline is a full scan with haversine.
+#
+# Usage (from backend/):  python benchmarks/bench_nearby.py --alerts 1000000
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo import encode_geohash, covering_cells, haversine_km
+
+
+def build_dataset(n, seed):
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(n):
+        # Half clustered around populated areas, half uniform, like real feeds
+        if i % 2:
+            lat, lng = rng.gauss(37.0, 8.0), rng.gauss(-100.0, 20.0)
+            lat, lng = max(min(lat, 89.9), -89.9), (lng + 180) % 360 - 180
+        else:
+            lat, lng = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        alerts.append((lat, lng, rng.random()))  # last field stands in for the timestamp
+    return alerts
+
+
+def full_scan(alerts, lat, lng, radius_km, limit):
+    hits = [(ts, i) for i, (a_lat, a_lng, ts) in enumerate(alerts) if haversine_km(lat, lng, a_lat, a_lng) <= radius_km]
+    hits.sort(reverse=True)
+    return [i for _, i in hits[:limit]], len(alerts)
+
+
+def cell_query(alerts, index_keys, index_ids, lat, lng, radius_km, limit):
+    hits = []
+    examined = 0
+    for cell in covering_cells(lat, lng, radius_km):
+        lo = bisect.bisect_left(index_keys, cell)
+        hi = bisect.bisect_left(index_keys, cell + '~')
+        examined += hi - lo
+        for i in index_ids[lo:hi]:
+            a_lat, a_lng, ts = alerts[i]
+            if haversine_km(lat, lng, a_lat, a_lng) <= radius_km:
+                hits.append((ts, i))
+    hits.sort(reverse=True)
+    return [i for _, i in hits[:limit]], examined
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--alerts', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--radius-km', type=float, default=25.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    alerts = build_dataset(args.alerts, args.seed)
+    index = sorted((encode_geohash(lat, lng), i) for i, (lat, lng, _) in enumerate(alerts))
+    index_keys = [key for key, _ in index]
+    index_ids = [i for _, i in index]
+    print(f"Built {args.alerts:,} alerts and geohash index in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed + 1)
+    queries = [alerts[rng.randrange(len(alerts))][:2] for _ in range(args.queries)]
+
+    for name, run in [
+        ('full scan', lambda q: full_scan(alerts, q[0], q[1], args.radius_km, 50)),
+        ('geohash cells', lambda q: cell_query(alerts, index_keys, index_ids, q[0], q[1], args.radius_km, 50)),
+    ]:
+        timings, examined, results = [], 0, []
+        for q in queries:
+            t = time.perf_counter()
+            ids, seen = run(q)
+            timings.append((time.perf_counter() - t) * 1000)
+            examined += seen
+            results.append(ids)
+        timings.sort()
+        print(f"{name:>14}: p50 {timings[len(timings) // 2]:9.2f} ms   max {timings[-1]:9.2f} ms   "
+              f"docs examined/query {examined // len(queries):,}")
+        if name == 'full scan':
+            expected = results
+        elif results != expected:
+            print("  WARNING: results differ from the full scan")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+import numpy as np
+
+# Compares playbook retrieval latency: the in-process LocalVectorIndex versus
+# a Pinecone index.query round-trip. The OpenAI query embedding is the same
+# for both backends and is not timed. Uses the real snapshot when present,
+# otherwise random vectors over the real playbook/hazard list. The Pinecone
+# leg only runs when PINECONE_API_KEY is set.
+#
+# Usage (from backend/):  python benchmarks/bench_retrieval.py --queries 200
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from retrieval import LocalVectorIndex, DEFAULT_INDEX_PATH
+from playbooks import load_playbooks
+
+DIMENSION = 1536  # text-embedding-3-small
+
+
+def timed(run, queries):
+    timings = []
+    for hazard, vector in queries:
+        start = time.perf_counter()
+        run(hazard, vector)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if os.path.exists(DEFAULT_INDEX_PATH):
+        local_index = LocalVectorIndex.load(DEFAULT_INDEX_PATH)
+        print(f"Loaded snapshot with {len(local_index)} playbooks")
+    else:
+        playbooks = load_playbooks()
+        local_index = LocalVectorIndex.from_records([
+            {**p, 'values': rng.normal(size=DIMENSION)} for p in playbooks
+        ])
+        print(f"No snapshot found; using random vectors for {len(local_index)} playbooks")
+
+    hazards = sorted(local_index.hazard_rows)
+    queries = [(hazards[i % len(hazards)], rng.normal(size=DIMENSION).tolist()) for i in range(args.queries)]
+
+    def run_local(hazard, vector):
+        return local_index.query(vector=vector, top_k=1, include_metadata=True, filter={"hazard": {"$eq": hazard}})
+
+    p50, p95 = timed(run_local, queries)
+    print(f"   local: p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
+
+    if not os.environ.get('PINECONE_API_KEY'):
+        print("pinecone: skipped (PINECONE_API_KEY not set)")
+        return
+
+    from pinecone import Pinecone
+    pinecone_index = Pinecone(api_key=os.environ['PINECONE_API_KEY']).Index("guardianly-playbooks")
+
+    def run_pinecone(hazard, vector):
+        return pinecone_index.query(vector=vector, top_k=1, include_metadata=True, filter={"hazard": {"$eq": hazard}})
+
+    p50, p95 = timed(run_pinecone, queries[:min(len(queries), 50)])
+    print(f"pinecone: p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
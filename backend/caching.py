@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# --- In-Process TTL Caches ---
+# Small bounded LRU caches for upstream lookups that sit on request paths
+# (Mapbox geocoding and routing). Entries expire after a TTL; failed loads are
+# cached for a shorter negative TTL so an upstream outage does not make every
+# request wait out its timeout again.
+#
+# With stale_ttl > 0 a cache also serves stale-while-revalidate: for
+# stale_ttl seconds after an entry expires it is still returned immediately
+# while one background refresh replaces it.
+
+# Shared by every cache; refreshes are rare and short
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-refresh')
+
+
+class CachedFailureError(Exception):
+    """Raised when a key's last load failed and that failure is still cached."""
+
+
+class TTLCache:
+    def __init__(self, name, max_entries, ttl, negative_ttl=60, stale_ttl=0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (ok, value_or_error, fresh_until, stale_until)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        self.evictions = 0
+        self.loads = 0
+        self.refresh_failures = 0
+        self.load_ms_total = 0.0
+
+    def _store(self, key, ok, value, ttl):
+        fresh_until = time.time() + ttl
+        stale_until = fresh_until + self.stale_ttl if ok else fresh_until
+        self._entries[key] = (ok, value, fresh_until, stale_until)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        Return the cached value for key, calling loader() on a miss. A failed
+        load is re-raised and remembered for negative_ttl seconds, during which
+        lookups raise CachedFailureError without calling the loader.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[3]:
+                self._entries.move_to_end(key)
+                ok, value, fresh_until, _ = entry
+                if not ok:
+                    self.negative_hits += 1
+                    raise CachedFailureError(value)
+                if now < fresh_until:
+                    self.hits += 1
+                    return value
+                # Stale but servable: answer now, refresh once in the background
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    _refresh_executor.submit(self._refresh, key, loader, ttl)
+                return value
+            self.misses += 1
+
+        try:
+            value = self._load(loader)
+        except Exception as e:
+            with self._lock:
+                self._store(key, False, f'{self.name} lookup failed recently: {e}', self.negative_ttl)
+            raise
+
+        with self._lock:
+            self._store(key, True, value, self.ttl if ttl is None else ttl)
+        return value
+
+    def _load(self, loader):
+        start = time.perf_counter()
+        try:
+            return loader()
+        finally:
+            with self._lock:
+                self.loads += 1
+                self.load_ms_total += (time.perf_counter() - start) * 1000
+
+    def _refresh(self, key, loader, ttl):
+        try:
+            value = self._load(loader)
+            with self._lock:
+                self._store(key, True, value, self.ttl if ttl is None else ttl)
+        except Exception as e:
+            # Keep serving the stale value until it ages out completely
+            print(f"Cache refresh failed for {self.name}: {e}")
+            with self._lock:
+                self.refresh_failures += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.stale_hits + self.negative_hits
+            lookups = served + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'negative_hits': self.negative_hits,
+                'misses': self.misses,
+                'hit_rate': round(served / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'refresh_failures': self.refresh_failures,
+                'avg_load_ms': round(self.load_ms_total / self.loads, 2) if self.loads else 0.0,
+            }
@@ -0,0 +1,120 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from firebase_admin import messaging, firestore, exceptions
+from geo import query_near
+from ingest import chunked, FIRESTORE_BATCH_LIMIT
+
+# --- Geo-Targeted Push Dispatch ---
+# Users report their position to /api/users/location, which stores
+# last_lat/last_lng plus a geohash on their users/{uid} document next to the
+# fcm_token the app already saves. Notifying an area resolves the tokens with
+# the same covering-cell geohash queries as /api/alerts/nearby. It then sends
+# them in multicast batches of up to 500 tokens (the FCM limit), a few batches
+# at a time. Tokens that FCM reports as unregistered or malformed are removed
+# from their user docs so later dispatches skip them.
+
+FCM_MULTICAST_LIMIT = 500
+DEFAULT_CONCURRENCY = 4
+
+
+def resolve_targets(db, lat, lng, radius_km, collection='users'):
+    """{fcm_token: uid} for users whose last known position is within radius_km."""
+    targets = {}
+    # Every user in the area is read; cells are paged rather than capped
+    for doc, data, _ in query_near(db.collection(collection), lat, lng, radius_km,
+                                   lat_field='last_lat', lng_field='last_lng'):
+        token = data.get('fcm_token')
+        if token:
+            targets[token] = doc.id
+    return targets
+
+
+def is_invalid_token_error(error):
+    if isinstance(error, (messaging.UnregisteredError, messaging.SenderIdMismatchError)):
+        return True
+    # INVALID_ARGUMENT also covers bad payloads; only prune when it names the token
+    return isinstance(error, exceptions.InvalidArgumentError) and 'registration token' in str(error).lower()
+
+
+def _send_batch(number, tokens, title, body, data):
+    start = time.perf_counter()
+    message = messaging.MulticastMessage(
+        tokens=tokens,
+        notification=messaging.Notification(title=title, body=body),
+        data={key: str(value) for key, value in (data or {}).items()},
+    )
+    try:
+        response = messaging.send_each_for_multicast(message)
+    except Exception as e:
+        return {
+            'batch': number, 'size': len(tokens), 'success': 0, 'failure': len(tokens),
+            'error': str(e), 'invalid_tokens': [], 'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+            'per_second': None,
+        }
+    invalid = [token for token, result in zip(tokens, response.responses)
+               if not result.success and is_invalid_token_error(result.exception)]
+    duration = time.perf_counter() - start
+    return {
+        'batch': number,
+        'size': len(tokens),
+        'success': response.success_count,
+        'failure': response.failure_count,
+        'invalid_tokens': invalid,
+        'duration_ms': round(duration * 1000, 1),
+        'per_second': round(len(tokens) / duration, 1) if duration else None,
+    }
+
+
+def prune_tokens(db, stale, collection='users'):
+    """
+    Remove fcm_token from users whose doc still holds the dead token
+    ({uid: token}); a token refreshed meanwhile is left alone.
+    Returns the number of tokens removed.
+    """
+    removed = 0
+    for chunk in chunked(sorted(stale), FIRESTORE_BATCH_LIMIT):
+        refs = [db.collection(collection).document(uid) for uid in chunk]
+        batch = db.batch()
+        updates = 0
+        for snapshot in db.get_all(refs):
+            if snapshot.exists and snapshot.to_dict().get('fcm_token') == stale[snapshot.id]:
+                batch.update(snapshot.reference, {'fcm_token': firestore.DELETE_FIELD})
+                updates += 1
+        if updates:
+            batch.commit()
+            removed += updates
+    return removed
+
+
+def dispatch(db, targets, title, body, data=None, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Send one notification to every token in targets ({token: uid}).
+    Returns a report with per-batch counts, failures and throughput.
+    """
+    start = time.perf_counter()
+    tokens = list(targets)
+    batches = list(chunked(tokens, FCM_MULTICAST_LIMIT))
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches) or 1)),
+                            thread_name_prefix='fcm') as executor:
+        reports = list(executor.map(lambda args: _send_batch(args[0], args[1], title, body, data), enumerate(batches)))
+
+    invalid = []
+    for report in reports:
+        batch_invalid = report.pop('invalid_tokens')
+        report['invalid'] = len(batch_invalid)
+        invalid.extend(batch_invalid)
+    pruned = 0
+    if invalid:
+        try:
+            pruned = prune_tokens(db, {targets[token]: token for token in invalid})
+        except Exception as e:
+            print(f"Token pruning failed: {e}")
+    elapsed = time.perf_counter() - start
+    return {
+        'targets': len(tokens),
+        'success': sum(r['success'] for r in reports),
+        'failure': sum(r['failure'] for r in reports),
+        'pruned': pruned,
+        'total_ms': round(elapsed * 1000, 1),
+        'batches': reports,
+    }
@@ -0,0 +1,163 @@
+import math
+import time
+from datetime import datetime, timezone
+from firebase_admin import firestore
+from geo import KM_PER_DEGREE, GEOHASH_PRECISION, bbox_cells, cell_size_deg, encode_geohash, haversine_km
+
+# --- Cross-Source Event Resolution ---
+# The same physical event often arrives from several feeds: a USGS quake and
+# the GDACS EQ alert for it, or a FIRMS fire cluster and the EONET wildfire.
+# Before a new alert is written, ingest asks resolve_events() whether an
+# alert of the same hazard from a *different* source already exists within
+# the hazard's distance and time window. If one does, the new record is
+# folded into that canonical alert (its `sources` and `contributing_ids`
+# grow) instead of becoming a second doc and a second push.
+#
+# Lookups go through an `event_key` index, not a collection scan. Each alert
+# stores "<hazard>:<geohash cell>:<time bucket>", where the cell is at least
+# as large as the hazard's radius and the bucket is one window long. The
+# neighbouring cells and buckets of a new record are therefore one `in`
+# query (30 keys each), shared by every record in the ingest chunk. Exact
+# distance and time are then checked on the few candidates returned.
+#
+# Only hazards listed in RESOLUTION_RULES are resolved. Severe-weather
+# warnings are left alone on purpose: a local NWS warning must not disappear
+# into a continent-scale storm event.
+#
+# A folded record is not written to the alerts collection, but ingest stores
+# it under the same ID in REDIRECT_COLLECTION with its `canonical_id` and
+# `version`. Later runs find it there, so an unchanged record is skipped and
+# a revised one updates that doc in place instead of being resolved again.
+# The revision is also copied onto the canonical alert (latest_contribution)
+# and bumps its updated_at, so clients syncing the canonical see it.
+
+RESOLUTION_RULES = {              # hazardType -> (radius_km, window_seconds)
+    'earthquake': (100, 3600),
+    'wildfire': (30, 3 * 86400),
+    'volcanic_eruption': (50, 7 * 86400),
+    'hurricane': (300, 2 * 86400),
+    'flood': (100, 2 * 86400),
+}
+IN_QUERY_LIMIT = 30               # Firestore cap on values in an `in` filter
+REDIRECT_COLLECTION = 'alert_redirects'
+CANDIDATES_PER_QUERY = 200
+
+
+def parse_event_time(value):
+    """Epoch seconds from epoch ms or an ISO-8601 string (naive means UTC), else None."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _precision(radius_km):
+    """Finest geohash precision whose cells are at least radius_km tall."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        if cell_size_deg(precision)[0] * KM_PER_DEGREE >= radius_km:
+            return precision
+    return 1
+
+
+def event_key(hazard, lat, lng, event_time):
+    radius_km, window = RESOLUTION_RULES[hazard]
+    return f"{hazard}:{encode_geohash(lat, lng, _precision(radius_km))}:{int(event_time // window)}"
+
+
+def neighbour_keys(hazard, lat, lng, event_time):
+    """Every event_key an alert within the hazard's radius and window could have."""
+    radius_km, window = RESOLUTION_RULES[hazard]
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = min(radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + d_lat, 89.0))), 0.01)), 180.0)
+    cells = bbox_cells(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng, _precision(radius_km))
+    bucket = int(event_time // window)
+    return [f"{hazard}:{cell}:{b}" for cell in cells for b in (bucket - 1, bucket, bucket + 1)]
+
+
+def index_fields(doc_id, payload, now=None):
+    """Resolution fields stored on every newly written alert."""
+    fields = {'sources': [payload.get('source')], 'contributing_ids': [doc_id]}
+    hazard = payload.get('hazardType')
+    if hazard in RESOLUTION_RULES and payload.get('lat') is not None and payload.get('lng') is not None:
+        when = payload.get('event_time')
+        when = (time.time() if now is None else now) if when is None else when
+        fields['event_time'] = when
+        fields['event_key'] = event_key(hazard, payload['lat'], payload['lng'], when)
+    return fields
+
+
+def resolve_events(alerts_ref, payloads, found=None):
+    """
+    {doc_id: canonical_id} for the new payloads (already carrying
+    index_fields) that match an existing alert from another source.
+    The closest match wins. If `found` is a dict, the stored data of each
+    canonical alert is added to it under its ID.
+    """
+    wanted = {}
+    for doc_id, payload in payloads.items():
+        if payload.get('event_key'):
+            wanted[doc_id] = neighbour_keys(payload['hazardType'], payload['lat'], payload['lng'], payload['event_time'])
+    keys = sorted({key for keys in wanted.values() for key in keys})
+    if not keys:
+        return {}
+
+    candidates = {}   # event_key -> [(doc_id, data)]
+    for start in range(0, len(keys), IN_QUERY_LIMIT):
+        query = (alerts_ref
+                 .where(filter=firestore.FieldFilter('event_key', 'in', keys[start:start + IN_QUERY_LIMIT]))
+                 .limit(CANDIDATES_PER_QUERY))
+        for doc in query.stream():
+            data = doc.to_dict()
+            candidates.setdefault(data.get('event_key'), []).append((doc.id, data))
+
+    resolved = {}
+    for doc_id, keys in wanted.items():
+        payload = payloads[doc_id]
+        radius_km, window = RESOLUTION_RULES[payload['hazardType']]
+        best = None
+        for key in keys:
+            for other_id, data in candidates.get(key, []):
+                if other_id in payloads or payload['source'] in (data.get('sources') or [data.get('source')]):
+                    continue
+                if abs(float(data.get('event_time', 0)) - payload['event_time']) > window:
+                    continue
+                distance = haversine_km(payload['lat'], payload['lng'], data['lat'], data['lng'])
+                if distance <= radius_km and (best is None or distance < best[0]):
+                    best = (distance, other_id, data)
+        if best:
+            resolved[doc_id] = best[1]
+            if found is not None:
+                found[best[1]] = best[2]
+    return resolved
+
+
+def revision_fields(doc_id, payload):
+    """Update for a canonical alert when a record folded into it is revised upstream."""
+    return {
+        'latest_contribution': {'id': doc_id, 'source': payload.get('source'), 'title': payload.get('title'),
+                                'message': payload.get('message'), 'version': payload.get('version')},
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    }
+
+
+def merge_fields(merged, canonical=None):
+    """
+    Update for a canonical alert (stored data `canonical`, if known) absorbing
+    the (doc_id, payload) pairs in merged. Empty when it already lists them
+    all, so the alert's updated_at only moves when its contributors change.
+    """
+    known = set((canonical or {}).get('contributing_ids') or [])
+    if all(doc_id in known for doc_id, _ in merged):
+        return {}
+    return {
+        'sources': firestore.ArrayUnion(sorted({payload.get('source') for _, payload in merged})),
+        'contributing_ids': firestore.ArrayUnion([doc_id for doc_id, _ in merged]),
+        'updated_at': firestore.SERVER_TIMESTAMP,
+    }
@@ -0,0 +1,238 @@
+import io
+import time
+import numpy as np
+from firebase_admin import firestore
+from geo import KM_PER_DEGREE, encode_geohash
+
+# --- FIRMS Fire Clusters ---
+# One active fire shows up as dozens to hundreds of adjacent VIIRS pixels.
+# Writing one alert per pixel bloated the alerts collection, the
+# notifications feed and push fan-out. The FIRMS CSV is therefore read into
+# numpy columns and clustered with a grid-binned DBSCAN pass:
+#
+# * pixels are binned into square cells of side eps_km, so a pixel's
+#   neighbours within eps_km can only be in the 3x3 surrounding cells;
+# * pixels with at least min_pixels neighbours (counting themselves) are core
+#   points. Core points within eps_km are joined with union-find, and border
+#   pixels attach to a neighbouring core. Anything else is noise.
+#
+# Each cluster becomes one 'fire_cluster' alert with centroid, pixel count,
+# peak confidence and bbox. On later runs a cluster whose bbox (padded by
+# eps_km) overlaps an active cluster alert updates that alert in place
+# (ingest_alerts upsert mode) instead of creating a new one. Clusters not seen
+# for STALE_AFTER_SECONDS are marked inactive, also on runs that bring no new
+# acquisitions (see stale_clusters).
+
+DEFAULT_EPS_KM = 1.0      # VIIRS I-band pixels are ~375 m, so this spans gaps of 2 pixels
+DEFAULT_MIN_PIXELS = 1    # 1 keeps isolated detections as single-pixel clusters
+STALE_AFTER_SECONDS = 2 * 86400
+CONFIDENCE_SCORES = {'l': 30.0, 'low': 30.0, 'n': 60.0, 'nominal': 60.0, 'h': 90.0, 'high': 90.0}
+CONFIDENCE_LABELS = [(80.0, 'high'), (50.0, 'nominal'), (0.0, 'low')]
+
+
+def read_hotspots(text):
+    """
+    FIRMS CSV -> dict of column arrays: lat, lng, confidence (0-100), frp,
+    acq_date and acquired (epoch seconds of acq_date + acq_time). VIIRS letter confidences (l/n/h) and MODIS percentages are
+    both mapped onto 0-100.
+    """
+    lines = text.strip().splitlines()
+    header = lines[0].split(',') if lines else []
+    if len(lines) < 2:
+        return {'lat': np.empty(0), 'lng': np.empty(0), 'confidence': np.empty(0),
+                'frp': np.empty(0), 'acq_date': np.empty(0, dtype=str), 'acquired': np.empty(0)}
+    table = np.loadtxt(io.StringIO('\n'.join(lines[1:])), dtype=str, delimiter=',', ndmin=2)
+    column = {name: table[:, i] for i, name in enumerate(header)}
+
+    raw_confidence = np.char.lower(np.char.strip(column.get('confidence', np.full(len(table), 'n'))))
+    numeric = np.char.isdigit(np.char.replace(raw_confidence, '.', '', 1))
+    confidence = np.zeros(len(table))
+    confidence[numeric] = raw_confidence[numeric].astype(float)
+    confidence[~numeric] = [CONFIDENCE_SCORES.get(value, 0.0) for value in raw_confidence[~numeric]]
+
+    acq_date = column.get('acq_date', np.full(len(table), '1970-01-01'))
+    acq_time = np.char.zfill(column.get('acq_time', np.full(len(table), '0000')), 4)
+    acquired = (acq_date.astype('datetime64[D]').astype('datetime64[s]').astype(np.int64)
+                + acq_time.astype(np.int64) // 100 * 3600 + acq_time.astype(np.int64) % 100 * 60)
+
+    frp = column.get('frp')
+    return {
+        'lat': column['latitude'].astype(float),
+        'lng': column['longitude'].astype(float),
+        'confidence': confidence,
+        'frp': frp.astype(float) if frp is not None else np.zeros(len(table)),
+        'acq_date': acq_date,
+        'acquired': acquired.astype(float),
+    }
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_labels(lat, lng, eps_km=DEFAULT_EPS_KM, min_pixels=DEFAULT_MIN_PIXELS):
+    """DBSCAN labels (0..k-1, -1 for noise) using an eps_km grid as the neighbour index."""
+    n = len(lat)
+    labels = np.full(n, -1)
+    if n == 0:
+        return labels
+
+    # Local equirectangular projection in km
+    x = lng * KM_PER_DEGREE * np.cos(np.radians(lat))
+    y = lat * KM_PER_DEGREE
+    cells = np.stack([np.floor(x / eps_km), np.floor(y / eps_km)], axis=1).astype(np.int64)
+    by_cell = {}
+    for index, cell in enumerate(map(tuple, cells)):
+        by_cell.setdefault(cell, []).append(index)
+    by_cell = {cell: np.array(indices) for cell, indices in by_cell.items()}
+
+    neighbours = [None] * n
+    for (cx, cy), members in by_cell.items():
+        nearby = [by_cell[(cx + dx, cy + dy)] for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (cx + dx, cy + dy) in by_cell]
+        nearby = np.concatenate(nearby)
+        dx = x[members][:, None] - x[nearby][None, :]
+        dy = y[members][:, None] - y[nearby][None, :]
+        within = (dx * dx + dy * dy) <= eps_km * eps_km
+        for row, point in enumerate(members):
+            neighbours[point] = nearby[within[row]]
+
+    core = np.array([len(found) >= min_pixels for found in neighbours])
+    parent = list(range(n))
+    for point in np.flatnonzero(core):
+        for other in neighbours[point]:
+            if core[other]:
+                root_a, root_b = _find(parent, point), _find(parent, other)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+
+    roots = {}
+    for point in np.flatnonzero(core):
+        labels[point] = roots.setdefault(_find(parent, point), len(roots))
+    for point in np.flatnonzero(~core):
+        core_neighbours = [other for other in neighbours[point] if core[other]]
+        if core_neighbours:
+            labels[point] = labels[core_neighbours[0]]
+    return labels
+
+
+def confidence_label(score):
+    for threshold, label in CONFIDENCE_LABELS:
+        if score >= threshold:
+            return label
+    return 'low'
+
+
+def summarize_clusters(columns, labels):
+    """One summary dict per cluster label."""
+    clusters = []
+    for label in range(labels.max() + 1 if len(labels) else 0):
+        members = labels == label
+        if not members.any():
+            continue
+        lat, lng = columns['lat'][members], columns['lng'][members]
+        dates = columns['acq_date'][members]
+        clusters.append({
+            'lat': float(lat.mean()),
+            'lng': float(lng.mean()),
+            'pixel_count': int(members.sum()),
+            'peak_confidence': float(columns['confidence'][members].max()),
+            'total_frp': round(float(columns['frp'][members].sum()), 2),
+            'bbox': {'min_lat': float(lat.min()), 'min_lng': float(lng.min()),
+                     'max_lat': float(lat.max()), 'max_lng': float(lng.max())},
+            'acq_date': max(dates.tolist(), default=''),
+            'acquired': float(columns['acquired'][members].max()),
+        })
+    return clusters
+
+
+def _padded(bbox, eps_km):
+    pad_lat = eps_km / KM_PER_DEGREE
+    pad_lng = pad_lat / max(np.cos(np.radians(bbox['max_lat'])), 0.01)
+    return (bbox['min_lat'] - pad_lat, bbox['min_lng'] - pad_lng, bbox['max_lat'] + pad_lat, bbox['max_lng'] + pad_lng)
+
+
+def _overlaps(a, b):
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def load_active_clusters(db, collection='alerts'):
+    """{doc_id: data} for fire-cluster alerts still marked active."""
+    query = (db.collection(collection)
+             .where(filter=firestore.FieldFilter('kind', '==', 'fire_cluster'))
+             .where(filter=firestore.FieldFilter('cluster_status', '==', 'active')))
+    return {doc.id: doc.to_dict() for doc in query.stream()}
+
+
+def stale_clusters(existing, claimed=(), now=None):
+    """(doc_id, payload) deactivations for active clusters not seen for STALE_AFTER_SECONDS."""
+    now = time.time() if now is None else now
+    for doc_id, data in existing.items():
+        if doc_id not in claimed and now - float(data.get('last_seen', now)) > STALE_AFTER_SECONDS:
+            yield doc_id, {'cluster_status': 'inactive'}
+
+
+def cluster_candidates(columns, existing, eps_km=DEFAULT_EPS_KM, min_pixels=DEFAULT_MIN_PIXELS, now=None):
+    """
+    (doc_id, payload) upserts for this run: new cluster alerts, in-place
+    updates of matching active clusters, and deactivation of stale ones.
+    """
+    now = time.time() if now is None else now
+    clusters = summarize_clusters(columns, cluster_labels(columns['lat'], columns['lng'], eps_km, min_pixels))
+    existing_boxes = {doc_id: _padded(data['bbox'], eps_km) for doc_id, data in existing.items() if data.get('bbox')}
+    claimed = set()
+
+    for cluster in sorted(clusters, key=lambda c: -c['pixel_count']):
+        box = _padded(cluster['bbox'], eps_km)
+        match = next((doc_id for doc_id, other in existing_boxes.items()
+                      if doc_id not in claimed and _overlaps(box, other)), None)
+        peak = cluster['peak_confidence']
+        fields = {
+            'lat': cluster['lat'],
+            'lng': cluster['lng'],
+            'geohash': encode_geohash(cluster['lat'], cluster['lng']),
+            'pixel_count': cluster['pixel_count'],
+            'total_frp': cluster['total_frp'],
+            'acq_date': cluster['acq_date'],
+            'version': cluster['acquired'],   # Latest acquisition, drives the FIRMS watermark
+            'last_seen': now,
+            'cluster_status': 'active',
+        }
+        if match is None:
+            doc_id = f"firms_cluster_{cluster['acq_date']}_{fields['geohash'][:8]}".replace('-', '')
+            bbox = cluster['bbox']
+            first_seen = now
+            timestamp = {'timestamp': firestore.SERVER_TIMESTAMP}
+        else:
+            claimed.add(match)
+            doc_id = match
+            previous = existing[match]
+            peak = max(peak, float(previous.get('peak_confidence', 0.0)))
+            old = previous['bbox']
+            # The burned footprint only grows while the fire is active
+            bbox = {'min_lat': min(old['min_lat'], cluster['bbox']['min_lat']),
+                    'min_lng': min(old['min_lng'], cluster['bbox']['min_lng']),
+                    'max_lat': max(old['max_lat'], cluster['bbox']['max_lat']),
+                    'max_lng': max(old['max_lng'], cluster['bbox']['max_lng'])}
+            first_seen = previous.get('first_seen', now)
+            timestamp = {}
+        label = confidence_label(peak)
+        yield doc_id, {
+            'title': "Active Fire Cluster" if fields['pixel_count'] > 1 else "Active Fire Hotspot",
+            'message': (f"Satellites detected {fields['pixel_count']} thermal anomalies "
+                        f"(peak {label} confidence)." if fields['pixel_count'] > 1 else
+                        f"Satellite detected thermal anomaly with {label} confidence."),
+            'hazardType': 'wildfire',
+            'source': 'NASA FIRMS',
+            'kind': 'fire_cluster',
+            **fields,
+            'peak_confidence': peak,
+            'confidence': label,
+            'bbox': bbox,
+            'first_seen': first_seen,
+            **timestamp,
+        }
+
+    yield from stale_clusters(existing, claimed, now)
@@ -0,0 +1,167 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from upstream import upstream
+
+# --- Tiled FIRMS Fetching ---
+# The FIRMS area API used to be called once for a hardcoded US West Coast
+# bbox. Bigger areas in one request could run past the HTTP timeout, so the
+# coverage is now configured and split up:
+#
+# * FIRMS_REGIONS lists named bboxes ("name:west,south,east,north;..."), or
+#   "world" for a global tiling;
+# * every region is cut into tiles of at most FIRMS_TILE_DEGREES on a side;
+# * tiles are fetched FIRMS_CONCURRENCY at a time. A shared sliding-window
+#   budget keeps each run under the MAP_KEY transaction limit (5000 per
+#   10 minutes). Tiles over budget are reported as rate limited, not sent;
+# * each tile's CSV is streamed line by line and merged under one header, so
+#   clustering sees fires that straddle tile edges as one. Rows repeated on
+#   shared tile edges are dropped.
+#
+# The merged text goes through parse_firms like any other payload. The
+# per-tile timings and row counts are attached to it for the sync report.
+
+FIRMS_AREA_URL = "https://firms.modaps.eosdis.nasa.gov/api/area/csv/{key}/{product}/{bbox}/{days}"
+DEFAULT_REGIONS = "us_west:-125,32,-114,49"
+WORLD_BBOX = (-180.0, -90.0, 180.0, 90.0)
+MAX_DAYS = 5                  # FIRMS area API day_range limit
+TRANSACTION_LIMIT = 5000      # Per MAP_KEY...
+TRANSACTION_WINDOW = 600      # ...per 10 minutes
+
+
+class TransactionBudget:
+    """Sliding-window counter of FIRMS transactions shared by all runs."""
+
+    def __init__(self, limit=TRANSACTION_LIMIT, window=TRANSACTION_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._sent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, now=None):
+        """Take one transaction; False when the window is already full."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._sent and now - self._sent[0] >= self.window:
+                self._sent.popleft()
+            if len(self._sent) >= self.limit:
+                return False
+            self._sent.append(now)
+            return True
+
+    def remaining(self, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            return self.limit - sum(1 for sent in self._sent if now - sent < self.window)
+
+
+budget = TransactionBudget(int(os.environ.get('FIRMS_TRANSACTION_LIMIT', TRANSACTION_LIMIT)))
+
+
+class TiledCSV(str):
+    """Merged CSV text that also carries the per-tile fetch report."""
+
+    def __new__(cls, text, tiles):
+        merged = super().__new__(cls, text)
+        merged.tiles = tiles
+        return merged
+
+
+def parse_regions(spec):
+    """'name:w,s,e,n;...' or 'world' -> [(name, (west, south, east, north))]."""
+    regions = []
+    for entry in filter(None, (part.strip() for part in spec.split(';'))):
+        if entry.lower() in ('world', 'global'):
+            regions.append(('world', WORLD_BBOX))
+            continue
+        name, _, coords = entry.rpartition(':')
+        west, south, east, north = (float(value) for value in coords.split(','))
+        if not (-180 <= west < east <= 180 and -90 <= south < north <= 90):
+            raise ValueError(f"Invalid FIRMS region bbox: {entry}")
+        regions.append((name or f"region_{len(regions)}", (west, south, east, north)))
+    return regions
+
+
+def _edges(start, stop, size):
+    edges = [start]
+    while stop - edges[-1] > size:
+        edges.append(edges[-1] + size)
+    return edges + [stop]
+
+
+def tile_regions(regions, tile_degrees):
+    """[(tile_name, (w, s, e, n))] covering every region with tiles <= tile_degrees."""
+    tiles = []
+    for name, (west, south, east, north) in regions:
+        lngs = _edges(west, east, tile_degrees)
+        lats = _edges(south, north, tile_degrees)
+        for row, (s, n) in enumerate(zip(lats, lats[1:])):
+            for column, (w, e) in enumerate(zip(lngs, lngs[1:])):
+                tiles.append((f"{name}_{row}_{column}", (w, s, e, n)))
+    return tiles
+
+
+def _bbox_param(bbox):
+    return ','.join(f"{value:g}" for value in bbox)
+
+
+def fetch_tile(map_key, name, bbox, product, days, timeout):
+    """Stream one tile. Returns (header, rows, report)."""
+    start = time.perf_counter()
+    report = {'tile': name, 'bbox': _bbox_param(bbox), 'status': 'ok', 'rows': 0, 'bytes': 0}
+    if not budget.acquire():
+        report['status'] = 'rate_limited'
+        report['duration_ms'] = 0.0
+        return None, [], report
+
+    url = FIRMS_AREA_URL.format(key=map_key, product=product, bbox=_bbox_param(bbox), days=days)
+    header, rows = None, []
+    try:
+        response = upstream.get(url, source='firms', stream=True, timeout=timeout)
+        try:
+            if response.status_code != 200:
+                report['status'] = 'error'
+                report['error'] = f"HTTP {response.status_code}"
+            else:
+                for line in response.iter_lines(decode_unicode=True):
+                    report['bytes'] += len(line) + 1
+                    if not line:
+                        continue
+                    if header is None:
+                        header = line
+                    else:
+                        rows.append(line)
+                upstream.record_bytes('firms', report['bytes'])
+        finally:
+            response.close()
+    except Exception as e:
+        report['status'] = 'error'
+        report['error'] = str(e)
+    # FIRMS answers some errors (bad key, exceeded limit) with 200 and a plain-text message
+    if header is not None and not header.startswith('latitude'):
+        report['status'] = 'error'
+        report['error'] = header[:200]
+        header, rows = None, []
+    report['rows'] = len(rows)
+    report['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return header, rows, report
+
+
+def fetch_tiles(map_key, tiles, product, days, timeout, concurrency):
+    """
+    Fetch tiles concurrently and merge them into one TiledCSV, or raise
+    RuntimeError when no tile could be fetched.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(tiles))), thread_name_prefix='firms') as executor:
+        results = list(executor.map(lambda tile: fetch_tile(map_key, tile[0], tile[1], product, days, timeout), tiles))
+
+    header = next((header for header, _, _ in results if header), None)
+    reports = [report for _, _, report in results]
+    if header is None and not any(report['status'] == 'ok' for report in reports):
+        errors = sorted({report.get('error', report['status']) for report in reports})
+        raise RuntimeError(f"All {len(tiles)} FIRMS tiles failed: {'; '.join(errors)[:500]}")
+    # A point on a shared edge is returned by both tiles
+    merged = dict.fromkeys(row for tile_header, rows, _ in results if tile_header == header for row in rows)
+    return TiledCSV('\n'.join([header or '', *merged]) + '\n', reports)
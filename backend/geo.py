@@ -0,0 +1,157 @@
+import math
+from firebase_admin import firestore
+
+# --- Geohash Spatial Index ---
+# Alerts carry a `geohash` string at write time. A geohash prefix is a
+# rectangular cell, so "everything in this cell" is a range query ordered on
+# one indexed field, read page by page. A radius query covers the circle's
+# bounding box with the finest cells that keep it to MAX_COVERING_CELLS range
+# queries, and filters the candidates by exact haversine distance.
+
+GEOHASH_PRECISION = 9   # ~5 m cells; any shorter prefix is a coarser cell
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+MAX_COVERING_CELLS = 16  # Range queries per radius lookup
+QUERY_PAGE_SIZE = 500
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def encode_geohash(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # Geohash interleaves longitude bits first
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size_deg(precision):
+    """(height, width) of a geohash cell in degrees."""
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def quantize(lat, lng, precision_m):
+    """
+    Snap a point to the centre of a roughly square cell of side precision_m,
+    so nearby coordinates share one cache key.
+    """
+    step_lat = precision_m / (KM_PER_DEGREE * 1000)
+    cell_lat = round(lat / step_lat) * step_lat
+    step_lng = step_lat / max(math.cos(math.radians(cell_lat)), 0.01)
+    cell_lng = round(lng / step_lng) * step_lng
+    return round(cell_lat, 6), round(_wrap_lng(cell_lng), 6)
+
+
+def _wrap_lng(lng):
+    return (lng + 180.0) % 360.0 - 180.0
+
+
+def _steps(start, stop, step):
+    values = []
+    value = start
+    while value < stop:
+        values.append(value)
+        value += step
+    values.append(stop)
+    return values
+
+
+def bbox_cells(min_lat, min_lng, max_lat, max_lng, precision):
+    """Geohash prefixes of the given precision that cover a lat/lng box."""
+    height, width = cell_size_deg(precision)
+    cells = set()
+    for sample_lat in _steps(max(min_lat, -90.0), min(max_lat, 90.0), height):
+        for sample_lng in _steps(min_lng, max_lng, width):
+            cells.add(encode_geohash(min(sample_lat, 89.999999), _wrap_lng(sample_lng), precision))
+    return sorted(cells)
+
+
+def covering_cells(lat, lng, radius_km):
+    """
+    Geohash prefixes whose cells together cover the circle around (lat, lng),
+    at the finest precision that needs no more than MAX_COVERING_CELLS cells.
+    """
+    cos_lat = max(math.cos(math.radians(min(abs(lat) + radius_km / KM_PER_DEGREE, 89.0))), 0.01)
+    d_lat = radius_km / KM_PER_DEGREE
+    d_lng = min(radius_km / (KM_PER_DEGREE * cos_lat), 180.0)
+    cells = bbox_cells(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng, 1)
+    for precision in range(2, GEOHASH_PRECISION + 1):
+        height, width = cell_size_deg(precision)
+        # Estimate before sampling so tiny cells over a large box are never enumerated
+        if (2 * d_lat / height + 2) * (2 * d_lng / width + 2) > 4 * MAX_COVERING_CELLS:
+            break
+        finer = bbox_cells(lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng, precision)
+        if len(finer) > MAX_COVERING_CELLS:
+            break
+        cells = finer
+    return cells
+
+
+def query_cell(collection_ref, cell, limit=None, page_size=QUERY_PAGE_SIZE, stats=None):
+    """
+    Docs whose `geohash` starts with the cell prefix, read in pages of
+    page_size in geohash order. Stops after `limit` docs (None reads the
+    whole cell); a cell cut short sets stats['truncated'].
+    """
+    base = (collection_ref
+            .where(filter=firestore.FieldFilter('geohash', '>=', cell))
+            .where(filter=firestore.FieldFilter('geohash', '<', cell + '~'))
+            .order_by('geohash'))
+    read = 0
+    last = None
+    while True:
+        size = page_size if limit is None else min(page_size, limit - read)
+        query = base.start_after(last) if last is not None else base
+        page = list(query.limit(size).stream())
+        yield from page
+        read += len(page)
+        if len(page) < size:
+            return
+        last = page[-1]
+        if limit is not None and read >= limit:
+            if stats is not None:
+                stats['truncated'] = True
+            return
+
+
+def query_near(collection_ref, lat, lng, radius_km, per_cell_limit=None, lat_field='lat', lng_field='lng', stats=None):
+    """
+    Yield (doc, data, distance_km) for docs with a `geohash` within radius_km
+    of (lat, lng). Cells are read page by page; results are unordered.
+    """
+    for cell in covering_cells(lat, lng, radius_km):
+        for doc in query_cell(collection_ref, cell, per_cell_limit, stats=stats):
+            data = doc.to_dict()
+            if data.get(lat_field) is None or data.get(lng_field) is None:
+                continue
+            distance = haversine_km(lat, lng, data[lat_field], data[lng_field])
+            if distance <= radius_km:
+                yield doc, data, distance
@@ -0,0 +1,179 @@
+import time
+from firebase_admin import firestore
+from event_resolution import REDIRECT_COLLECTION, index_fields, merge_fields, resolve_events, revision_fields
+from geo import encode_geohash
+
+# --- Shared Firestore Ingestion Stage ---
+# Every /api/sync/* endpoint turns its upstream feed into (doc_id, payload)
+# candidates and hands them to ingest_alerts(). Existence is checked in bulk
+# with db.get_all and new alerts are committed through WriteBatch, instead of
+# one blocking get() + set() round-trip per feature.
+
+FIRESTORE_BATCH_LIMIT = 500   # Hard Firestore limit on writes per batch
+EXISTENCE_CHUNK_SIZE = FIRESTORE_BATCH_LIMIT  # Document refs per db.get_all call
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items without materializing the iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _newer(payload, stored):
+    """True if payload carries a version newer than the stored doc/payload (or it has none)."""
+    version = payload.get('version')
+    if version is None or stored is None:
+        return stored is None
+    return stored.get('version') is None or version > stored['version']
+
+
+def ingest_alerts(db, source, candidates, collection='alerts', seen=None, inserted=None, upsert=False,
+                  resolve=False):
+    """
+    Write new alerts for one source, skipping doc IDs that already exist.
+    With a SeenIdRegistry as `seen`, IDs it already knows are dropped before
+    the Firestore lookup and every ID confirmed present is marked for next time.
+    `candidates` is any iterable of (doc_id, payload) pairs; it is consumed
+    chunk by chunk and each chunk's writes are committed in batches of at
+    most FIRESTORE_BATCH_LIMIT, so writes start before a streamed feed has finished downloading.
+    If `inserted` is a list, the (doc_id, payload) of every newly written
+    alert is appended to it.
+    Payloads with a 'version' (upstream modification time) that is newer
+    than the stored doc's are merged into it in place, counted in 'updated'.
+    With upsert=True, candidates that already exist are merged into their
+    docs instead of skipped (sources whose alerts evolve, e.g. fire clusters);
+    the seen-ID filter is bypassed and updates are counted in 'updated'.
+    With resolve=True, new alerts matching an alert from another source (see
+    event_resolution.py) are folded into it instead of written, counted in
+    'merged' and not reported as inserted. Each folded alert is kept as a
+    redirect doc, which later runs treat like the stored alert: skipped when
+    unchanged, updated in place when a newer version arrives (and the
+    revision copied onto the canonical alert). Upsert sources
+    are indexed but never folded, since their alerts are tracked across runs.
+    Returns per-source counts and timings.
+    """
+    start = time.perf_counter()
+    stats = {
+        'source': source,
+        'candidates': 0,
+        'skipped_seen': 0,
+        'existing': 0,
+        'written': 0,
+        'updated': 0,
+        'merged': 0,
+        'batches': 0,
+        'lookup_ms': 0.0,
+        'resolve_ms': 0.0,
+        'write_ms': 0.0,
+    }
+    alerts_ref = db.collection(collection)
+    redirects_ref = db.collection(REDIRECT_COLLECTION)
+    queued = set()
+
+    for chunk in chunked(candidates, EXISTENCE_CHUNK_SIZE):
+        payloads = {}
+        for doc_id, payload in chunk:
+            stats['candidates'] += 1
+            # Feeds occasionally repeat an item within one pull; keep its newest version
+            if doc_id in queued and (doc_id not in payloads or not _newer(payload, payloads[doc_id])):
+                continue
+            queued.add(doc_id)
+            if 'geohash' not in payload and payload.get('lat') is not None and payload.get('lng') is not None:
+                payload['geohash'] = encode_geohash(payload['lat'], payload['lng'])
+            # Drives delta sync on /api/notifications
+            payload.setdefault('updated_at', firestore.SERVER_TIMESTAMP)
+            payloads[doc_id] = payload
+        versions = {doc_id: payload['version'] for doc_id, payload in payloads.items() if payload.get('version') is not None}
+        if seen is not None and payloads and not upsert:
+            unseen = seen.filter_unseen(source, list(payloads), versions)
+            stats['skipped_seen'] += len(payloads) - len(unseen)
+            payloads = {doc_id: payloads[doc_id] for doc_id in unseen}
+        if not payloads:
+            continue
+
+        refs = {doc_id: alerts_ref.document(doc_id) for doc_id in payloads}
+        lookup_start = time.perf_counter()
+        snapshots = {snap.id: snap for snap in db.get_all(list(refs.values())) if snap.exists}
+        redirected = {}   # doc_id -> canonical_id
+        if resolve and not upsert and len(snapshots) < len(refs):
+            # IDs folded into another source's alert on an earlier run
+            for snap in db.get_all([redirects_ref.document(doc_id) for doc_id in refs if doc_id not in snapshots]):
+                if snap.exists:
+                    refs[snap.id] = redirects_ref.document(snap.id)
+                    snapshots[snap.id] = snap
+                    redirected[snap.id] = snap.to_dict()['canonical_id']
+        stats['lookup_ms'] += _elapsed_ms(lookup_start)
+        stats['existing'] += len(snapshots)
+
+        new_ids = [doc_id for doc_id in payloads if doc_id not in snapshots]
+        if upsert:
+            updated_ids = [doc_id for doc_id in payloads if doc_id in snapshots]
+        else:
+            # A newer upstream version of a stored alert is rewritten in place
+            updated_ids = [doc_id for doc_id in payloads
+                           if doc_id in snapshots and _newer(payloads[doc_id], snapshots[doc_id].to_dict())]
+        if seen is not None:
+            seen.mark(source, [doc_id for doc_id in snapshots if doc_id not in updated_ids], versions)
+
+        canonical = {}
+        found = {}
+        if resolve and new_ids:
+            resolve_start = time.perf_counter()
+            for doc_id in new_ids:
+                payloads[doc_id].update(index_fields(doc_id, payloads[doc_id]))
+            if not upsert:
+                resolved = resolve_events(alerts_ref, {doc_id: payloads[doc_id] for doc_id in new_ids}, found=found)
+                for doc_id, canonical_id in resolved.items():
+                    canonical.setdefault(canonical_id, []).append((doc_id, payloads[doc_id]))
+            stats['resolve_ms'] += _elapsed_ms(resolve_start)
+        merged_ids = [doc_id for group in canonical.values() for doc_id, _ in group]
+        if merged_ids:
+            new_ids = [doc_id for doc_id in new_ids if doc_id not in set(merged_ids)]
+        if not new_ids and not updated_ids and not canonical:
+            continue
+        # (method, ref, data, options); a fold costs two writes, so a chunk can exceed one batch
+        writes = [('set', refs[doc_id], payloads[doc_id], {}) for doc_id in new_ids]
+        for canonical_id, group in canonical.items():
+            fields = merge_fields(group, found.get(canonical_id))
+            if fields:
+                writes.append(('update', alerts_ref.document(canonical_id), fields, {}))
+            for doc_id, payload in group:
+                writes.append(('set', redirects_ref.document(doc_id), {**payload, 'canonical_id': canonical_id}, {}))
+        for doc_id in updated_ids:
+            # Keep the original creation time; updated_at marks the change
+            update = {key: value for key, value in payloads[doc_id].items() if key != 'timestamp'}
+            writes.append(('set', refs[doc_id], update, {'merge': True}))
+            if doc_id in redirected:
+                writes.append(('update', alerts_ref.document(redirected[doc_id]), revision_fields(doc_id, update), {}))
+        write_start = time.perf_counter()
+        for part in chunked(writes, FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for method, ref, data, options in part:
+                getattr(batch, method)(ref, data, **options)
+            batch.commit()
+            stats['batches'] += 1
+        stats['write_ms'] += _elapsed_ms(write_start)
+        stats['written'] += len(new_ids)
+        stats['updated'] += len(updated_ids)
+        stats['merged'] += len(merged_ids)
+        if seen is not None:
+            seen.mark(source, new_ids + merged_ids + updated_ids, versions)
+        if inserted is not None:
+            inserted.extend((doc_id, payloads[doc_id]) for doc_id in new_ids)
+
+    stats['lookup_ms'] = round(stats['lookup_ms'], 1)
+    stats['resolve_ms'] = round(stats['resolve_ms'], 1)
+    stats['write_ms'] = round(stats['write_ms'], 1)
+    stats['total_ms'] = _elapsed_ms(start)
+    return stats
+
@@ -1,8 +1,9 @@
 import os
-import glob
 from pinecone import Pinecone, ServerlessSpec
 from openai import OpenAI
 from dotenv import load_dotenv
+from playbooks import PLAYBOOKS_DIR, load_playbooks
+from retrieval import LocalVectorIndex, DEFAULT_INDEX_PATH
 
 # 1. Load environment variables
 load_dotenv(override=True)
@@ -35,20 +36,15 @@ else:
 index = pc.Index(INDEX_NAME)
 
 # 4. Read and Embed Files from the 'playbooks' subdirectory
-script_dir = os.path.dirname(os.path.abspath(__file__))
-playbooks_dir = os.path.join(script_dir, "playbooks")
-search_pattern = os.path.join(playbooks_dir, "mock_playbook_*.txt")
+playbooks = load_playbooks()
+print(f"Found {len(playbooks)} playbooks to ingest in '{PLAYBOOKS_DIR}'.")
 
-playbook_files = glob.glob(search_pattern)
-print(f"Found {len(playbook_files)} playbooks to ingest in '{playbooks_dir}'.")
+local_vectors = []
+for playbook in playbooks:
+    filename = playbook["id"]
+    text_content = playbook["text"]
+    hazard_type = playbook["hazard"]
 
-for file_path in playbook_files:
-    # Define filename first
-    filename = os.path.basename(file_path)
-    
-    with open(file_path, "r", encoding="utf-8") as f:
-        text_content = f.read()
-    
     try:
         # Generate Embedding
         response = client.embeddings.create(
@@ -56,44 +52,6 @@ for file_path in playbook_files:
             model="text-embedding-3-small"
         )
         embedding = response.data[0].embedding
-        
-        # Expanded hazard type mapping based on the filename
-        # Ensure your filenames match these keywords (e.g. 'mock_playbook_flood.txt')
-        hazard_type = "general"
-        if "flood" in filename: hazard_type = "flood"
-        elif "building_fire" in filename: hazard_type = "building_fire"
-        elif "wildfire" in filename: hazard_type = "wildfire"
-        elif "hurricane" in filename: hazard_type = "hurricane"
-        elif "tornado" in filename: hazard_type = "tornado"
-        elif "active_shooter" in filename: hazard_type = "active_shooter"
-        elif "police_activity" in filename: hazard_type = "police_activity"
-        elif "road_closure" in filename: hazard_type = "road_closure"
-        elif "severe_weather" in filename: hazard_type = "severe_weather"
-        elif "earthquake" in filename: hazard_type = "earthquake"
-        elif "hazmat" in filename: hazard_type = "hazmat_spill"
-        elif "gas_leak" in filename: hazard_type = "gas_leak"
-        elif "volcanic" in filename or "volcano" in filename: hazard_type = "volcanic_eruption"
-        elif "tsunami" in filename: hazard_type = "tsunami"
-        elif "power_outage" in filename: hazard_type = "power_outage"
-        elif "icy_roads" in filename: hazard_type = "icy_roads"
-        elif "heavy_traffic" in filename: hazard_type = "heavy_traffic"
-        elif "construction" in filename: hazard_type = "construction_zone"
-        elif "low_visibility" in filename: hazard_type = "low_visibility"
-        elif "wildlife" in filename: hazard_type = "wildlife"
-        elif "civil_unrest" in filename: hazard_type = "civil_unrest"
-        elif "transit_disruption" in filename: hazard_type = "transit_disruption"
-        elif "extreme_heat" in filename: hazard_type = "extreme_heat"
-        elif "air_quality" in filename: hazard_type = "air_quality"
-        elif "blizzard" in filename: hazard_type = "blizzard"
-        elif "flooded_pathway" in filename: hazard_type = "flooded_pathway"
-        elif "suspicious_package" in filename: hazard_type = "suspicious_package"
-        elif "sinkhole" in filename: hazard_type = "sinkhole"
-        elif "downed_power_lines" in filename: hazard_type = "downed_power_lines"
-        elif "avalanche" in filename: hazard_type = "avalanche"
-        elif "coastal_hazard" in filename: hazard_type = "coastal_hazard"
-        elif "dust_storm" in filename: hazard_type = "dust_storm"
-        elif "high_wind" in filename: hazard_type = "high_wind"
-        elif "landslide" in filename: hazard_type = "landslide"
 
         # Upsert to Pinecone
         index.upsert(vectors=[
@@ -107,9 +65,15 @@ for file_path in playbook_files:
                 }
             }
         ])
+        local_vectors.append({"id": filename, "values": embedding, "hazard": hazard_type, "text": text_content})
         print(f"Successfully indexed: {filename} as '{hazard_type}'")
         
     except Exception as e:
         print(f"Failed to index {filename}: {e}")
 
+# 5. Write the same vectors for the in-process retrieval index (retrieval.py)
+if local_vectors:
+    LocalVectorIndex.from_records(local_vectors).save(DEFAULT_INDEX_PATH)
+    print(f"Wrote local playbook index to {DEFAULT_INDEX_PATH}")
+
 print("Ingestion complete.")
\ No newline at end of file
@@ -0,0 +1,98 @@
+import codecs
+import json
+
+# --- Streaming JSON Array Reader ---
+# Upstream feeds wrap their records in one top-level array (GeoJSON
+# `features`, EONET `events`). iter_json_array() walks the top-level object
+# as bytes arrive and yields the array items one at a time, so only the
+# current item and the unread tail of the socket buffer are held in memory
+# instead of the whole document and its object tree.
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+class _Buffer:
+    """Text buffer fed from an iterator of byte chunks."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Append the next chunk, dropping consumed text. Returns False at end of stream."""
+        if self.exhausted:
+            return False
+        for chunk in self._chunks:
+            if not chunk:
+                continue
+            self.text = self.text[self.pos:] + self._utf8.decode(chunk)
+            self.pos = 0
+            return True
+        self.text = self.text[self.pos:] + self._utf8.decode(b'', final=True)
+        self.pos = 0
+        self.exhausted = True
+        return False
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at end)."""
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(f"Malformed JSON stream: expected one of {chars!r}, got {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode one complete JSON value, reading more of the stream as needed."""
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            # A bare number at the end of the buffer may still be growing
+            if end == len(self.text) and not isinstance(obj, (dict, list, str)) and self.fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def iter_json_array(chunks, key):
+    """
+    Yield the items of the array stored under `key` in a top-level JSON object,
+    decoding them incrementally from an iterator of byte chunks. Yields nothing
+    if the key is missing.
+    """
+    buf = _Buffer(chunks)
+    buf.expect('{')
+    if buf.peek() == '}':
+        return
+
+    while True:
+        name = buf.value()
+        buf.expect(':')
+        if name == key and buf.peek() == '[':
+            buf.expect('[')
+            if buf.peek() == ']':
+                return
+            while True:
+                yield buf.value()
+                if buf.expect(',]') == ']':
+                    return
+        buf.value()  # Skip any other member
+        if buf.expect(',}') == '}':
+            return
@@ -0,0 +1,160 @@
+import os
+import time
+from firebase_admin import firestore
+from dispatch import dispatch
+from geo import covering_cells, haversine_km, query_cell
+from polygons import bbox_radius_km, contains
+
+# --- Post-Ingest Alert Matching ---
+# After a sync run writes new alerts, match_and_notify() finds the users
+# whose last known position (users/{uid}.last_lat/last_lng, see
+# /api/users/location) is within the source's match radius and pushes to them.
+# The join is grid-based. Each new alert is bucketed into the geohash cells
+# covering its radius. Users are read once per distinct cell with a range
+# query, and exact distances are only checked between a user and the alerts
+# bucketed in that user's cell. Nothing scans all alerts x all users.
+# Alerts that carry a polygon (NWS, some GDACS) match the users inside the
+# polygon instead of those within the radius.
+#
+# A user is notified at most once per NOTIFY_WINDOW_SECONDS
+# (users/{uid}.last_alert_push_at). Several alerts matched in one run are
+# folded into one summary notification. Alerts matched while a user is inside
+# the window are not dropped: they are queued on the user doc
+# (pending_alerts, alert_digest_due) and sent as one digest by the first run
+# after the window ends. Sources match concurrently, so the window check and
+# the queue or push-stamp write run in one Firestore transaction per user:
+# two runs cannot both push inside one window, and clearing the queue cannot
+# drop alerts another run has just added to it.
+
+NOTIFY_WINDOW_SECONDS = int(os.environ.get('ALERT_NOTIFY_WINDOW_SECONDS', 15 * 60))
+DIGESTS_PER_RUN = 500
+
+
+def match_users(db, alerts, radius_km, collection='users'):
+    """
+    Spatially join new alerts ([(doc_id, payload)]) against users.
+    Returns ({uid: user_data}, {uid: [alert_id, ...]}).
+    """
+    by_cell = {}
+    for alert_id, alert in alerts:
+        if alert.get('lat') is None or alert.get('lng') is None:
+            continue
+        # Area warnings match users inside the shape; point alerts use the radius
+        reach = bbox_radius_km(alert['bbox'], alert['lat'], alert['lng']) if alert.get('geometry') else radius_km
+        for cell in covering_cells(alert['lat'], alert['lng'], reach):
+            by_cell.setdefault(cell, []).append((alert_id, alert))
+
+    users = {}
+    matches = {}
+    users_ref = db.collection(collection)
+    for cell, cell_alerts in by_cell.items():
+        for doc in query_cell(users_ref, cell):
+            data = doc.to_dict()
+            lat, lng = data.get('last_lat'), data.get('last_lng')
+            if lat is None or lng is None or not data.get('fcm_token'):
+                continue
+            for alert_id, alert in cell_alerts:
+                if alert.get('geometry'):
+                    hit = contains(alert, lat, lng)
+                else:
+                    hit = haversine_km(lat, lng, alert['lat'], alert['lng']) <= radius_km
+                if hit:
+                    users[doc.id] = data
+                    user_matches = matches.setdefault(doc.id, [])
+                    if alert_id not in user_matches:
+                        user_matches.append(alert_id)
+    return users, matches
+
+
+def _summary(alert_id, alert):
+    """The fields of a queued alert that its digest needs later."""
+    return {'id': alert_id, 'title': alert.get('title', 'Alert'), 'message': alert.get('message', ''),
+            'hazardType': alert.get('hazardType', 'general'), 'lat': alert['lat'], 'lng': alert['lng']}
+
+
+def due_digests(db, now, collection='users'):
+    """{uid: user_data} for users whose queued alerts can be sent now."""
+    query = (db.collection(collection)
+             .where(filter=firestore.FieldFilter('alert_digest_due', '<=', now))
+             .limit(DIGESTS_PER_RUN))
+    return {doc.id: doc.to_dict() for doc in query.stream()}
+
+
+@firestore.transactional
+def _claim(transaction, ref, queued, now, window):
+    """
+    ('queued', None) if the user is inside the window (summaries in `queued`
+    are added to the digest), ('claimed', data) if this run takes the push
+    (stamped and queue cleared), ('skipped', None) if there is nothing to send.
+    """
+    data = ref.get(transaction=transaction).to_dict() or {}
+    last_push = data.get('last_alert_push_at')
+    if last_push is not None and now - float(last_push) < window:
+        if not queued:
+            return 'skipped', None   # Another run already sent this digest
+        transaction.update(ref, {'pending_alerts': firestore.ArrayUnion(queued),
+                                 'alert_digest_due': float(last_push) + window})
+        return 'queued', None
+    if not queued and not data.get('pending_alerts'):
+        return 'skipped', None
+    transaction.update(ref, {'last_alert_push_at': now, 'pending_alerts': firestore.DELETE_FIELD,
+                             'alert_digest_due': firestore.DELETE_FIELD})
+    return 'claimed', data
+
+
+def _notification(alert_ids, alerts):
+    """(title, body, data) for one user's matched alerts."""
+    if len(alert_ids) == 1:
+        alert = alerts[alert_ids[0]]
+        return (alert.get('title', 'New alert near you'), alert.get('message', ''),
+                (('alert_id', alert_ids[0]), ('hazardType', alert.get('hazardType', 'general')),
+                 ('lat', str(alert['lat'])), ('lng', str(alert['lng']))))
+    titles = sorted({alerts[alert_id].get('title', 'Alert') for alert_id in alert_ids})
+    body = '; '.join(titles[:3]) + (f" and {len(titles) - 3} more" if len(titles) > 3 else '')
+    return f"{len(alert_ids)} new alerts near you", body, (('alert_ids', ','.join(sorted(alert_ids))),)
+
+
+def match_and_notify(db, alerts, radius_km, window=NOTIFY_WINDOW_SECONDS, now=None, collection='users'):
+    """
+    Notify users near newly inserted alerts, and send the digests that came
+    due. Matches for users notified within the last `window` seconds are
+    queued for their digest. Returns match and delivery counts.
+    """
+    start = time.perf_counter()
+    now = time.time() if now is None else now
+    alerts = list(alerts)
+    _, matches = match_users(db, alerts, radius_km, collection)
+    due = due_digests(db, now, collection)
+    alerts_by_id = dict(alerts)
+
+    users_ref = db.collection(collection)
+    groups = {}   # (title, body, data) -> {token: uid}
+    throttled = digests = 0
+    for uid in dict.fromkeys([*matches, *due]):
+        new_ids = matches.get(uid, [])
+        queued = [_summary(alert_id, alerts_by_id[alert_id]) for alert_id in new_ids]
+        outcome, data = _claim(db.transaction(), users_ref.document(uid), queued, now, window)
+        if outcome == 'queued':
+            throttled += 1
+        if outcome != 'claimed' or not data.get('fcm_token'):
+            continue
+        pending = {entry['id']: entry for entry in data.get('pending_alerts') or []}
+        digests += bool(pending)
+        alert_ids = list(dict.fromkeys([*pending, *new_ids]))
+        groups.setdefault(_notification(alert_ids, {**pending, **alerts_by_id}), {})[data['fcm_token']] = uid
+
+    reports = [dispatch(db, targets, title, body, dict(data)) for (title, body, data), targets in groups.items()]
+    notified = [uid for targets in groups.values() for uid in targets.values()]
+
+    return {
+        'alerts': len(alerts),
+        'matched_users': len(matches),
+        'pairs': sum(len(ids) for ids in matches.values()),
+        'throttled': throttled,
+        'digests': digests,
+        'notified': len(notified),
+        'delivered': sum(r['success'] for r in reports),
+        'failed': sum(r['failure'] for r in reports),
+        'notifications': len(reports),
+        'total_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,27 @@
+import base64
+import datetime
+import json
+
+# --- Opaque Feed Cursors ---
+# A cursor pins a position in an ordered alert query as (timestamp, doc id).
+# The doc id breaks ties between alerts written in the same batch, which all
+# share one server timestamp. Clients treat the string as opaque.
+
+
+def encode_cursor(timestamp, doc_id):
+    payload = json.dumps({'t': timestamp.isoformat(), 'id': doc_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (timestamp, doc_id). Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        timestamp = datetime.datetime.fromisoformat(payload['t'])
+        doc_id = payload['id']
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+    if timestamp.tzinfo is None or not isinstance(doc_id, str) or not doc_id:
+        raise ValueError(f'Invalid cursor: {cursor}')
+    return timestamp, doc_id
@@ -0,0 +1,68 @@
+import os
+import glob
+
+# --- Playbook Corpus ---
+# The mock_playbook_*.txt files in backend/playbooks, each tagged with the
+# hazard key used by SUPPORTED_HAZARDS and the Pinecone `hazard` filter.
+# Shared by ingest_playbooks.py and the local retrieval index.
+
+PLAYBOOKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playbooks")
+
+# Checked in order and the first keyword found in the filename wins, matching
+# the mapping the Pinecone index was built with (so 'flooded_pathway' files
+# are tagged 'flood').
+FILENAME_HAZARDS = [
+    ("flood", "flood"),
+    ("building_fire", "building_fire"),
+    ("wildfire", "wildfire"),
+    ("hurricane", "hurricane"),
+    ("tornado", "tornado"),
+    ("active_shooter", "active_shooter"),
+    ("police_activity", "police_activity"),
+    ("road_closure", "road_closure"),
+    ("severe_weather", "severe_weather"),
+    ("earthquake", "earthquake"),
+    ("hazmat", "hazmat_spill"),
+    ("gas_leak", "gas_leak"),
+    ("volcanic", "volcanic_eruption"),
+    ("volcano", "volcanic_eruption"),
+    ("tsunami", "tsunami"),
+    ("power_outage", "power_outage"),
+    ("icy_roads", "icy_roads"),
+    ("heavy_traffic", "heavy_traffic"),
+    ("construction", "construction_zone"),
+    ("low_visibility", "low_visibility"),
+    ("wildlife", "wildlife"),
+    ("civil_unrest", "civil_unrest"),
+    ("transit_disruption", "transit_disruption"),
+    ("extreme_heat", "extreme_heat"),
+    ("air_quality", "air_quality"),
+    ("blizzard", "blizzard"),
+    ("flooded_pathway", "flooded_pathway"),
+    ("suspicious_package", "suspicious_package"),
+    ("sinkhole", "sinkhole"),
+    ("downed_power_lines", "downed_power_lines"),
+    ("avalanche", "avalanche"),
+    ("coastal_hazard", "coastal_hazard"),
+    ("dust_storm", "dust_storm"),
+    ("high_wind", "high_wind"),
+    ("landslide", "landslide"),
+]
+
+
+def hazard_for_filename(filename):
+    for keyword, hazard in FILENAME_HAZARDS:
+        if keyword in filename:
+            return hazard
+    return "general"
+
+
+def load_playbooks(playbooks_dir=PLAYBOOKS_DIR):
+    """Return [{'id', 'hazard', 'text'}] for every playbook file, sorted by filename."""
+    playbooks = []
+    for file_path in sorted(glob.glob(os.path.join(playbooks_dir, "mock_playbook_*.txt"))):
+        filename = os.path.basename(file_path)
+        with open(file_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        playbooks.append({"id": filename, "hazard": hazard_for_filename(filename), "text": text})
+    return playbooks
@@ -0,0 +1,185 @@
+import heapq
+import numpy as np
+from geo import bbox_cells, encode_geohash, haversine_km
+
+# --- Compact Alert Polygons ---
+# NWS warnings (and GDACS events, when they carry an area) come with
+# Polygon/MultiPolygon geometry. Alerts used to keep only their first vertex.
+# compact_geometry() keeps the shape instead, within a budget:
+#
+# * each ring is simplified with Douglas-Peucker, splitting the segment with
+#   the largest deviation first until the vertex budget is spent;
+# * Firestore cannot hold nested arrays, so rings are stored as a list of
+#   maps with flat [lng, lat, lng, lat, ...] coordinates;
+# * bbox and centroid are precomputed, and `cover_cells` lists the coarse
+#   geohash cells (precision 1-3) overlapping the bbox, so "which polygons
+#   could contain this point" is one array_contains_any query.
+#
+# contains() tests a point with a bbox check and then an even-odd ray cast
+# vectorized over each ring's edges. Holes and multi-part shapes fall out of
+# the even-odd rule. Coordinates are treated as planar degrees, which is
+# fine at warning-polygon scale; shapes crossing the antimeridian are not
+# handled.
+
+DEFAULT_MAX_VERTICES = 64
+MIN_RING_VERTICES = 4           # Closed triangle
+MAX_COVER_CELLS = 24
+COVER_PRECISIONS = (3, 2, 1)    # ~156 km, ~1250 km, ~5000 km cells
+
+
+def _segment_distances(points, start, end):
+    """Perpendicular distance of points to the segment start-end (planar)."""
+    segment = end - start
+    length_sq = float(segment @ segment)
+    if length_sq == 0:
+        return np.linalg.norm(points - start, axis=1)
+    t = np.clip(((points - start) @ segment) / length_sq, 0.0, 1.0)
+    projection = start + np.outer(t, segment)
+    return np.linalg.norm(points - projection, axis=1)
+
+
+def simplify_ring(ring, max_vertices=DEFAULT_MAX_VERTICES, tolerance=0.0):
+    """
+    Douglas-Peucker on a closed ring ([[lng, lat], ...], first == last),
+    refining the worst segment first until max_vertices (excluding the
+    closing vertex) are kept or no point deviates more than tolerance.
+    """
+    points = np.asarray(ring, dtype=np.float64)
+    if len(points) > 1 and not np.array_equal(points[0], points[-1]):
+        points = np.vstack([points, points[:1]])
+    if len(points) - 1 <= max_vertices:
+        return points
+
+    last = len(points) - 1
+    # Anchor on the vertex farthest from the start, so the closed ring is split in two
+    far = int(np.argmax(np.linalg.norm(points[:last] - points[0], axis=1)))
+    keep = {0, far, last}
+    heap = []
+
+    def push(a, b):
+        if b - a < 2:
+            return
+        distances = _segment_distances(points[a + 1:b], points[a], points[b])
+        index = int(np.argmax(distances))
+        heapq.heappush(heap, (-float(distances[index]), a, b, a + 1 + index))
+
+    push(0, far)
+    push(far, last)
+    while heap and len(keep) - 1 < max_vertices:
+        negative_distance, a, b, index = heapq.heappop(heap)
+        if -negative_distance <= tolerance:
+            break
+        keep.add(index)
+        push(a, index)
+        push(index, b)
+    return points[sorted(keep)]
+
+
+def _rings(geometry):
+    """[(ring, is_exterior)] for a Polygon or MultiPolygon."""
+    if geometry['type'] == 'Polygon':
+        polygons = [geometry['coordinates']]
+    elif geometry['type'] == 'MultiPolygon':
+        polygons = geometry['coordinates']
+    else:
+        raise ValueError(f"Unsupported geometry type: {geometry['type']}")
+    return [(ring, position == 0) for polygon in polygons for position, ring in enumerate(polygon)]
+
+
+def _ring_area_centroid(points):
+    x, y = points[:-1, 0], points[:-1, 1]
+    x_next, y_next = points[1:, 0], points[1:, 1]
+    cross = x * y_next - x_next * y
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, points[:-1].mean(axis=0)
+    centroid = np.array([((x + x_next) * cross).sum(), ((y + y_next) * cross).sum()]) / (6 * area)
+    return area, centroid
+
+
+def cover_cells(bbox):
+    """Coarse geohash cells overlapping the bbox, at the finest precision that stays small."""
+    for precision in COVER_PRECISIONS:
+        cells = bbox_cells(bbox['min_lat'], bbox['min_lng'], bbox['max_lat'], bbox['max_lng'], precision)
+        if len(cells) <= MAX_COVER_CELLS:
+            return cells
+    return cells
+
+
+def point_cells(lat, lng):
+    """The prefixes of a point's geohash that cover_cells() can contain."""
+    geohash = encode_geohash(lat, lng, max(COVER_PRECISIONS))
+    return [geohash[:precision] for precision in sorted(COVER_PRECISIONS)]
+
+
+def compact_geometry(geometry, max_vertices=DEFAULT_MAX_VERTICES):
+    """
+    Firestore-friendly {'geometry', 'bbox', 'centroid', 'cover_cells'} for a
+    GeoJSON Polygon/MultiPolygon, or None if nothing usable is left.
+    The vertex budget is shared between rings in proportion to their size.
+    """
+    rings = [(np.asarray(ring, dtype=np.float64), exterior)
+             for ring, exterior in _rings(geometry) if len(ring) >= MIN_RING_VERTICES]
+    if not rings:
+        return None
+    total = sum(len(ring) for ring, _ in rings)
+    simplified = []
+    exteriors = []
+    for ring, exterior in rings:
+        budget = max(MIN_RING_VERTICES, int(max_vertices * len(ring) / total))
+        simplified.append(simplify_ring(ring, budget))
+        if exterior:
+            exteriors.append(simplified[-1])
+
+    stacked = np.vstack(simplified)
+    min_lng, min_lat = stacked.min(axis=0)
+    max_lng, max_lat = stacked.max(axis=0)
+    bbox = {'min_lng': float(min_lng), 'min_lat': float(min_lat), 'max_lng': float(max_lng), 'max_lat': float(max_lat)}
+
+    # Area-weighted centroid of the outer rings; feeds do not agree on winding
+    weighted = [(abs(area), centroid) for area, centroid in map(_ring_area_centroid, exteriors)]
+    area = sum(a for a, _ in weighted)
+    if area:
+        centroid = sum(a * c for a, c in weighted) / area
+    else:
+        centroid = stacked.mean(axis=0)
+
+    return {
+        'geometry': {
+            'type': geometry['type'],
+            'rings': [{'coords': [round(float(v), 5) for v in ring.ravel()]} for ring in simplified],
+        },
+        'bbox': bbox,
+        'centroid': {'lat': float(centroid[1]), 'lng': float(centroid[0])},
+        'cover_cells': cover_cells(bbox),
+    }
+
+
+def in_bbox(bbox, lat, lng):
+    return bbox['min_lat'] <= lat <= bbox['max_lat'] and bbox['min_lng'] <= lng <= bbox['max_lng']
+
+
+def _crossings(coords, lat, lng):
+    ring = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    straddles = (y1 > lat) != (y2 > lat)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_at_lat = x1 + (lat - y1) * (x2 - x1) / (y2 - y1)
+    return int(np.count_nonzero(straddles & (lng < x_at_lat)))
+
+
+def contains(alert, lat, lng):
+    """True if (lat, lng) is inside an alert's stored geometry (even-odd rule)."""
+    bbox = alert.get('bbox')
+    geometry = alert.get('geometry')
+    if not bbox or not geometry or not in_bbox(bbox, lat, lng):
+        return False
+    return sum(_crossings(ring['coords'], lat, lng) for ring in geometry['rings']) % 2 == 1
+
+
+def bbox_radius_km(bbox, lat, lng):
+    """Distance from (lat, lng) to the farthest bbox corner."""
+    return max(haversine_km(lat, lng, corner_lat, corner_lng)
+               for corner_lat in (bbox['min_lat'], bbox['max_lat'])
+               for corner_lng in (bbox['min_lng'], bbox['max_lng']))
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# --- RAG Context Snapshot ---
+# get_retrieved_context costs an embedding call plus an index query per
+# hazard. The snapshot keeps the retrieved context per hazard in a versioned JSON file so
+# a new instance loads it in milliseconds. Each entry records a hash of the
+# playbook text for its hazard; editing a playbook changes the hash and the
+# stale entry is ignored and recomputed.
+
+DEFAULT_SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playbooks", "rag_snapshot.json")
+SNAPSHOT_VERSION = 1  # Bump when retrieval logic changes in a way hashes cannot see
+
+
+def playbook_hashes(playbooks):
+    """SHA-256 of the playbook text per hazard (files sorted by id)."""
+    texts = {}
+    for playbook in sorted(playbooks, key=lambda p: p['id']):
+        texts.setdefault(playbook['hazard'], []).append(f"{playbook['id']}\n{playbook['text']}")
+    return {hazard: hashlib.sha256('\n\n'.join(parts).encode('utf-8')).hexdigest()
+            for hazard, parts in texts.items()}
+
+
+class RagSnapshot:
+    def __init__(self, path, hashes):
+        self.path = path
+        self.hashes = hashes
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def _hash_for(self, hazard):
+        # Hazards without a playbook still get an entry; their hash is stable
+        return self.hashes.get(hazard, 'no-playbook')
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"RAG snapshot not loaded from {self.path}: {e}")
+            return
+        if data.get('version') != SNAPSHOT_VERSION:
+            print(f"RAG snapshot version {data.get('version')} ignored (expected {SNAPSHOT_VERSION})")
+            return
+        with self._lock:
+            self._entries = {
+                hazard: entry for hazard, entry in data.get('entries', {}).items()
+                if entry.get('playbook_hash') == self._hash_for(hazard)
+            }
+
+    def get(self, hazard):
+        """Return (found, context) for a hazard whose playbook is unchanged."""
+        with self._lock:
+            entry = self._entries.get(hazard)
+        if entry is None:
+            return False, None
+        return True, entry['context']
+
+    def put(self, hazard, context):
+        with self._lock:
+            self._entries[hazard] = {'context': context, 'playbook_hash': self._hash_for(hazard)}
+
+    def save(self):
+        with self._lock:
+            data = {'version': SNAPSHOT_VERSION, 'created_at': time.time(), 'entries': dict(self._entries)}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'version': SNAPSHOT_VERSION}
+
+    def missing(self, hazards):
+        with self._lock:
+            return sorted(h for h in hazards if h not in self._entries)
+
+
+def warm(snapshot, hazards, compute, max_workers=8):
+    """
+    Compute the context for every hazard missing from the snapshot
+    concurrently, store the results and save the snapshot once.
+    Returns {'warmed', 'failed', 'cached', 'duration_ms'}.
+    """
+    start = time.perf_counter()
+    todo = snapshot.missing(hazards)
+    failed = []
+    if todo:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='rag-warm') as executor:
+            results = {hazard: executor.submit(compute, hazard) for hazard in todo}
+            for hazard, future in results.items():
+                try:
+                    snapshot.put(hazard, future.result())
+                except Exception as e:
+                    print(f"RAG warm-up failed for {hazard}: {e}")
+                    failed.append(hazard)
+        if len(failed) < len(todo):
+            snapshot.save()
+    return {
+        'warmed': len(todo) - len(failed),
+        'failed': failed,
+        'cached': len(hazards) - len(todo),
+        'duration_ms': round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,97 @@
+import re
+import threading
+
+# --- Recommendation Cache Keys ---
+# Memoizing generate_ai_recommendation on its raw arguments almost never
+# hits: the free-text description and the street-level location string make
+# every call unique. The playbooks branch only on a few structured signals,
+# so the cache key is built from those instead:
+#   hazard | magnitude bucket | alert level | coarse region | coastal flag
+# Two requests with the same key would get the same playbook guidance, so
+# they share one cached recommendation. Bump KEY_VERSION when the prompt or
+# the bucketing changes.
+
+KEY_VERSION = 1
+
+_MAGNITUDE = re.compile(r'\b(?:m|mag(?:nitude)?)\s*[:=]?\s*(\d+(?:\.\d+)?)', re.IGNORECASE)
+_LEVELS = [
+    # (canonical level, pattern) — first match wins, most severe first
+    ('extreme', re.compile(r'\b(extreme|red)\b', re.IGNORECASE)),
+    ('severe', re.compile(r'\b(severe|orange|warning|high confidence|confidence\s*[:=]?\s*h\b)', re.IGNORECASE)),
+    ('moderate', re.compile(r'\b(moderate|yellow|watch|nominal|confidence\s*[:=]?\s*n\b)', re.IGNORECASE)),
+    ('minor', re.compile(r'\b(minor|green|advisory|low confidence|confidence\s*[:=]?\s*l\b)', re.IGNORECASE)),
+]
+_COASTAL = re.compile(r'\b(coast(al)?|beach|shore(line)?|bay|harbou?r|ocean|sea|gulf|island|port|pier|marina|tsunami)\b',
+                      re.IGNORECASE)
+
+
+def magnitude_bucket(text):
+    """Whole-number magnitude band (M4.6 -> '4'), capped at '8+', or None."""
+    match = _MAGNITUDE.search(text or '')
+    if not match:
+        return None
+    band = int(float(match.group(1)))
+    return '8+' if band >= 8 else str(band)
+
+
+def alert_level(text):
+    for level, pattern in _LEVELS:
+        if pattern.search(text or ''):
+            return level
+    return None
+
+
+def coarse_region(features, lat, lng):
+    """
+    City-level place name from Mapbox reverse-geocode features, falling back
+    to the region, then to a ~1 degree grid cell.
+    """
+    for place_type in ('place', 'district', 'region'):
+        for feature in features or []:
+            if place_type in feature.get('place_type', []):
+                return feature.get('place_name', feature.get('text'))
+    return f"area near {round(lat)}, {round(lng)}"
+
+
+def is_coastal(*texts):
+    """Keyword heuristic over place names and the description (no coastline data)."""
+    return any(_COASTAL.search(text or '') for text in texts)
+
+
+def recommendation_key(hazard, event_description, region, coastal):
+    parts = [
+        hazard,
+        f"m{magnitude_bucket(event_description) or '-'}",
+        alert_level(event_description) or '-',
+        region.lower(),
+        'coastal' if coastal else 'inland',
+    ]
+    return f"recommendation:v{KEY_VERSION}:" + '|'.join(parts)
+
+
+class HazardHitCounter:
+    """Hits and misses of the recommendation cache per hazard."""
+
+    def __init__(self):
+        self._counts = {}  # hazard -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def record(self, hazard, hit):
+        with self._lock:
+            counts = self._counts.setdefault(hazard, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def stats(self):
+        with self._lock:
+            by_hazard = {
+                hazard: {'hits': hits, 'misses': misses, 'hit_rate': round(hits / (hits + misses), 3)}
+                for hazard, (hits, misses) in sorted(self._counts.items())
+            }
+            hits = sum(h for h, _ in self._counts.values())
+            lookups = hits + sum(m for _, m in self._counts.values())
+        return {
+            'hits': hits,
+            'misses': lookups - hits,
+            'hit_rate': round(hits / lookups, 3) if lookups else 0.0,
+            'by_hazard': by_hazard,
+        }
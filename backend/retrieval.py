@@ -0,0 +1,120 @@
+import os
+import numpy as np
+
+# --- In-Process Playbook Vector Index ---
+# The playbook corpus is ~35 small documents, so a Pinecone query is a network
+# round-trip to score a few dozen vectors. LocalVectorIndex holds the same
+# embeddings in a normalized float32 matrix with a precomputed row list per
+# hazard, and answers index.query(...) with one vectorized dot product.
+# Its query() accepts the arguments get_retrieved_context passes to Pinecone
+# and returns the same shape (.matches with .id/.score/.metadata), so it is a
+# drop-in replacement.
+#
+# The snapshot is written by ingest_playbooks.py, or bootstrapped once from
+# Pinecone with from_pinecone().
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "playbooks", "playbook_index.npz")
+
+
+class Match:
+    def __init__(self, id, score, metadata):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class QueryResult:
+    def __init__(self, matches):
+        self.matches = matches
+
+
+class LocalVectorIndex:
+    def __init__(self, ids, hazards, texts, vectors):
+        self.ids = list(ids)
+        self.hazards = list(hazards)
+        self.texts = list(texts)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1, norms)
+        self.hazard_rows = {}
+        for row, hazard in enumerate(self.hazards):
+            self.hazard_rows.setdefault(hazard, []).append(row)
+        self.hazard_rows = {hazard: np.array(rows) for hazard, rows in self.hazard_rows.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from [{'id', 'values', 'hazard', 'text'}]."""
+        return cls(
+            [r['id'] for r in records],
+            [r['hazard'] for r in records],
+            [r['text'] for r in records],
+            [r['values'] for r in records],
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['ids'], data['hazards'], data['texts'], data['vectors'])
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        np.savez_compressed(
+            path,
+            ids=np.array(self.ids),
+            hazards=np.array(self.hazards),
+            texts=np.array(self.texts),
+            vectors=self.vectors,
+        )
+
+    @classmethod
+    def from_pinecone(cls, pinecone_index, ids):
+        """Fetch the stored playbook vectors from Pinecone once."""
+        fetched = pinecone_index.fetch(ids=list(ids)).vectors
+        records = []
+        for vector_id, vector in fetched.items():
+            metadata = vector.metadata or {}
+            records.append({
+                'id': vector_id,
+                'values': vector.values,
+                'hazard': metadata.get('hazard', 'general'),
+                'text': metadata.get('text', ''),
+            })
+        if not records:
+            raise ValueError("No playbook vectors found in Pinecone")
+        return cls.from_records(records)
+
+    def _rows_for(self, filter):
+        if not filter:
+            return None
+        condition = filter.get('hazard')
+        if isinstance(condition, dict):
+            if set(condition) != {'$eq'}:
+                raise ValueError(f"Unsupported filter: {filter}")
+            condition = condition['$eq']
+        if condition is None or len(filter) != 1:
+            raise ValueError(f"Unsupported filter: {filter}")
+        return self.hazard_rows.get(condition, np.array([], dtype=int))
+
+    def query(self, vector, top_k=1, include_metadata=True, filter=None):
+        """Cosine top-k over the (optionally hazard-filtered) rows."""
+        rows = self._rows_for(filter)
+        candidates = self.vectors if rows is None else self.vectors[rows]
+        if len(candidates) == 0:
+            return QueryResult([])
+
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        scores = candidates @ query
+
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        matches = []
+        for position in top:
+            row = int(position if rows is None else rows[position])
+            metadata = {'text': self.texts[row], 'hazard': self.hazards[row], 'source': self.ids[row]} if include_metadata else {}
+            matches.append(Match(self.ids[row], float(scores[position]), metadata))
+        return QueryResult(matches)
@@ -0,0 +1,139 @@
+import datetime
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from sources import SOURCES, SourceBusyError, run_source
+
+# --- Background Sync Scheduler ---
+# Runs every source adapter on its own cadence (SyncSource.interval) inside the
+# server process, so ingestion no longer depends on an external cron hitting
+# the /api/sync/* endpoints. Each delay is jittered, failures back off
+# exponentially, and a source never starts while its previous run is going.
+# Enable with SYNC_SCHEDULER_ENABLED=1. With several gunicorn workers each
+# worker would run its own scheduler, so enable it on a single worker only.
+
+
+def _iso(ts):
+    if ts is None:
+        return None
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).isoformat()
+
+
+class SyncScheduler:
+    def __init__(self, run=run_source, jitter=0.1, max_backoff=3600, tick=1.0):
+        self.run = run                  # (db, name) -> stats dict
+        self.jitter = jitter            # +/- fraction applied to every delay
+        self.max_backoff = max_backoff  # Ceiling on the failure delay in seconds
+        self.tick = tick                # How often the loop looks for due sources
+        self.db = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=len(SOURCES), thread_name_prefix='scheduler')
+        self._lock = threading.Lock()
+        self._state = {
+            name: {
+                'interval': source.interval,
+                'running': False,
+                'next_run_at': None,
+                'last_started_at': None,
+                'last_status': None,
+                'last_duration_ms': None,
+                'last_items': None,
+                'last_candidates': None,
+                'last_error': None,
+                'consecutive_failures': 0,
+                'runs': 0,
+            }
+            for name, source in SOURCES.items()
+        }
+
+    def _jittered(self, delay):
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _next_delay(self, name):
+        state = self._state[name]
+        delay = state['interval']
+        if state['consecutive_failures']:
+            delay = min(delay * 2 ** state['consecutive_failures'], self.max_backoff)
+        return self._jittered(delay)
+
+    def start(self, db):
+        """Start the scheduler loop in a daemon thread. Initial runs are staggered."""
+        if self._thread and self._thread.is_alive():
+            return
+        self.db = db
+        now = time.time()
+        with self._lock:
+            for state in self._state.values():
+                state['next_run_at'] = now + random.uniform(0, self.jitter * state['interval'])
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='sync-scheduler', daemon=True)
+        self._thread.start()
+        print(f"Sync scheduler started for {', '.join(self._state)}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.tick * 2)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            now = time.time()
+            with self._lock:
+                due = [name for name, state in self._state.items()
+                       if not state['running'] and state['next_run_at'] <= now]
+                for name in due:
+                    self._state[name]['running'] = True
+            for name in due:
+                self._executor.submit(self.run_once, name)
+            self._stop.wait(self.tick)
+
+    def run_once(self, name):
+        """Run one source now and schedule its next run from the outcome."""
+        state = self._state[name]
+        started_at = time.time()
+        start = time.perf_counter()
+        status, error, stats = 'success', None, {}
+        try:
+            stats = self.run(self.db, name)
+        except SourceBusyError as e:
+            # A manual /api/sync call holds the source; try again next interval
+            status, error = 'skipped', str(e)
+        except Exception as e:
+            print(f"{SOURCES[name].label} Scheduled Sync Error: {e}")
+            status, error = 'error', str(e)
+
+        with self._lock:
+            if status == 'error':
+                state['consecutive_failures'] += 1
+            elif status == 'success':
+                state['consecutive_failures'] = 0
+            state['runs'] += 1
+            state['last_started_at'] = started_at
+            state['last_status'] = status
+            state['last_error'] = error
+            state['last_duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+            if status == 'success':
+                state['last_items'] = stats.get('written', 0)
+                state['last_candidates'] = stats.get('candidates', 0)
+            state['next_run_at'] = time.time() + self._next_delay(name)
+            state['running'] = False
+
+    def status(self):
+        """Snapshot of every source's schedule for the status endpoint."""
+        with self._lock:
+            return {
+                'running': bool(self._thread and self._thread.is_alive()),
+                'sources': {
+                    name: {
+                        **{k: v for k, v in state.items() if not k.endswith('_at')},
+                        'last_started_at': _iso(state['last_started_at']),
+                        'next_run_at': _iso(state['next_run_at']),
+                    }
+                    for name, state in self._state.items()
+                },
+            }
+
+
+scheduler = SyncScheduler()
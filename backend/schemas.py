@@ -44,4 +44,84 @@ class GeneratePromptRequestSchema(Schema):
     hazard = fields.Str(required=True)
     user_lat = fields.Float(required=True)
     user_lng = fields.Float(required=True)
-    event_description = fields.Str(required=False, load_default="No specific details provided.")
\ No newline at end of file
+    event_description = fields.Str(required=False, load_default="No specific details provided.")
+
+# --- Nearby Alerts Query Schema ---
+# Validates the query string of the /api/alerts/nearby endpoint.
+class NearbyAlertsQuerySchema(Schema):
+    """
+    The query parameters for the /api/alerts/nearby endpoint.
+    """
+    lat = fields.Float(required=True, validate=validate.Range(min=-90, max=90))
+    lng = fields.Float(required=True, validate=validate.Range(min=-180, max=180))
+    # Search radius in kilometres
+    radius_km = fields.Float(load_default=25.0, validate=validate.Range(min=0.1, max=500))
+    limit = fields.Int(load_default=50, validate=validate.Range(min=1, max=200))
+
+
+# --- Notifications Feed Query Schema ---
+# Validates the query string of the /api/notifications endpoint.
+class NotificationsQuerySchema(Schema):
+    """
+    The query parameters for the /api/notifications endpoint.
+    """
+    limit = fields.Int(load_default=50, validate=validate.Range(min=1, max=200))
+    # Opaque cursor from `next_cursor`: page further back in time
+    cursor = fields.Str()
+    # Opaque cursor from `sync_cursor`: only alerts created or changed since
+    since = fields.Str()
+
+
+# --- Batch Recommendation Request Schema ---
+# Validates the JSON input to the /api/generate_prompt/batch endpoint.
+class BatchPromptItemSchema(Schema):
+    """
+    One hazard in a batch recommendation request.
+    """
+    hazard = fields.Str(required=True)
+    event_description = fields.Str(required=False, load_default="No specific details provided.")
+
+
+class BatchPromptRequestSchema(Schema):
+    """
+    The input data schema for the /api/generate_prompt/batch endpoint.
+    """
+    user_lat = fields.Float(required=True, validate=validate.Range(min=-90, max=90))
+    user_lng = fields.Float(required=True, validate=validate.Range(min=-180, max=180))
+    items = fields.List(fields.Nested(BatchPromptItemSchema), required=True, validate=validate.Length(min=1, max=20))
+
+
+# --- User Location Schema ---
+# Validates the JSON input to the /api/users/location endpoint.
+class UserLocationSchema(Schema):
+    """
+    The device's last known position, used to target area pushes.
+    """
+    lat = fields.Float(required=True, validate=validate.Range(min=-90, max=90))
+    lng = fields.Float(required=True, validate=validate.Range(min=-180, max=180))
+
+
+# --- Area Push Request Schema ---
+# Validates the JSON input to the /api/push/area endpoint.
+class AreaPushRequestSchema(Schema):
+    """
+    A notification for every user last seen within radius_km of (lat, lng).
+    """
+    title = fields.Str(required=True, validate=validate.Length(min=1))
+    message = fields.Str(required=True, validate=validate.Length(min=1))
+    lat = fields.Float(required=True, validate=validate.Range(min=-90, max=90))
+    lng = fields.Float(required=True, validate=validate.Range(min=-180, max=180))
+    radius_km = fields.Float(load_default=10.0, validate=validate.Range(min=0.1, max=500))
+    hazardType = fields.Str(load_default='general')
+    icon = fields.Str(load_default='warning')
+    color = fields.Str(load_default='red')
+
+
+# --- Affecting Alerts Query Schema ---
+# Validates the query string of the /api/alerts/affecting endpoint.
+class AffectingAlertsQuerySchema(Schema):
+    """
+    The point tested against stored alert polygons.
+    """
+    lat = fields.Float(required=True, validate=validate.Range(min=-90, max=90))
+    lng = fields.Float(required=True, validate=validate.Range(min=-180, max=180))
@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Seen-ID Filter ---
+# Most of every sync pull was already ingested on the previous run (the USGS
+# all_hour feed is ~95% repeats minute to minute). The ingest stage asks this
+# registry first and drops known doc IDs before any Firestore lookup.
+# Entries are kept per source in insertion order with a TTL and a size bound,
+# so memory stays fixed and an expired ID simply falls back to a Firestore
+# existence check. Set SEEN_IDS_PATH to persist the sets across restarts.
+# Versioned sources (see watermarks.py) also record the version each ID was
+# seen at; a newer version of a known ID is not filtered, so upstream
+# revisions reach ingest as in-place updates.
+
+DEFAULT_TTL = 48 * 3600        # Longer than any feed keeps repeating an item
+DEFAULT_MAX_ENTRIES = 100000   # Per source
+
+
+class SeenIdSet:
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # doc_id -> time first marked, oldest first
+        self._versions = {}            # doc_id -> version last marked, if any
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expire(self, now):
+        while self._entries:
+            doc_id, marked_at = next(iter(self._entries.items()))
+            if now - marked_at < self.ttl:
+                break
+            self._versions.pop(doc_id, None)
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def contains(self, doc_id, now, version=None):
+        marked_at = self._entries.get(doc_id)
+        if marked_at is not None and now - marked_at < self.ttl and (version is None or self._versions.get(doc_id) == version):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, doc_id, now, version=None):
+        if version is not None:
+            self._versions[doc_id] = version
+        if doc_id in self._entries:
+            return
+        self._entries[doc_id] = now
+        if len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._versions.pop(evicted, None)
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+        }
+
+
+class SeenIdRegistry:
+    def __init__(self, path=None, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sets = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path:
+            self.load()
+
+    def _set(self, source):
+        seen = self._sets.get(source)
+        if seen is None:
+            seen = self._sets[source] = SeenIdSet(self.ttl, self.max_entries)
+        return seen
+
+    def filter_unseen(self, source, doc_ids, versions=None):
+        """
+        Return the subset of doc_ids not marked as seen for this source.
+        With versions ({doc_id: version}), an ID seen at another version counts as unseen.
+        """
+        now = time.time()
+        versions = versions or {}
+        with self._lock:
+            seen = self._set(source)
+            seen._expire(now)
+            return [doc_id for doc_id in doc_ids if not seen.contains(doc_id, now, versions.get(doc_id))]
+
+    def mark(self, source, doc_ids, versions=None):
+        now = time.time()
+        versions = versions or {}
+        with self._lock:
+            seen = self._set(source)
+            for doc_id in doc_ids:
+                seen.add(doc_id, now, versions.get(doc_id))
+
+    def stats(self):
+        with self._lock:
+            return {source: seen.stats() for source, seen in self._sets.items()}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Seen-ID snapshot not loaded from {self.path}: {e}")
+            return
+        now = time.time()
+        with self._lock:
+            for source, entries in data.items():
+                seen = self._set(source)
+                # Versioned entries are stored as [marked_at, version]
+                entries = {doc_id: entry if isinstance(entry, list) else [entry, None] for doc_id, entry in entries.items()}
+                for doc_id, (marked_at, version) in sorted(entries.items(), key=lambda item: item[1][0]):
+                    if now - marked_at < self.ttl:
+                        seen.add(doc_id, marked_at, version)
+
+    def save(self):
+        """Write the sets to SEEN_IDS_PATH atomically. No-op without a path."""
+        if not self.path:
+            return
+        with self._lock:
+            data = {source: {doc_id: [marked_at, seen._versions[doc_id]] if doc_id in seen._versions else marked_at
+                             for doc_id, marked_at in seen._entries.items()}
+                    for source, seen in self._sets.items()}
+        with self._save_lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+
+seen_ids = SeenIdRegistry(path=os.environ.get('SEEN_IDS_PATH'))
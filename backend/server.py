@@ -1,17 +1,33 @@
-from flask import jsonify, request, Flask
+from flask import jsonify, request, Flask, Response, stream_with_context
 from flask_cors import CORS
 from flask_caching import Cache
-import requests
 import os
 import datetime
 import json
-import csv
-import io
+import threading
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from marshmallow import ValidationError
 import firebase_admin
 from firebase_admin import credentials, auth, messaging, firestore
-from schemas import GeneratePromptRequestSchema, AlertRecommendationSchema
+from schemas import GeneratePromptRequestSchema, BatchPromptRequestSchema, UserLocationSchema, AreaPushRequestSchema, AffectingAlertsQuerySchema, AlertRecommendationSchema, NearbyAlertsQuerySchema, NotificationsQuerySchema
+from sources import SOURCES, SourceBusyError, SourceConfigError, UpstreamError, run_source, run_all
+from scheduler import scheduler
+from upstream import upstream
+from seen_ids import seen_ids
+from watermarks import watermarks
+from geo import encode_geohash, query_near, quantize
+from dispatch import dispatch, resolve_targets
+from polygons import contains, in_bbox, point_cells
+from pagination import encode_cursor, decode_cursor
+from token_cache import token_cache
+from caching import TTLCache
+from singleflight import SingleFlight
+from streaming import PartialJSONFields, sse_event
+from retrieval import LocalVectorIndex, DEFAULT_INDEX_PATH
+from playbooks import load_playbooks
+from recommendation_keys import HazardHitCounter, coarse_region, is_coastal, recommendation_key
+from rag_snapshot import RagSnapshot, DEFAULT_SNAPSHOT_PATH, playbook_hashes, warm as warm_rag_snapshot
 from pinecone import Pinecone
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -29,16 +45,63 @@ else:
     print("❌ NASA_FIRMS_KEY NOT FOUND in environment.")
 
 # --- Cache Configuration ---
-app.config['CACHE_TYPE'] = 'SimpleCache'
+# The SQLite backend is shared by every worker process on the host;
+# CACHE_TYPE=SimpleCache restores the old per-process cache.
+app.config['CACHE_TYPE'] = os.environ.get('CACHE_TYPE', 'sqlite_cache.SQLiteCache')
+app.config['CACHE_SQLITE_PATH'] = os.environ.get('CACHE_SQLITE_PATH')  # Default: app.instance_path
+app.config['CACHE_THRESHOLD'] = int(os.environ.get('CACHE_THRESHOLD', 5000))
 app.config['CACHE_DEFAULT_TIMEOUT'] = 86400 # 24 hours in seconds
 cache = Cache(app)
 
 CORS(app)
 
 # --- Initialize Clients ---
-pc = Pinecone(api_key=os.environ.get('PINECONE_API_KEY'))
 openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
-index = pc.Index("guardianly-playbooks")
+
+# Pinecone and the playbook index are set up on first retrieval, not at
+# import, so tests and worker boot never open a Pinecone connection.
+PLAYBOOK_INDEX_PATH = os.environ.get('PLAYBOOK_INDEX_PATH', DEFAULT_INDEX_PATH)
+pinecone_index = None
+index = None
+_index_lock = threading.Lock()
+_playbook_load_lock = threading.Lock()
+
+def get_pinecone_index():
+    global pinecone_index
+    with _index_lock:
+        if pinecone_index is None:
+            pinecone_index = Pinecone(api_key=os.environ.get('PINECONE_API_KEY')).Index("guardianly-playbooks")
+        return pinecone_index
+
+def load_playbook_index():
+    """
+    RAG_BACKEND=local (default) answers playbook retrieval from the in-process
+    LocalVectorIndex, loading its snapshot or bootstrapping it from Pinecone
+    once. RAG_BACKEND=pinecone, or any failure to build the local index,
+    keeps querying Pinecone.
+    """
+    if os.environ.get('RAG_BACKEND', 'local') != 'local':
+        return get_pinecone_index()
+    try:
+        if os.path.exists(PLAYBOOK_INDEX_PATH):
+            local_index = LocalVectorIndex.load(PLAYBOOK_INDEX_PATH)
+        else:
+            local_index = LocalVectorIndex.from_pinecone(get_pinecone_index(), [p['id'] for p in load_playbooks()])
+            local_index.save(PLAYBOOK_INDEX_PATH)
+        print(f"Local playbook index loaded ({len(local_index)} vectors)")
+        return local_index
+    except Exception as e:
+        print(f"Warning: Local playbook index unavailable, using Pinecone. Error: {e}")
+        return get_pinecone_index()
+
+def get_playbook_index():
+    """READ: The playbook index, loaded on first use"""
+    global index
+    if index is None:
+        with _playbook_load_lock:
+            if index is None:
+                index = load_playbook_index()
+    return index
 
 MAPBOX_ACCESS_TOKEN = os.environ.get('MAPBOX_ACCESS_TOKEN', 'your_mapbox_token_here')
 
@@ -48,6 +111,9 @@ try:
     firebase_admin.initialize_app(cred)
     db = firestore.client()
     print("Firebase Admin & Firestore Initialized")
+    # Opt-in: run the sync sources on their own cadence inside this process
+    if os.environ.get('SYNC_SCHEDULER_ENABLED') == '1':
+        scheduler.start(db)
 except Exception as e:
     print(f"Warning: Firebase Admin failed to initialize. Error: {e}")
 
@@ -61,14 +127,24 @@ def check_token(f):
 
         try:
             token = auth_header.split('Bearer ')[1]
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = token_cache.verify(token, auth.verify_id_token)
             request.uid = decoded_token['uid'] 
+            request.claims = decoded_token
         except Exception as e:
             return jsonify({'status': 'error', 'message': f'Invalid token: {str(e)}'}), 401
 
         return f(*args, **kwargs)
     return wrap
 
+def check_admin(f):
+    """Use under @check_token: only users with the `admin` custom claim get through."""
+    @wraps(f)
+    def wrap(*args, **kwargs):
+        if request.claims.get('admin') is not True:
+            return jsonify({'status': 'error', 'message': 'Admin privileges required'}), 403
+        return f(*args, **kwargs)
+    return wrap
+
 @app.route('/')
 def home():
     return jsonify({
@@ -76,7 +152,11 @@ def home():
         'endpoints': {
             'profile': '/api/profile (GET, requires auth)',
             'push_notification': '/api/push (POST, requires auth)',
-            'get_notifications': '/api/notifications (GET, requires auth)',
+            'push_area': '/api/push/area (POST, requires admin auth)',
+            'user_location': '/api/users/location (POST, requires auth)',
+            'get_notifications': '/api/notifications (GET, requires auth, optional ?cursor= or ?since=)',
+            'nearby_alerts': '/api/alerts/nearby?lat=44.56&lng=-123.26&radius_km=25 (GET, requires auth)',
+            'affecting_alerts': '/api/alerts/affecting?lat=44.56&lng=-123.26 (GET, requires auth)',
             'create_alert': '/api/alerts (POST)',
             'update_alert': '/api/alerts/<id> (PUT)',
             'delete_alert': '/api/alerts/<id> (DELETE)',
@@ -85,7 +165,11 @@ def home():
             'sync_gdacs': '/api/sync/gdacs (POST)',
             'sync_eonet': '/api/sync/eonet (POST)',
             'sync_firms': '/api/sync/firms (POST)',
-            'generate_prompt': '/api/generate_prompt (POST, requires auth)',
+            'sync_all': '/api/sync/all (POST, optional ?sources=usgs,nws)',
+            'sync_status': '/api/sync/status (GET)',
+            'cache_metrics': '/api/metrics/cache (GET)',
+            'generate_prompt': '/api/generate_prompt (POST, requires auth, optional ?stream=1 for SSE)',
+            'generate_prompt_batch': '/api/generate_prompt/batch (POST, requires auth)',
             'geocoding': '/geocode?place=Corvallis',
             'directions': '/directions?start=Corvallis,OR&end=Albany,OR'
         }
@@ -108,6 +192,25 @@ def get_profile():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/users/location', methods=['POST'])
+@check_token
+def update_user_location():
+    """UPDATE: Record the device's last known position for area pushes"""
+    try:
+        data = UserLocationSchema().load(request.get_json())
+    except ValidationError as err:
+        return jsonify({"error": "Invalid input data", "messages": err.messages}), 400
+    try:
+        db.collection('users').document(request.uid).set({
+            'last_lat': data['lat'],
+            'last_lng': data['lng'],
+            'geohash': encode_geohash(data['lat'], data['lng']),
+            'location_updated_at': firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+        return jsonify({'status': 'success'}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 # --- Alert & Notification Endpoints (CRUD) ---
 
 @app.route('/api/alerts', methods=['POST'])
@@ -124,8 +227,10 @@ def create_alert():
             'lat': data.get('lat', 0.0),
             'lng': data.get('lng', 0.0),
             'timestamp': firestore.SERVER_TIMESTAMP,
+            'updated_at': firestore.SERVER_TIMESTAMP,
             'source': 'User'
         }
+        alert_payload['geohash'] = encode_geohash(alert_payload['lat'], alert_payload['lng'])
 
         new_alert_ref.set(alert_payload)
         return jsonify({'status': 'success', 'message': 'Alert created!', 'id': new_alert_ref.id}), 201
@@ -133,288 +238,218 @@ def create_alert():
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+def _serialize_alert(doc_id, alert_data):
+    alert_data['id'] = doc_id
+    for field in ('timestamp', 'updated_at'):
+        if field in alert_data and alert_data[field] is not None:
+            alert_data[field] = alert_data[field].isoformat()
+    return alert_data
+
 @app.route('/api/notifications', methods=['GET'])
 @check_token
 def get_notifications():
-    """READ: Retrieve all alerts sorted by newest"""
+    """
+    READ: Retrieve alerts sorted by newest.
+    ?cursor=<next_cursor> pages further back; ?since=<sync_cursor> returns only
+    alerts created or changed after that point, oldest change first.
+    Responses carry an ETag so an unchanged poll is answered with 304.
+    """
     try:
-        alerts_ref = db.collection('alerts')
-        docs = alerts_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(50).stream()
-
-        notifications = []
-        for doc in docs:
-            alert_data = doc.to_dict()
-            alert_data['id'] = doc.id 
-            if 'timestamp' in alert_data and alert_data['timestamp'] is not None:
-                alert_data['timestamp'] = alert_data['timestamp'].isoformat()
-            notifications.append(alert_data)
+        params = NotificationsQuerySchema().load(request.args)
+        cursor = decode_cursor(params['cursor']) if 'cursor' in params else None
+        since = decode_cursor(params['since']) if 'since' in params else None
+    except (ValidationError, ValueError) as err:
+        messages = err.messages if isinstance(err, ValidationError) else str(err)
+        return jsonify({"error": "Invalid input data", "messages": messages}), 400
 
-        return jsonify({'status': 'success', 'notifications': notifications}), 200
+    try:
+        alerts_ref = db.collection('alerts')
+        limit = params['limit']
+        body = {'status': 'success'}
+
+        if since:
+            # Delta sync: walk forward through changes after the client's cursor
+            since_ts, since_id = since
+            docs = list(alerts_ref
+                        .order_by('updated_at')
+                        .order_by('__name__')
+                        .start_after({'updated_at': since_ts, '__name__': since_id})
+                        .limit(limit).stream())
+            last = docs[-1] if docs else None
+            body['sync_cursor'] = encode_cursor(last.get('updated_at'), last.id) if last else params['since']
+            body['has_more'] = len(docs) == limit
+        else:
+            query = (alerts_ref
+                     .order_by('timestamp', direction=firestore.Query.DESCENDING)
+                     .order_by('__name__', direction=firestore.Query.DESCENDING))
+            if cursor:
+                cursor_ts, cursor_id = cursor
+                query = query.start_after({'timestamp': cursor_ts, '__name__': cursor_id})
+            docs = list(query.limit(limit).stream())
+            last = docs[-1] if docs else None
+            body['next_cursor'] = encode_cursor(last.get('timestamp'), last.id) if len(docs) == limit else None
+            if not cursor:
+                # Delta polling starts from the most recent change in the collection
+                latest = list(alerts_ref.order_by('updated_at', direction=firestore.Query.DESCENDING)
+                              .order_by('__name__', direction=firestore.Query.DESCENDING).limit(1).stream())
+                body['sync_cursor'] = encode_cursor(latest[0].get('updated_at'), latest[0].id) if latest else None
+
+        body['notifications'] = [_serialize_alert(doc.id, doc.to_dict()) for doc in docs]
+
+        response = jsonify(body)
+        response.add_etag()
+        return response.make_conditional(request)
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
-# --- External API Sync Endpoints ---
+NEARBY_CELL_LIMIT = int(os.environ.get('NEARBY_CELL_LIMIT', 2000))  # Docs read per covering cell
 
-@app.route('/api/sync/usgs', methods=['POST'])
-def sync_usgs():
-    """FETCH: Pull real-time earthquake data from USGS and save as alerts"""
-    url = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
+@app.route('/api/alerts/nearby', methods=['GET'])
+@check_token
+def get_nearby_alerts():
+    """READ: Alerts within radius_km of lat/lng, newest first"""
+    try:
+        params = NearbyAlertsQuerySchema().load(request.args)
+    except ValidationError as err:
+        return jsonify({"error": "Invalid input data", "messages": err.messages}), 400
 
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        scan = {'truncated': False}
+        matches = list(query_near(db.collection('alerts'), params['lat'], params['lng'], params['radius_km'],
+                                  per_cell_limit=NEARBY_CELL_LIMIT, stats=scan))
+        # Cell-range queries come back in geohash order; sort newest first here
+        oldest = datetime.datetime.min.replace(tzinfo=datetime.timezone.utc)
+        matches.sort(key=lambda match: match[1].get('timestamp') or oldest, reverse=True)
+
+        alerts = []
+        for doc, data, distance in matches[:params['limit']]:
+            alert = _serialize_alert(doc.id, data)
+            alert['distance_km'] = round(distance, 3)
+            alerts.append(alert)
+
+        # A capped cell may have hidden newer alerts; tell the client instead of failing silently
+        return jsonify({'status': 'success', 'radius_km': params['radius_km'], 'alerts': alerts,
+                        'truncated': scan['truncated']}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
 
-        new_count = 0
-        for feature in data.get('features', []):
-            eq_id = feature['id']
-            props = feature['properties']
-            geom = feature['geometry']
+@app.route('/api/alerts/affecting', methods=['GET'])
+@check_token
+def get_affecting_alerts():
+    """
+    READ: Area alerts whose polygon contains lat/lng. Candidates come from one
+    cover_cells query, then a bbox check, then point-in-polygon.
+    """
+    try:
+        params = AffectingAlertsQuerySchema().load(request.args)
+    except ValidationError as err:
+        return jsonify({"error": "Invalid input data", "messages": err.messages}), 400
 
-            if props['mag'] < 1.0:
+    lat, lng = params['lat'], params['lng']
+    try:
+        query = db.collection('alerts').where(
+            filter=firestore.FieldFilter('cover_cells', 'array_contains_any', point_cells(lat, lng)))
+        candidates = 0
+        alerts = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            if not data.get('bbox') or not in_bbox(data['bbox'], lat, lng):
                 continue
+            candidates += 1
+            if contains(data, lat, lng):
+                alerts.append(_serialize_alert(doc.id, data))
+        return jsonify({'status': 'success', 'candidates': candidates, 'alerts': alerts}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
 
-            doc_id = f"usgs_{eq_id}"
-            alert_ref = db.collection('alerts').document(doc_id)
-
-            if not alert_ref.get().exists:
-                alert_ref.set({
-                    'title': f"Earthquake: M{props['mag']}",
-                    'message': f"Significant activity recorded at {props['place']}.",
-                    'hazardType': 'earthquake',
-                    'lat': geom['coordinates'][1],
-                    'lng': geom['coordinates'][0],
-                    'timestamp': firestore.SERVER_TIMESTAMP,
-                    'external_id': eq_id,
-                    'source': 'USGS',
-                    'url': props['url']
-                })
-                new_count += 1
-
-        return jsonify({'status': 'success', 'message': f'USGS sync complete. Added {new_count} new alerts.'}), 200
+# --- External API Sync Endpoints ---
 
+def _sync_endpoint(name, success_message):
+    """Run one upstream source and translate the outcome into a JSON response."""
+    label = SOURCES[name].label
+    try:
+        stats = run_source(db, name)
+        return jsonify({'status': 'success', 'message': success_message.format(**stats), 'stats': stats}), 200
+    except SourceConfigError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except SourceBusyError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 409
+    except UpstreamError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), e.status_code
     except Exception as e:
-        print(f"USGS Sync Error: {e}")
+        print(f"{label} Sync Error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/api/sync/usgs', methods=['POST'])
+def sync_usgs():
+    """FETCH: Pull real-time earthquake data from USGS and save as alerts"""
+    return _sync_endpoint('usgs', "USGS sync complete. Added {written} new alerts.")
+
 @app.route('/api/sync/nws', methods=['POST'])
 def sync_nws():
     """FETCH: Pull active weather alerts from National Weather Service (US Only)"""
-    url = "https://api.weather.gov/alerts/active?status=actual&message_type=alert"
-    headers = {"User-Agent": "(guardianly.app, contact@guardianly.app)"}
-
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        new_count = 0
-        for feature in data.get('features', []):
-            props = feature['properties']
-            alert_id = props['id']
-
-            severity = props.get('severity', 'Unknown')
-            if severity not in ['Extreme', 'Severe']:
-                continue
-
-            doc_id = f"nws_{alert_id}"
-            alert_ref = db.collection('alerts').document(doc_id)
-
-            if not alert_ref.get().exists:
-                geom = feature.get('geometry')
-                lat, lng = 0.0, 0.0
-
-                if geom:
-                    if geom['type'] == 'Point':
-                        lng, lat = geom['coordinates']
-                    elif geom['type'] in ['Polygon', 'MultiPolygon']:
-                        coords = geom['coordinates'][0]
-                        while isinstance(coords[0], list):
-                            coords = coords[0]
-                        lng, lat = coords
-
-                alert_ref.set({
-                    'title': props.get('event', 'Weather Alert'),
-                    'message': props.get('headline', 'Severe weather warning issued.'),
-                    'hazardType': 'severe_weather',
-                    'lat': lat,
-                    'lng': lng,
-                    'timestamp': firestore.SERVER_TIMESTAMP,
-                    'external_id': alert_id,
-                    'source': 'NWS',
-                    'severity': severity
-                })
-                new_count += 1
-
-        return jsonify({'status': 'success', 'message': f'NWS sync complete. Added {new_count} severe weather alerts.'}), 200
-
-    except Exception as e:
-        print(f"NWS Sync Error: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return _sync_endpoint('nws', "NWS sync complete. Added {written} severe weather alerts.")
 
 @app.route('/api/sync/eonet', methods=['POST'])
 def sync_eonet():
     """FETCH: Pull natural events from NASA EONET v3 (Limited to last 7 days)"""
-    # Added ?days=7 to reduce the amount of data processed
-    url = "https://eonet.gsfc.nasa.gov/api/v3/events?days=7&status=open"
-
-    try:
-        print(f"Connecting to NASA EONET...")
-        response = requests.get(url, timeout=25)
-        response.raise_for_status()
-        data = response.json()
-
-        category_mapping = {
-            'wildfires': 'wildfire',
-            'volcanoes': 'volcanic_eruption',
-            'severeStorms': 'severe_weather',
-            'floods': 'flood',
-            'tempExtremes': 'extreme_heat'
-        }
-
-        new_count = 0
-        events = data.get('events', [])
-        print(f"Processing {len(events)} NASA EONET events...")
-
-        for event in events:
-            event_id = event['id']
-            title = event['title']
-            categories = event.get('categories', [])
-            if not categories: continue
-
-            eonet_cat = categories[0]['id']
-            internal_type = category_mapping.get(eonet_cat)
-            if not internal_type: continue
-
-            doc_id = f"eonet_{event_id}"
-            alert_ref = db.collection('alerts').document(doc_id)
-
-            if not alert_ref.get().exists:
-                geoms = event.get('geometries', [])
-                if not geoms: continue
-                lng, lat = geoms[0]['coordinates']
-
-                alert_ref.set({
-                    'title': title,
-                    'message': f"Global event reported: {title}",
-                    'hazardType': internal_type,
-                    'lat': lat,
-                    'lng': lng,
-                    'timestamp': firestore.SERVER_TIMESTAMP,
-                    'external_id': event_id,
-                    'source': 'NASA EONET'
-                })
-                new_count += 1
-
-        return jsonify({'status': 'success', 'message': f'NASA EONET synced {new_count} events.'}), 200
-    except Exception as e:
-        print(f"NASA EONET Sync Error: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return _sync_endpoint('eonet', "NASA EONET synced {written} events.")
 
 @app.route('/api/sync/gdacs', methods=['POST'])
 def sync_gdacs():
     """FETCH: Pull global disaster alerts from GDACS robustly"""
-    url = "https://www.gdacs.org/xml/gdacs.geojson"
-
-    try:
-        print(f"Connecting to GDACS...")
-        response = requests.get(url, stream=True, timeout=30)
-        response.raise_for_status()
-        data = json.loads(response.content)
-
-        type_mapping = {
-            'TC': 'hurricane',
-            'EQ': 'earthquake',
-            'FL': 'flood',
-            'VO': 'volcanic_eruption',
-            'WF': 'wildfire',
-            'DR': 'extreme_heat'
-        }
-
-        new_count = 0
-        features = data.get('features', [] )
-        print(f"Processing {len(features)} GDACS features...")
-
-        for feature in features:
-            props = feature['properties']
-            event_id = props.get('eventid')
-            event_type = props.get('eventtype')
-
-            alert_level = props.get('alertlevel', 'Green')
-            if alert_level not in ['Orange', 'Red']:
-                continue
-
-            internal_type = type_mapping.get(event_type, 'general')
-            doc_id = f"gdacs_{event_type}_{event_id}"
-            alert_ref = db.collection('alerts').document(doc_id)
-
-            if not alert_ref.get().exists:
-                geom = feature.get('geometry')
-                if geom and geom['type'] == 'Point':
-                    lng, lat = geom['coordinates']
-
-                    alert_ref.set({
-                        'title': f"{alert_level} Alert: {props.get('eventname', 'Global Disaster')}",
-                        'message': props.get('description', 'High-impact disaster event reported.'),
-                        'hazardType': internal_type,
-                        'lat': lat,
-                        'lng': lng,
-                        'timestamp': firestore.SERVER_TIMESTAMP,
-                        'external_id': str(event_id),
-                        'source': 'GDACS',
-                        'alertlevel': alert_level
-                    })
-                    new_count += 1
-
-        return jsonify({'status': 'success', 'message': f'GDACS sync complete. Added {new_count} alerts.'}), 200
-    except Exception as e:
-        print(f"GDACS Sync Error: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    return _sync_endpoint('gdacs', "GDACS sync complete. Added {written} alerts.")
 
 @app.route('/api/sync/firms', methods=['POST'])
 def sync_firms():
-    """FETCH: Pull fire hotspot data from NASA FIRMS (Global)"""
-    map_key = os.environ.get('NASA_FIRMS_KEY')
-    if not map_key:
-        return jsonify({'status': 'error', 'message': 'NASA_FIRMS_KEY missing from .env'}), 400
-
-    url = f"https://firms.modaps.eosdis.nasa.gov/api/area/csv/{map_key}/VIIRS_SNPP_NRT/-125,32,-114,49/1"
-
-    try:
-        print(f"Connecting to NASA FIRMS...")
-        response = requests.get(url, timeout=15)
-        if response.status_code != 200:
-            return jsonify({'status': 'error', 'message': 'Failed to fetch NASA FIRMS data.'}), response.status_code
-
-        new_count = 0
-        f = io.StringIO(response.text)
-        reader = csv.DictReader(f)
-        for row in reader:
-            lat = float(row['latitude'])
-            lng = float(row['longitude'])
-            acq_date = row['acq_date']
-            confidence = row.get('confidence', 'n/a')
-
-            doc_id = f"firms_{lat}_{lng}_{acq_date}".replace('.', '_')
-            alert_ref = db.collection('alerts').document(doc_id)
-
-            if not alert_ref.get().exists:
-                alert_ref.set({
-                    'title': "Active Fire Hotspot",
-                    'message': f"Satellite detected thermal anomaly with {confidence} confidence.",
-                    'hazardType': 'wildfire',
-                    'lat': lat,
-                    'lng': lng,
-                    'timestamp': firestore.SERVER_TIMESTAMP,
-                    'source': 'NASA FIRMS',
-                    'acq_date': acq_date
-                })
-                new_count += 1
-
-        return jsonify({'status': 'success', 'message': f'NASA FIRMS synced {new_count} hotspots.'}), 200
-    except Exception as e:
-        print(f"NASA FIRMS Sync Error: {e}")
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+    """FETCH: Pull fire hotspot clusters from NASA FIRMS (FIRMS_REGIONS)"""
+    return _sync_endpoint('firms', "NASA FIRMS synced {written} new and {updated} updated fire clusters.")
+
+@app.route('/api/sync/all', methods=['POST'])
+def sync_all():
+    """FETCH: Pull every upstream feed concurrently with per-source deadlines"""
+    requested = request.args.get('sources')
+    names = [n.strip() for n in requested.split(',')] if requested else None
+    unknown = [n for n in (names or []) if n not in SOURCES]
+    if unknown:
+        return jsonify({'status': 'error', 'message': f"Unknown sources: {', '.join(unknown)}"}), 400
+
+    report = run_all(db, names)
+    written = sum(r.get('written', 0) for r in report.values())
+    failed = [name for name, r in report.items() if r['status'] != 'success']
+    return jsonify({
+        'status': 'partial' if failed else 'success',
+        'message': f"Sync complete. Added {written} alerts across {len(report)} sources.",
+        'sources': report
+    }), 200
+
+@app.route('/api/sync/status', methods=['GET'])
+def sync_status():
+    """READ: Background scheduler state per source (last run, items, next run)"""
+    return jsonify({
+        'status': 'success',
+        'scheduler': scheduler.status(),
+        'upstream': upstream.stats(),
+        'seen_ids': seen_ids.stats(),
+        'watermarks': watermarks.stats()
+    }), 200
+
+# --- Metrics ---
+
+@app.route('/api/metrics/cache', methods=['GET'])
+def cache_metrics():
+    """READ: Hit rates and sizes of the in-process caches"""
+    return jsonify({'status': 'success', 'caches': {
+        'verified_tokens': token_cache.stats(),
+        'reverse_geocode': reverse_geocode_cache.stats(),
+        'geocode': geocode_cache.stats(),
+        'directions': directions_cache.stats(),
+        'rag_snapshot': rag_snapshot.stats(),
+        'memoize': cache.cache.stats() if hasattr(cache.cache, 'stats') else None,
+        'recommendations': recommendation_hits.stats(),
+    }, 'single_flight': {
+        flight.name: flight.stats() for flight in (rag_flight, recommendation_flight, reverse_geocode_flight)
+    }}), 200
 
 # --- Mapbox Endpoints & AI Logic ---
 
@@ -441,63 +476,140 @@ def push_endpoint():
         db.collection('alerts').add({
             "user": request.uid, "title": data["title"], "message": data["message"],
             "hazardType": data.get('hazardType', 'general'), "lat": lat, "lng": lng,
-            "timestamp": firestore.SERVER_TIMESTAMP, "message_id": response
+            "geohash": encode_geohash(float(lat), float(lng)),
+            "timestamp": firestore.SERVER_TIMESTAMP, "updated_at": firestore.SERVER_TIMESTAMP,
+            "message_id": response
         })
         return jsonify({"status": "success", "message_id": response}), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+PUSH_CONCURRENCY = int(os.environ.get('PUSH_CONCURRENCY', 4))
+
+@app.route('/api/push/area', methods=['POST'])
+@check_token
+@check_admin
+def push_area_endpoint():
+    """CREATE: Notify every user last seen within radius_km, in multicast batches"""
+    try:
+        data = AreaPushRequestSchema().load(request.get_json())
+    except ValidationError as err:
+        return jsonify({"error": "Invalid input data", "messages": err.messages}), 400
+    try:
+        targets = resolve_targets(db, data['lat'], data['lng'], data['radius_km'])
+        report = dispatch(db, targets, data['title'], data['message'],
+                          data={"lat": data['lat'], "lng": data['lng'], "icon": data['icon'], "color": data['color']},
+                          concurrency=PUSH_CONCURRENCY)
+        db.collection('alerts').add({
+            "user": request.uid, "title": data["title"], "message": data["message"],
+            "hazardType": data['hazardType'], "lat": data['lat'], "lng": data['lng'],
+            "geohash": encode_geohash(data['lat'], data['lng']), "radius_km": data['radius_km'],
+            "timestamp": firestore.SERVER_TIMESTAMP, "updated_at": firestore.SERVER_TIMESTAMP,
+            "recipients": report['success']
+        })
+        return jsonify({"status": "success", "report": report}), 200
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# --- Mapbox Response Caches ---
+# Popular searches and routes (e.g. the default Corvallis -> Albany) repeat
+# constantly. Queries are normalized before keying so trivially different
+# spellings share an entry, and stale entries are served while a background
+# refresh runs.
+MAPBOX_TIMEOUT = 5
+geocode_cache = TTLCache('geocode', max_entries=5000, ttl=24 * 3600, negative_ttl=30, stale_ttl=7 * 86400)
+directions_cache = TTLCache('directions', max_entries=2000, ttl=10 * 60, negative_ttl=30, stale_ttl=3600)
+
+def normalize_place(place):
+    """Case- and whitespace-fold a free-text place ('  Corvallis ,OR' -> 'corvallis, or')."""
+    parts = [' '.join(part.split()) for part in place.casefold().split(',')]
+    return ', '.join(part for part in parts if part)
+
+def normalize_waypoint(waypoint):
+    """Round 'lng,lat' coordinates to ~11 m; fall back to place normalization."""
+    try:
+        lng, lat = (float(value) for value in waypoint.split(','))
+        return f"{round(lng, 4)},{round(lat, 4)}"
+    except ValueError:
+        return normalize_place(waypoint)
+
 @app.route('/geocode')
 def geocode():
     place = request.args.get('place', 'Corvallis OR')
-    url = f'https://api.mapbox.com/geocoding/v5/mapbox.places/{place}.json'
-    params = {'access_token': MAPBOX_ACCESS_TOKEN, 'limit': 5}
-    try:
-        response = requests.get(url, params=params)
+    normalized = normalize_place(place)
+
+    def load():
+        url = f'https://api.mapbox.com/geocoding/v5/mapbox.places/{normalized}.json'
+        params = {'access_token': MAPBOX_ACCESS_TOKEN, 'limit': 5}
+        response = upstream.get(url, source='mapbox', params=params, timeout=MAPBOX_TIMEOUT)
         response.raise_for_status()
-        return jsonify({'query': place, 'results': response.json().get('features', [])})
-    except requests.exceptions.RequestException as e:
+        return response.json().get('features', [])
+
+    try:
+        return jsonify({'query': place, 'results': geocode_cache.get_or_load(normalized, load)})
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/reverse')
 def reverse_geocode():
     lng = request.args.get('lng', '-123.262')
     lat = request.args.get('lat', '44.565')
-    url = f'https://api.mapbox.com/geocoding/v5/mapbox.places/{lng},{lat}.json'
-    params = {'access_token': MAPBOX_ACCESS_TOKEN}
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return jsonify({'coordinates': {'lng': lng, 'lat': lat}, 'results': response.json().get('features', [])})
-    except requests.exceptions.RequestException as e:
+        lat_value, lng_value = float(lat), float(lng)
+    except ValueError:
+        return jsonify({'error': 'lat and lng must be numbers'}), 400
+    try:
+        return jsonify({'coordinates': {'lng': lng, 'lat': lat}, 'results': reverse_geocode_features(lat_value, lng_value)})
+    except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/directions')
 def directions():
-    start = request.args.get('start', 'Corvallis,OR')
-    end = request.args.get('end', 'Albany,OR')
-    profile = request.args.get('profile', 'driving')
-    try:
+    start = normalize_waypoint(request.args.get('start', 'Corvallis,OR'))
+    end = normalize_waypoint(request.args.get('end', 'Albany,OR'))
+    profile = request.args.get('profile', 'driving').strip().lower()
+
+    def load():
         url = f'https://api.mapbox.com/directions/v5/mapbox/{profile}/{start};{end}'
         params = {'access_token': MAPBOX_ACCESS_TOKEN, 'geometries': 'geojson', 'steps': 'true'}
-        response = requests.get(url, params=params)
+        response = upstream.get(url, source='mapbox', params=params, timeout=MAPBOX_TIMEOUT)
         response.raise_for_status()
-        return jsonify({'routes': response.json().get('routes', [])})
+        return response.json().get('routes', [])
+
+    try:
+        return jsonify({'routes': directions_cache.get_or_load((profile, start, end), load)})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def get_human_readable_location(lat, lng):
-    url = f'https://api.mapbox.com/geocoding/v5/mapbox.places/{lng},{lat}.json'
-    params = {'access_token': MAPBOX_ACCESS_TOKEN}
-    try:
-        response = requests.get(url, params=params, timeout=3)
-        if response.status_code == 200:
-            features = response.json().get('features', [])
-            if features:
-                return features[0].get('place_name', f"coordinates {lat}, {lng}")
-    except Exception:
-        pass
-    return f"coordinates {lat}, {lng}"
+# --- Reverse Geocoding Cache ---
+# Users in the same neighbourhood send near-identical coordinates, so lookups
+# are snapped to a ~REVERSE_GEOCODE_PRECISION_M cell and the Mapbox answer for
+# the cell centre is shared by /reverse and the generate_prompt path.
+REVERSE_GEOCODE_PRECISION_M = float(os.environ.get('REVERSE_GEOCODE_PRECISION_M', 100))
+reverse_geocode_cache = TTLCache(
+    'reverse_geocode',
+    max_entries=int(os.environ.get('REVERSE_GEOCODE_CACHE_SIZE', 20000)),
+    ttl=int(os.environ.get('REVERSE_GEOCODE_TTL', 7 * 86400)),
+    negative_ttl=60,
+)
+
+# Concurrent misses on the same key share one upstream call
+reverse_geocode_flight = SingleFlight('reverse_geocode')
+rag_flight = SingleFlight('rag_context')
+recommendation_flight = SingleFlight('recommendation')
+
+def reverse_geocode_features(lat, lng):
+    cell_lat, cell_lng = quantize(lat, lng, REVERSE_GEOCODE_PRECISION_M)
+
+    def load():
+        url = f'https://api.mapbox.com/geocoding/v5/mapbox.places/{cell_lng},{cell_lat}.json'
+        params = {'access_token': MAPBOX_ACCESS_TOKEN}
+        response = upstream.get(url, source='mapbox', params=params, timeout=3)
+        response.raise_for_status()
+        return response.json().get('features', [])
+
+    key = (cell_lat, cell_lng)
+    return reverse_geocode_cache.get_or_load(key, lambda: reverse_geocode_flight.do(key, load))
 
 SUPPORTED_HAZARDS = {
     "flood", "building_fire", "wildfire", "hurricane",
@@ -513,24 +625,73 @@ SUPPORTED_HAZARDS = {
     "high_wind", "coastal_hazard",
 }
 
-@cache.memoize(timeout=86400) 
-def get_retrieved_context(hazard_key):
+def retrieve_context(hazard_key):
+    """Embed the hazard query and return the best playbook text, or None below the score threshold. Raises on failure."""
     query_text = f"Standard operating procedures and protocols for a {hazard_key} emergency."
+    response = openai_client.embeddings.create(input=query_text, model="text-embedding-3-small")
+    query_vector = response.data[0].embedding
+    search_results = get_playbook_index().query(vector=query_vector, top_k=1, include_metadata=True, filter={"hazard": {"$eq": hazard_key}})
+    matches = search_results.matches
+    if not matches: return None
+    top_match = matches[0]
+    if top_match.score < 0.40: return None
+    return top_match.metadata.get('text', '')
+
+def get_retrieved_context(hazard_key):
+    """READ: Playbook context for a hazard, from the RAG snapshot (invalidated by playbook hash) or retrieval"""
+    found, context = rag_snapshot.get(hazard_key)
+    if found:
+        return context
+
+    def load():
+        context = retrieve_context(hazard_key)
+        # Only successful lookups are persisted; errors stay retryable
+        rag_snapshot.put(hazard_key, context)
+        try:
+            rag_snapshot.save()
+        except OSError as e:
+            print(f"Warning: RAG snapshot not saved. Error: {e}")
+        return context
+
     try:
-        response = openai_client.embeddings.create(input=query_text, model="text-embedding-3-small")
-        query_vector = response.data[0].embedding
-        search_results = index.query(vector=query_vector, top_k=1, include_metadata=True, filter={"hazard": {"$eq": hazard_key}})
-        matches = search_results.matches
-        if not matches: return None
-        top_match = matches[0]
-        if top_match.score < 0.40: return None
-        return top_match.metadata.get('text', '')
+        return rag_flight.do(hazard_key, load)
     except Exception as e:
         print(f"RAG Retrieval Critical Error: {type(e).__name__} - {str(e)}")
         return None
 
-@cache.memoize(timeout=3600)
-def generate_ai_recommendation(hazard_display, event_description, retrieved_context, location_string):
+def warm_rag_cache():
+    """WARM: Fill the RAG snapshot for every supported hazard not already in it."""
+    try:
+        result = warm_rag_snapshot(rag_snapshot, SUPPORTED_HAZARDS, retrieve_context)
+        print(f"RAG warm-up: {result}")
+        return result
+    except Exception as e:
+        print(f"Warning: RAG warm-up failed. Error: {e}")
+        return None
+
+# --- RAG Context Snapshot ---
+RAG_SNAPSHOT_PATH = os.environ.get('RAG_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+try:
+    rag_snapshot = RagSnapshot(RAG_SNAPSHOT_PATH, playbook_hashes(load_playbooks()))
+except Exception as e:
+    print(f"Warning: Playbooks unreadable, RAG snapshot starts empty. Error: {e}")
+    rag_snapshot = RagSnapshot(RAG_SNAPSHOT_PATH, {})
+# Warmed in the background once the app serves its first request, so
+# importing the module (tests, CLI tools, gunicorn preload) starts no threads
+app.config['RAG_WARM_ON_START'] = os.environ.get('RAG_WARM_ON_START', '1') == '1'
+_rag_warm_started = threading.Event()
+
+@app.before_request
+def start_rag_warm():
+    if _rag_warm_started.is_set() or not app.config['RAG_WARM_ON_START']:
+        return
+    with _playbook_load_lock:
+        if _rag_warm_started.is_set():
+            return
+        _rag_warm_started.set()
+    threading.Thread(target=warm_rag_cache, name='rag-warm-start', daemon=True).start()
+
+def recommendation_messages(hazard_display, event_description, retrieved_context, location_string):
     system_prompt = """
     You are Guardianly, an advanced safety AI. Your goal is to analyze a specific hazard event and the provided safety context to generate a structured alert.
     
@@ -551,14 +712,110 @@ def generate_ai_recommendation(hazard_display, event_description, retrieved_cont
         f"Details (API Metrics): {event_description}\n"
         f"Context (Playbook): {retrieved_context if retrieved_context else 'None.'}"
     )
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_message}]
+
+def generate_ai_recommendation(hazard_display, event_description, retrieved_context, location_string):
     completion = openai_client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": user_message}],
+        messages=recommendation_messages(hazard_display, event_description, retrieved_context, location_string),
         response_format={"type": "json_object"},
         temperature=0.0
     )
     return AlertRecommendationSchema().load(json.loads(completion.choices[0].message.content))
 
+def stream_ai_recommendation(hazard_display, event_description, retrieved_context, location_string):
+    """Yield the completion's text deltas as the model writes them."""
+    stream = openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=recommendation_messages(hazard_display, event_description, retrieved_context, location_string),
+        response_format={"type": "json_object"},
+        temperature=0.0,
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+# --- Recommendation Cache ---
+RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 3600))
+recommendation_hits = HazardHitCounter()
+
+def get_region(lat, lng, event_description=''):
+    """READ: (coarse region name, coastal flag) for a point; the flag also checks the event description"""
+    try:
+        features = reverse_geocode_features(lat, lng)
+    except Exception:
+        features = []
+    region = coarse_region(features, lat, lng)
+    return region, is_coastal(region, event_description, *(f.get('place_name', '') for f in features))
+
+def lookup_recommendation(raw_hazard, event_description, location):
+    """READ: (cache key, region, cached recommendation or None) for a get_region() location"""
+    region, coastal = location
+    key = recommendation_key(raw_hazard, event_description, region, coastal)
+    cached = cache.get(key)
+    recommendation_hits.record(raw_hazard, cached is not None)
+    return key, region, cached
+
+def get_recommendation(raw_hazard, event_description, retrieved_context, location):
+    """
+    FETCH: Recommendation cached on the normalized signals (hazard, magnitude
+    and alert-level buckets, coarse region, coastal flag) rather than the raw
+    description and street address.
+    """
+    key, region, cached = lookup_recommendation(raw_hazard, event_description, location)
+    if cached is not None:
+        return cached
+    hazard_display = raw_hazard.replace("_", " ").title()
+
+    def load():
+        # A previous leader may have filled the cache since our lookup
+        recommendation = cache.get(key)
+        if recommendation is not None:
+            return recommendation
+        recommendation = generate_ai_recommendation(hazard_display, event_description, retrieved_context, region)
+        cache.set(key, recommendation, timeout=RECOMMENDATION_CACHE_TTL)
+        return recommendation
+
+    return recommendation_flight.do(key, load)
+
+def recommendation_events(raw_hazard, event_description, lat, lng):
+    """
+    STREAM: SSE frames for one recommendation. `severity` is sent once its
+    value is complete, `message` as text deltas while the model writes it,
+    and `final` carries the schema-validated object (or `error`).
+    """
+    hazard_display = raw_hazard.replace("_", " ").title()
+    try:
+        retrieved_context = get_retrieved_context(raw_hazard)
+        key, region, cached = lookup_recommendation(raw_hazard, event_description, get_region(lat, lng, event_description))
+        if cached is not None:
+            yield sse_event('severity', {'severity': cached['severity']})
+            yield sse_event('message', {'delta': cached['message']})
+            yield sse_event('final', {"status": "success", "hazard": hazard_display, "recommendation": cached})
+            return
+
+        fields = PartialJSONFields(['severity', 'message'])
+        sent_message = ''
+        for delta in stream_ai_recommendation(hazard_display, event_description, retrieved_context, region):
+            for field, value, complete in fields.feed(delta):
+                if field == 'severity' and complete:
+                    yield sse_event('severity', {'severity': value})
+                elif field == 'message' and len(value) > len(sent_message):
+                    yield sse_event('message', {'delta': value[len(sent_message):]})
+                    sent_message = value
+        recommendation = AlertRecommendationSchema().load(json.loads(fields.text))
+        cache.set(key, recommendation, timeout=RECOMMENDATION_CACHE_TTL)
+        yield sse_event('final', {"status": "success", "hazard": hazard_display, "recommendation": recommendation})
+    except Exception as e:
+        yield sse_event('error', {'status': 'error', 'message': str(e)})
+
+def fallback_recommendation(hazard_display):
+    return {"status": "warning", "hazard": hazard_display, "recommendation": {"severity": "Unknown", "message": f"Caution: {hazard_display} reported.", "actions": ["Stay alert"], "source": "Fallback"}}
+
+def wants_stream():
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
 @app.route('/api/generate_prompt', methods=['POST'])
 @check_token
 def generate_prompt_endpoint():
@@ -569,14 +826,63 @@ def generate_prompt_endpoint():
     raw_hazard = data['hazard'].lower()
     hazard_display = raw_hazard.replace("_", " ").title()
     if raw_hazard not in SUPPORTED_HAZARDS:
-        return jsonify({"status": "warning", "hazard": hazard_display, "recommendation": {"severity": "Unknown", "message": f"Caution: {hazard_display} reported.", "actions": ["Stay alert"], "source": "Fallback"}}), 200
+        fallback = fallback_recommendation(hazard_display)
+        if wants_stream():
+            return Response(sse_event('final', fallback), mimetype='text/event-stream')
+        return jsonify(fallback), 200
+    if wants_stream():
+        events = recommendation_events(raw_hazard, data.get('event_description', ''), data['user_lat'], data['user_lng'])
+        return Response(stream_with_context(events), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
     try:
-        location_string = get_human_readable_location(data['user_lat'], data['user_lng'])
         retrieved_context = get_retrieved_context(raw_hazard)
-        final_recommendation = generate_ai_recommendation(hazard_display, data.get('event_description', ''), retrieved_context, location_string)
+        location = get_region(data['user_lat'], data['user_lng'], data.get('event_description', ''))
+        final_recommendation = get_recommendation(raw_hazard, data.get('event_description', ''), retrieved_context, location)
         return jsonify({"status": "success", "hazard": hazard_display, "recommendation": final_recommendation}), 200
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+# --- Batch Recommendations ---
+# Shared by all batch requests, so concurrent batches cannot multiply the
+# number of in-flight embedding and chat calls.
+BATCH_MAX_WORKERS = int(os.environ.get('BATCH_MAX_WORKERS', 4))
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix='batch')
+
+def _batch_item(raw_hazard, event_description, location):
+    hazard_display = raw_hazard.replace("_", " ").title()
+    if raw_hazard not in SUPPORTED_HAZARDS:
+        return fallback_recommendation(hazard_display)
+    region, coastal = location
+    location = (region, coastal or is_coastal(event_description))  # The shared location has no description
+    try:
+        with app.app_context():
+            retrieved_context = get_retrieved_context(raw_hazard)
+            recommendation = get_recommendation(raw_hazard, event_description, retrieved_context, location)
+        return {"status": "success", "hazard": hazard_display, "recommendation": recommendation}
+    except Exception as e:
+        return {"status": "error", "hazard": hazard_display, "message": str(e)}
+
+@app.route('/api/generate_prompt/batch', methods=['POST'])
+@check_token
+def generate_prompt_batch_endpoint():
+    """
+    FETCH: Recommendations for several hazards at one location. The location
+    is resolved once, identical (hazard, description) items are generated
+    once, and results come back in input order with a per-item status.
+    """
+    try:
+        data = BatchPromptRequestSchema().load(request.get_json())
+    except ValidationError as err:
+        return jsonify({"error": "Invalid input data", "messages": err.messages}), 400
+    try:
+        location = get_region(data['user_lat'], data['user_lng'])
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+    keys = [(item['hazard'].lower(), item['event_description']) for item in data['items']]
+    futures = {key: _batch_executor.submit(_batch_item, key[0], key[1], location) for key in dict.fromkeys(keys)}
+    results = [futures[key].result() for key in keys]
+    return jsonify({"status": "success", "location": location[0], "results": results}), 200
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
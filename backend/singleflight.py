@@ -0,0 +1,72 @@
+import threading
+
+# --- Single-Flight Call Coalescing ---
+# When a big event hits, many requests miss the same cache key at once and
+# each would make the same upstream call (embedding, index query, chat
+# completion, Mapbox). SingleFlight.do(key, fn) runs fn once per key at a
+# time. The first caller (the leader) runs it. Callers that arrive while it is
+# in flight wait for the leader and get its result, or its exception. Nothing
+# is kept after the call finishes; caching stays the job of the caches.
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.max_waiters = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self.coalesced += 1
+                self.max_waiters = max(self.max_waiters, call.waiters)
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            calls = self.executions + self.coalesced
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced,
+                'coalesced_rate': round(self.coalesced / calls, 3) if calls else 0.0,
+                'errors': self.errors,
+                'max_waiters': self.max_waiters,
+            }
@@ -0,0 +1,478 @@
+import os
+import math
+import time
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from firebase_admin import firestore
+from fire_clusters import cluster_candidates, load_active_clusters, read_hotspots, stale_clusters
+from event_resolution import parse_event_time
+from firms_tiles import DEFAULT_REGIONS, MAX_DAYS, fetch_tiles, parse_regions, tile_regions
+from ingest import ingest_alerts
+from json_stream import iter_json_array
+from matching import match_and_notify
+from polygons import compact_geometry
+from seen_ids import seen_ids
+from upstream import upstream
+from watermarks import VersionTracker, watermarks
+
+# --- Upstream Source Adapters ---
+# Each external feed is described by a SyncSource: how to fetch it, how to
+# turn the payload into (doc_id, payload) candidates, and how long the whole
+# run may take. The /api/sync/* endpoints and the /api/sync/all fan-out both
+# go through run_source() so they share one code path.
+
+
+class SourceConfigError(Exception):
+    """Raised when a source cannot run because local configuration is missing."""
+
+
+class SourceBusyError(Exception):
+    """Raised when a source is asked to run while its previous run is still going."""
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream feed answers with a non-success status."""
+
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class SyncSource:
+    def __init__(self, name, label, fetch, parse, timeout, deadline, interval, match_radius_km=25, upsert=False,
+                 watermark_lag=None):
+        self.name = name
+        self.label = label          # Human readable name used in logs
+        self.fetch = fetch          # () -> raw payload, or None when unchanged upstream (304)
+        self.parse = parse          # (raw, since) -> iterable of (doc_id, payload); (raw, db, since) when upsert
+        self.timeout = timeout      # HTTP timeout in seconds
+        self.deadline = deadline    # Wall-clock budget for fetch + parse + write
+        self.interval = int(os.environ.get(f'SYNC_INTERVAL_{name.upper()}', interval))  # Scheduler cadence in seconds
+        self.match_radius_km = match_radius_km  # Users this close to a new alert are notified
+        self.upsert = upsert        # Alerts are updated in place across runs instead of written once
+        self.watermark_lag = watermark_lag  # Seconds of overlap behind the watermark; None disables it
+        self.lock = threading.Lock()  # Held for the duration of a run
+
+
+def _elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def since(name):
+    """The source's watermark minus its lag, or None before the first run."""
+    source = SOURCES[name]
+    mark = watermarks.get(name)
+    if mark is None or source.watermark_lag is None:
+        return None
+    return mark - source.watermark_lag
+
+
+def _stale(version, cutoff):
+    return cutoff is not None and version is not None and version <= cutoff
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def stream_items(response, source, key):
+    """
+    Lazily yield the records under `key` while the body is still downloading.
+    The JSON feeds return this instead of a parsed document so only one record
+    is in memory at a time and ingestion overlaps the download.
+    """
+    def counted_chunks():
+        for chunk in response.iter_content(STREAM_CHUNK_SIZE):
+            upstream.record_bytes(source, len(chunk))
+            yield chunk
+
+    try:
+        yield from iter_json_array(counted_chunks(), key)
+    finally:
+        response.close()
+
+
+# --- USGS ---
+
+USGS_QUERY_MAX_AGE = 86400   # Beyond this, fall back to the hourly summary feed
+
+
+def fetch_usgs():
+    cutoff = since('usgs')
+    if cutoff is not None and time.time() - cutoff < USGS_QUERY_MAX_AGE:
+        # Only events added or revised since the last run, including magnitude revisions
+        updated_after = datetime.fromtimestamp(cutoff, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        url = ("https://earthquake.usgs.gov/fdsnws/event/1/query"
+               f"?format=geojson&minmagnitude=1&updatedafter={updated_after}")
+        conditional = False
+    else:
+        url = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
+        conditional = True
+    response = upstream.get(url, source='usgs', conditional=conditional, stream=True, timeout=SOURCES['usgs'].timeout)
+    if response is None:
+        return None
+    response.raise_for_status()
+    return stream_items(response, 'usgs', 'features')
+
+
+def parse_usgs(features, since=None):
+    for feature in features:
+        eq_id = feature['id']
+        props = feature['properties']
+        geom = feature['geometry']
+
+        version = parse_event_time(props.get('updated'))
+        if _stale(version, since) or props['mag'] is None or props['mag'] < 1.0:
+            continue
+
+        yield f"usgs_{eq_id}", {
+            'title': f"Earthquake: M{props['mag']}",
+            'message': f"Significant activity recorded at {props['place']}.",
+            'hazardType': 'earthquake',
+            'lat': geom['coordinates'][1],
+            'lng': geom['coordinates'][0],
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'external_id': eq_id,
+            'event_time': parse_event_time(props.get('time')),
+            'version': version,
+            'source': 'USGS',
+            'url': props['url']
+        }
+
+
+# --- Alert Polygons ---
+# Area warnings keep a simplified copy of their shape (see polygons.py); the
+# alert's lat/lng is the shape's centroid rather than an arbitrary vertex.
+
+NWS_MAX_VERTICES = 64
+GDACS_MAX_VERTICES = 128
+
+
+def _shape_fields(shape):
+    if not shape:
+        return {}
+    return {'geometry': shape['geometry'], 'bbox': shape['bbox'], 'cover_cells': shape['cover_cells']}
+
+
+# --- NWS ---
+
+def fetch_nws():
+    # Updates are fetched too; they are folded into the alert they revise
+    url = "https://api.weather.gov/alerts/active?status=actual&message_type=alert,update"
+    headers = {"User-Agent": "(guardianly.app, contact@guardianly.app)"}
+    response = upstream.get(url, source='nws', conditional=True, stream=True, headers=headers, timeout=SOURCES['nws'].timeout)
+    if response is None:
+        return None
+    response.raise_for_status()
+    return stream_items(response, 'nws', 'features')
+
+
+def _nws_root_id(props):
+    """ID of the original alert an Update revises (its earliest reference), else its own."""
+    references = props.get('references') or []
+    if not references:
+        return props['id']
+    return min(references, key=lambda ref: parse_event_time(ref.get('sent')) or 0)['identifier']
+
+
+def parse_nws(features, since=None):
+    for feature in features:
+        props = feature['properties']
+        version = parse_event_time(props.get('sent'))
+        if _stale(version, since):
+            continue
+        alert_id = _nws_root_id(props)
+
+        severity = props.get('severity', 'Unknown')
+        if severity not in ['Extreme', 'Severe']:
+            continue
+
+        geom = feature.get('geometry')
+        lat, lng = 0.0, 0.0
+        shape = None
+
+        if geom:
+            if geom['type'] == 'Point':
+                lng, lat = geom['coordinates']
+            elif geom['type'] in ['Polygon', 'MultiPolygon']:
+                shape = compact_geometry(geom, NWS_MAX_VERTICES)
+                if shape:
+                    lat, lng = shape['centroid']['lat'], shape['centroid']['lng']
+
+        yield f"nws_{alert_id}", {
+            'title': props.get('event', 'Weather Alert'),
+            'message': props.get('headline', 'Severe weather warning issued.'),
+            'hazardType': 'severe_weather',
+            'lat': lat,
+            'lng': lng,
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'external_id': alert_id,
+            'version': version,
+            'source': 'NWS',
+            'severity': severity,
+            **_shape_fields(shape)
+        }
+
+
+# --- NASA EONET ---
+
+EONET_CATEGORY_MAPPING = {
+    'wildfires': 'wildfire',
+    'volcanoes': 'volcanic_eruption',
+    'severeStorms': 'severe_weather',
+    'floods': 'flood',
+    'tempExtremes': 'extreme_heat'
+}
+
+
+EONET_MAX_DAYS = 7
+
+
+def fetch_eonet():
+    # Always the full lookback: EONET publishes events late with geometry dated
+    # days earlier, so a window narrowed to the watermark would never return them
+    url = f"https://eonet.gsfc.nasa.gov/api/v3/events?days={EONET_MAX_DAYS}&status=open"
+    print(f"Connecting to NASA EONET...")
+    response = upstream.get(url, source='eonet', conditional=True, stream=True, timeout=SOURCES['eonet'].timeout)
+    if response is None:
+        return None
+    response.raise_for_status()
+    return stream_items(response, 'eonet', 'events')
+
+
+def parse_eonet(events, since=None):
+    for event in events:
+        event_id = event['id']
+        title = event['title']
+        categories = event.get('categories', [])
+        if not categories: continue
+
+        eonet_cat = categories[0]['id']
+        internal_type = EONET_CATEGORY_MAPPING.get(eonet_cat)
+        if not internal_type: continue
+
+        geoms = event.get('geometries', [])
+        if not geoms: continue
+        lng, lat = geoms[0]['coordinates']
+        # A new observation appends a geometry; the latest date versions the event
+        version = max((parse_event_time(g.get('date')) or 0 for g in geoms), default=None) or None
+        if _stale(version, since): continue
+
+        yield f"eonet_{event_id}", {
+            'title': title,
+            'message': f"Global event reported: {title}",
+            'hazardType': internal_type,
+            'lat': lat,
+            'lng': lng,
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'external_id': event_id,
+            'event_time': parse_event_time(geoms[0].get('date')),
+            'version': version,
+            'source': 'NASA EONET'
+        }
+
+
+# --- GDACS ---
+
+GDACS_TYPE_MAPPING = {
+    'TC': 'hurricane',
+    'EQ': 'earthquake',
+    'FL': 'flood',
+    'VO': 'volcanic_eruption',
+    'WF': 'wildfire',
+    'DR': 'extreme_heat'
+}
+
+
+def fetch_gdacs():
+    url = "https://www.gdacs.org/xml/gdacs.geojson"
+    print(f"Connecting to GDACS...")
+    response = upstream.get(url, source='gdacs', conditional=True, stream=True, timeout=SOURCES['gdacs'].timeout)
+    if response is None:
+        return None
+    response.raise_for_status()
+    return stream_items(response, 'gdacs', 'features')
+
+
+def parse_gdacs(features, since=None):
+    for feature in features:
+        props = feature['properties']
+        event_id = props.get('eventid')
+        event_type = props.get('eventtype')
+
+        version = parse_event_time(props.get('datemodified'))
+        if _stale(version, since):
+            continue
+
+        alert_level = props.get('alertlevel', 'Green')
+        if alert_level not in ['Orange', 'Red']:
+            continue
+
+        geom = feature.get('geometry')
+        shape = None
+        if not geom:
+            continue
+        if geom['type'] == 'Point':
+            lng, lat = geom['coordinates']
+        elif geom['type'] in ['Polygon', 'MultiPolygon']:
+            shape = compact_geometry(geom, GDACS_MAX_VERTICES)
+            if not shape:
+                continue
+            lat, lng = shape['centroid']['lat'], shape['centroid']['lng']
+        else:
+            continue
+
+        yield f"gdacs_{event_type}_{event_id}", {
+            'title': f"{alert_level} Alert: {props.get('eventname', 'Global Disaster')}",
+            'message': props.get('description', 'High-impact disaster event reported.'),
+            'hazardType': GDACS_TYPE_MAPPING.get(event_type, 'general'),
+            'lat': lat,
+            'lng': lng,
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'external_id': str(event_id),
+            'event_time': parse_event_time(props.get('fromdate')),
+            'version': version,
+            'source': 'GDACS',
+            'alertlevel': alert_level,
+            **_shape_fields(shape)
+        }
+
+
+# --- NASA FIRMS ---
+
+def fetch_firms():
+    map_key = os.environ.get('NASA_FIRMS_KEY')
+    if not map_key:
+        raise SourceConfigError('NASA_FIRMS_KEY missing from .env')
+    try:
+        regions = parse_regions(os.environ.get('FIRMS_REGIONS', DEFAULT_REGIONS))
+    except ValueError as e:
+        raise SourceConfigError(str(e))
+    tiles = tile_regions(regions, float(os.environ.get('FIRMS_TILE_DEGREES', 10)))
+    days = min(max(int(os.environ.get('FIRMS_DAYS', 1)), 1), MAX_DAYS)
+    cutoff = since('firms')
+    if cutoff is not None:
+        # No need to re-read days that were fully ingested already
+        days = min(days, max(math.ceil((time.time() - cutoff) / 86400), 1))
+
+    print(f"Connecting to NASA FIRMS ({len(tiles)} tiles)...")
+    try:
+        return fetch_tiles(map_key, tiles, os.environ.get('FIRMS_PRODUCT', 'VIIRS_SNPP_NRT'), days,
+                           timeout=SOURCES['firms'].timeout,
+                           concurrency=int(os.environ.get('FIRMS_CONCURRENCY', 4)))
+    except RuntimeError as e:
+        raise UpstreamError(str(e))
+
+
+def parse_firms(text, db, since=None):
+    """Cluster the hotspot CSV into fire-cluster alerts, updating the ones already active."""
+    columns = read_hotspots(text)
+    existing = load_active_clusters(db)
+    # No acquisition newer than the watermark: nothing to recluster, but fires can still go quiet
+    if since is not None and not (columns['acquired'] > since).any():
+        return stale_clusters(existing)
+    return cluster_candidates(columns, existing)
+
+
+SOURCES = {
+    'usgs': SyncSource('usgs', 'USGS', fetch_usgs, parse_usgs, timeout=10, deadline=30, interval=60, match_radius_km=100,
+                       watermark_lag=300),
+    'nws': SyncSource('nws', 'NWS', fetch_nws, parse_nws, timeout=10, deadline=30, interval=120, match_radius_km=25,
+                      watermark_lag=300),
+    'eonet': SyncSource('eonet', 'NASA EONET', fetch_eonet, parse_eonet, timeout=25, deadline=45, interval=600, match_radius_km=50,
+                        watermark_lag=EONET_MAX_DAYS * 86400),  # Backdated observations inside the lookback still pass
+    'gdacs': SyncSource('gdacs', 'GDACS', fetch_gdacs, parse_gdacs, timeout=30, deadline=60, interval=600, match_radius_km=200,
+                        watermark_lag=3600),
+    'firms': SyncSource('firms', 'NASA FIRMS', fetch_firms, parse_firms, timeout=15, deadline=90, interval=900, match_radius_km=15,
+                        upsert=True, watermark_lag=6 * 3600),  # NRT rows land up to ~3 h after acquisition
+}
+
+
+# --- Running Sources ---
+
+def run_source(db, name):
+    """Fetch, parse and ingest one source. Returns the ingest stats plus fetch/parse latencies."""
+    source = SOURCES[name]
+    if not source.lock.acquire(blocking=False):
+        raise SourceBusyError(f'{source.label} sync is already running')
+    try:
+        return _run_locked(db, source)
+    finally:
+        source.lock.release()
+
+
+def _run_locked(db, source):
+    name = source.name
+    start = time.perf_counter()
+    raw = source.fetch()
+    # For streamed feeds this is time to response headers; the body is read
+    # while parsing, so download time is included in parse_ms.
+    fetch_ms = _elapsed_ms(start)
+
+    if raw is None:
+        # 304 Not Modified: nothing to parse or dedup
+        return {'source': name, 'not_modified': True, 'candidates': 0, 'skipped_seen': 0, 'existing': 0,
+                'written': 0, 'updated': 0, 'merged': 0, 'batches': 0, 'fetch_ms': fetch_ms, 'parse_ms': 0.0,
+                'lookup_ms': 0.0, 'resolve_ms': 0.0, 'write_ms': 0.0, 'total_ms': _elapsed_ms(start)}
+
+    inserted = []
+    cutoff = since(name)
+    tracker = VersionTracker()
+    candidates = source.parse(raw, db, since=cutoff) if source.upsert else source.parse(raw, since=cutoff)
+    stats = ingest_alerts(db, name, tracker.observe(candidates), seen=seen_ids, inserted=inserted,
+                          upsert=source.upsert, resolve=os.environ.get('ALERT_RESOLUTION_ENABLED', '1') == '1')
+    upstream.commit(name)
+    seen_ids.save()
+    if source.watermark_lag is not None and tracker.high is not None:
+        watermarks.advance(name, tracker.high)
+        watermarks.save()
+    stats['watermark'] = watermarks.get(name)
+    if os.environ.get('ALERT_MATCHING_ENABLED') == '1':
+        # Runs without new alerts still send the digests that came due.
+        # The alerts are already committed; a failed push must not fail the run
+        try:
+            stats['matching'] = match_and_notify(db, inserted, source.match_radius_km)
+        except Exception as e:
+            print(f"Alert matching failed for {name}: {e}")
+            stats['matching'] = {'error': str(e)}
+    stats['not_modified'] = False
+    stats['fetch_ms'] = fetch_ms
+    if getattr(raw, 'tiles', None) is not None:
+        stats['tiles'] = raw.tiles
+    # Parsing is interleaved with the Firestore calls; whatever ingest time was
+    # not spent waiting on lookups or commits was spent walking the payload.
+    stats['parse_ms'] = round(max(stats['total_ms'] - stats['lookup_ms'] - stats['resolve_ms'] - stats['write_ms'], 0.0), 1)
+    stats['total_ms'] = _elapsed_ms(start)
+    return stats
+
+
+# A long-lived pool so a timed-out source keeps running in the background
+# instead of blocking the request while the executor shuts down.
+_executor = ThreadPoolExecutor(max_workers=len(SOURCES), thread_name_prefix='sync')
+
+
+def run_all(db, names=None):
+    """
+    Run several sources concurrently. Each source gets its own deadline, so a
+    slow feed is reported as timed out without holding up the others.
+    Returns a per-source report keyed by source name.
+    """
+    names = names or list(SOURCES)
+    start = time.perf_counter()
+    futures = {name: _executor.submit(run_source, db, name) for name in names}
+
+    report = {}
+    for name, future in futures.items():
+        remaining = SOURCES[name].deadline - (time.perf_counter() - start)
+        try:
+            stats = future.result(timeout=max(remaining, 0))
+            report[name] = {'status': 'success', **stats}
+        except SourceBusyError as e:
+            report[name] = {'status': 'busy', 'message': str(e)}
+        except FutureTimeoutError:
+            print(f"{SOURCES[name].label} Sync Timeout after {SOURCES[name].deadline}s")
+            report[name] = {'status': 'timeout', 'message': f'Exceeded {SOURCES[name].deadline}s deadline'}
+        except Exception as e:
+            print(f"{SOURCES[name].label} Sync Error: {e}")
+            report[name] = {'status': 'error', 'message': str(e)}
+    return report
@@ -0,0 +1,216 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from flask_caching.backends.base import BaseCache
+
+# --- Shared SQLite Cache Backend ---
+# SimpleCache lives inside one process, so every gunicorn worker keeps its own
+# copy of the cached LLM recommendations. SQLiteCache is a
+# Flask-Caching backend stored in one SQLite file (WAL mode) that all workers
+# on a host open together. Entries carry an absolute expiry and a last-access
+# time. Once the table is larger than `threshold`, expired rows go first and
+# then the least recently used ones. Hit, miss and eviction counters are kept
+# in the same file, so stats() covers every worker.
+#
+# Reads are a plain SELECT and never take the write lock. Access times and
+# hit/miss counts are buffered in memory and written with the next set()/add(),
+# every FLUSH_EVERY reads, or when stats() is asked for.
+#
+# Values are pickled, so the file must only be writable by the app: it
+# defaults to the Flask instance folder (created 0700, file 0600), never /tmp.
+#
+# Enable it with CACHE_TYPE='sqlite_cache.SQLiteCache'. CACHE_SQLITE_PATH sets
+# the file and CACHE_THRESHOLD the entry limit.
+
+DEFAULT_FILENAME = 'guardianly_cache.sqlite3'
+DEFAULT_THRESHOLD = 5000
+FLUSH_EVERY = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('hits', 0), ('misses', 0), ('evictions', 0);
+"""
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.path = path
+        self.threshold = threshold
+        self._local = threading.local()
+        self._buffer_lock = threading.Lock()
+        self._reset_buffer()
+        self._conn().executescript(_SCHEMA)
+        os.chmod(path, 0o600)
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        path = config.get('CACHE_SQLITE_PATH')
+        if not path:
+            os.makedirs(app.instance_path, mode=0o700, exist_ok=True)
+            path = os.path.join(app.instance_path, DEFAULT_FILENAME)
+        kwargs.update(path=path, threshold=config.get('CACHE_THRESHOLD', DEFAULT_THRESHOLD))
+        return cls(*args, **kwargs)
+
+    def _reset_buffer(self):
+        self._accessed = {}   # key -> last read time not yet written
+        self._hits = 0
+        self._misses = 0
+        self._buffer_pid = os.getpid()
+
+    def _conn(self):
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _connect(self):
+        return _Transaction(self._conn())
+
+    def _expires_at(self, timeout):
+        timeout = self._normalize_timeout(timeout)
+        return 0 if timeout == 0 else time.time() + timeout  # 0 never expires
+
+    @staticmethod
+    def _count(conn, name, amount=1):
+        conn.execute('UPDATE counters SET value = value + ? WHERE name = ?', (amount, name))
+
+    def _record(self, key, now, hit):
+        with self._buffer_lock:
+            if self._buffer_pid != os.getpid():
+                self._reset_buffer()  # Counts inherited across a fork belong to the parent
+            if hit:
+                self._hits += 1
+                self._accessed[key] = now
+            else:
+                self._misses += 1
+            due = self._hits + self._misses >= FLUSH_EVERY
+        if due:
+            with self._connect() as conn:
+                self._flush(conn)
+
+    def _flush(self, conn):
+        """Write buffered access times and counters inside the caller's transaction."""
+        with self._buffer_lock:
+            if self._buffer_pid != os.getpid():
+                self._reset_buffer()
+            accessed, hits, misses = self._accessed, self._hits, self._misses
+            self._reset_buffer()
+        if accessed:
+            conn.executemany('UPDATE cache SET accessed = MAX(accessed, ?) WHERE key = ?',
+                             [(when, key) for key, when in accessed.items()])
+        if hits:
+            self._count(conn, 'hits', hits)
+        if misses:
+            self._count(conn, 'misses', misses)
+
+    def get(self, key):
+        now = time.time()
+        # Read-only: no write lock; expired rows are left for _prune
+        row = self._conn().execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] and row[1] <= now):
+            self._record(key, now, hit=False)
+            return None
+        self._record(key, now, hit=True)
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            return None
+
+    def set(self, key, value, timeout=None):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, self._expires_at(timeout), time.time()),
+            )
+            self._flush(conn)
+            self._prune(conn)
+        return True
+
+    def add(self, key, value, timeout=None):
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires != 0 AND expires <= ?', (key, now))
+            added = conn.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, self._expires_at(timeout), now),
+            ).rowcount == 1
+            self._flush(conn)
+            if added:
+                self._prune(conn)
+        return added
+
+    def _prune(self, conn):
+        size = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        if size <= self.threshold:
+            return
+        removed = conn.execute(
+            'DELETE FROM cache WHERE expires != 0 AND expires <= ?', (time.time(),)
+        ).rowcount
+        excess = size - removed - self.threshold
+        if excess > 0:
+            conn.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,)
+            )
+            self._count(conn, 'evictions', excess)
+
+    def delete(self, key):
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM cache WHERE key = ?', (key,)).rowcount == 1
+
+    def has(self, key):
+        row = self._conn().execute('SELECT expires FROM cache WHERE key = ?', (key,)).fetchone()
+        return row is not None and (row[0] == 0 or row[0] > time.time())
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM cache')
+        return True
+
+    def stats(self):
+        with self._connect() as conn:
+            self._flush(conn)
+            counters = dict(conn.execute('SELECT name, value FROM counters').fetchall())
+            size = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'size': size,
+            'hits': counters['hits'],
+            'misses': counters['misses'],
+            'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0,
+            'evictions': counters['evictions'],
+        }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent writers wait on the busy timeout instead of failing mid-transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('COMMIT' if exc_type is None else 'ROLLBACK')
+        return False
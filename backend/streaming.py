@@ -0,0 +1,71 @@
+import json
+
+# --- Server-Sent Events Helpers ---
+# The streaming variant of /api/generate_prompt forwards the chat completion
+# as it is generated. The model writes one JSON object, so PartialJSONFields
+# watches the growing text for top-level string fields and reports them while
+# they are still being written: severity as soon as its string closes, and
+# message as a series of deltas. The full object is still parsed and
+# validated once the stream ends.
+
+
+def sse_event(event, data):
+    """One SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _decode_partial(raw):
+    """Decode the body of a JSON string that may stop mid-escape."""
+    for cut in range(len(raw), max(len(raw) - 6, -1), -1):
+        try:
+            return json.loads(f'"{raw[:cut]}"')
+        except ValueError:
+            continue
+    return ''
+
+
+class PartialJSONFields:
+    """
+    Incrementally extract top-level string fields from a streamed JSON object.
+    feed(chunk) returns (field, text_so_far, complete) for every watched
+    field whose value grew in that chunk.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.text = ''
+        self._seen = {field: ('', False) for field in fields}
+
+    def _value(self, field):
+        marker = f'"{field}"'
+        start = self.text.find(marker)
+        if start < 0:
+            return None
+        pos = start + len(marker)
+        while pos < len(self.text) and self.text[pos] in ' \t\r\n:':
+            pos += 1
+        if pos >= len(self.text) or self.text[pos] != '"':
+            return None
+        pos += 1
+        end = pos
+        while end < len(self.text):
+            if self.text[end] == '\\':
+                end += 2
+                continue
+            if self.text[end] == '"':
+                return json.loads(f'"{self.text[pos:end]}"'), True
+            end += 1
+        return _decode_partial(self.text[pos:]), False
+
+    def feed(self, chunk):
+        self.text += chunk
+        updates = []
+        for field in self.fields:
+            if self._seen[field][1]:
+                continue
+            found = self._value(field)
+            if found is None or found == self._seen[field]:
+                continue
+            self._seen[field] = found
+            updates.append((field, found[0], found[1]))
+        return updates
@@ -0,0 +1,23 @@
+import sys
+import os
+import datetime
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backfill_updated_at import backfill_updated_at
+
+
+def test_backfill_copies_timestamp_only_where_missing():
+    ts = datetime.datetime(2025, 6, 1, tzinfo=datetime.timezone.utc)
+    legacy = MagicMock(id='usgs_old')
+    legacy.to_dict.return_value = {'timestamp': ts}
+    current = MagicMock(id='usgs_new')
+    current.to_dict.return_value = {'timestamp': ts, 'updated_at': ts}
+
+    db = MagicMock()
+    db.collection.return_value.order_by.return_value.limit.return_value.stream.return_value = iter([legacy, current])
+
+    assert backfill_updated_at(db, page_size=10) == (2, 1)
+    db.batch.return_value.update.assert_called_once_with(legacy.reference, {'updated_at': ts})
+    db.batch.return_value.commit.assert_called_once()
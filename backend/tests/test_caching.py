@@ -0,0 +1,69 @@
+import sys
+import os
+from unittest.mock import MagicMock
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from caching import TTLCache, CachedFailureError
+from geo import quantize
+
+
+def test_hits_and_lru_eviction():
+    cache = TTLCache('test', max_entries=2, ttl=60)
+    loader = MagicMock(side_effect=lambda: 'value')
+
+    cache.get_or_load('a', loader)
+    cache.get_or_load('a', loader)
+    cache.get_or_load('b', loader)
+    cache.get_or_load('c', loader)  # evicts 'a'
+    cache.get_or_load('a', loader)
+
+    assert loader.call_count == 4
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['evictions'] == 2
+
+
+def test_failures_are_negatively_cached():
+    cache = TTLCache('test', max_entries=10, ttl=60, negative_ttl=60)
+    loader = MagicMock(side_effect=TimeoutError("mapbox timed out"))
+
+    with pytest.raises(TimeoutError):
+        cache.get_or_load('k', loader)
+    with pytest.raises(CachedFailureError):
+        cache.get_or_load('k', loader)
+    assert loader.call_count == 1
+    assert cache.stats()['negative_hits'] == 1
+
+    expired = TTLCache('test', max_entries=10, ttl=60, negative_ttl=0)
+    flaky = MagicMock(side_effect=[TimeoutError("down"), 'recovered'])
+    with pytest.raises(TimeoutError):
+        expired.get_or_load('k', flaky)
+    assert expired.get_or_load('k', flaky) == 'recovered'
+
+
+def test_quantize_groups_neighbouring_points():
+    base = quantize(44.5646, -123.2620, 100)
+    assert quantize(44.56462, -123.26203, 100) == base
+    assert quantize(44.5700, -123.2620, 100) != base
+    lat, lng = base
+    assert abs(lat - 44.5646) < 0.001 and abs(lng + 123.2620) < 0.001
+
+
+def test_stale_entries_are_served_while_refreshing():
+    import threading
+    cache = TTLCache('test', max_entries=10, ttl=0, stale_ttl=60)
+    refreshed = threading.Event()
+
+    def loader():
+        if loader.calls:
+            refreshed.set()
+        loader.calls += 1
+        return f"v{loader.calls}"
+    loader.calls = 0
+
+    assert cache.get_or_load('route', loader) == 'v1'
+    # Already expired (ttl=0) but inside the stale window: old value, refresh in background
+    assert cache.get_or_load('route', loader) == 'v1'
+    assert refreshed.wait(2)
+    assert cache.stats()['stale_hits'] == 1
@@ -0,0 +1,57 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from firebase_admin import messaging, exceptions
+from dispatch import dispatch, is_invalid_token_error
+
+
+def fake_send(dead_tokens):
+    def send(message):
+        responses = [MagicMock(success=token not in dead_tokens,
+                               exception=messaging.UnregisteredError('gone') if token in dead_tokens else None)
+                     for token in message.tokens]
+        successes = sum(r.success for r in responses)
+        return MagicMock(responses=responses, success_count=successes, failure_count=len(responses) - successes)
+    return send
+
+
+def user_snapshot(uid, token):
+    snapshot = MagicMock(id=uid, exists=True)
+    snapshot.to_dict.return_value = {'fcm_token': token}
+    return snapshot
+
+
+def test_dispatch_sends_500_token_batches_and_prunes_dead_tokens():
+    targets = {f'token-{i}': f'uid-{i}' for i in range(1203)}
+    db = MagicMock()
+    # uid-7 refreshed its token after the send; only uid-3 still holds a dead one
+    db.get_all.return_value = [user_snapshot('uid-3', 'token-3'), user_snapshot('uid-7', 'token-new')]
+
+    with patch('dispatch.messaging.send_each_for_multicast', side_effect=fake_send({'token-3', 'token-7'})) as send:
+        report = dispatch(db, targets, 'Flood warning', 'Move to higher ground', data={'lat': 44.5})
+
+    assert [len(call.args[0].tokens) for call in send.call_args_list] == [500, 500, 203]
+    assert sorted(b['size'] for b in report['batches']) == [203, 500, 500]
+    assert report['success'] == 1201 and report['failure'] == 2
+    assert sum(b['invalid'] for b in report['batches']) == 2
+    assert report['pruned'] == 1
+    assert send.call_args_list[0].args[0].data == {'lat': '44.5'}
+    db.batch.return_value.update.assert_called_once()
+    db.batch.return_value.commit.assert_called_once()
+
+
+def test_failed_batch_is_reported_without_failing_the_dispatch():
+    with patch('dispatch.messaging.send_each_for_multicast', side_effect=RuntimeError('FCM unavailable')):
+        report = dispatch(MagicMock(), {'a': 'uid-a'}, 'T', 'B')
+    assert report['failure'] == 1
+    assert report['batches'][0]['error'] == 'FCM unavailable'
+
+
+def test_only_token_errors_are_treated_as_invalid_tokens():
+    assert is_invalid_token_error(messaging.UnregisteredError('gone'))
+    assert is_invalid_token_error(exceptions.InvalidArgumentError('The registration token is not a valid FCM registration token'))
+    assert not is_invalid_token_error(exceptions.InvalidArgumentError('Invalid data payload'))
+    assert not is_invalid_token_error(exceptions.UnavailableError('try again'))
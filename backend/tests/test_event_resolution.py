@@ -0,0 +1,83 @@
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from event_resolution import event_key, index_fields, merge_fields, neighbour_keys, parse_event_time, resolve_events
+
+T0 = 1_792_000_000.0
+
+
+def make_alerts_ref(docs):
+    """Collection mock answering `event_key in [...]` queries from docs ({doc_id: data})."""
+    ref = MagicMock()
+    queried = []
+
+    def where(filter):
+        keys = filter.value
+        queried.append(keys)
+        query = MagicMock()
+        query.limit.return_value.stream.return_value = [
+            MagicMock(id=doc_id, to_dict=MagicMock(return_value=data))
+            for doc_id, data in docs.items() if data.get('event_key') in keys
+        ]
+        return query
+
+    ref.where.side_effect = where
+    return ref, queried
+
+
+def indexed(doc_id, payload):
+    return {**payload, **index_fields(doc_id, payload)}
+
+
+def test_parse_event_time_handles_feed_formats():
+    assert parse_event_time(1792000000123) == 1792000000.123
+    assert parse_event_time('2026-10-17T03:00:00Z') == parse_event_time('2026-10-17T03:00:00')
+    assert parse_event_time('not a date') is None
+    assert parse_event_time(None) is None
+
+
+def test_neighbour_keys_cover_any_point_in_range():
+    # A quake 90 km away in a different cell, 50 minutes later, must still share a key
+    stored = event_key('earthquake', 38.0, -122.0, T0)
+    assert stored in neighbour_keys('earthquake', 38.0 + 90 / 111.32, -122.0, T0 + 3000)
+    assert stored in neighbour_keys('earthquake', 38.0, -122.0 - 90 / 87.7, T0 - 3000)
+    assert len(neighbour_keys('earthquake', 38.0, -122.0, T0)) <= 30
+
+
+def test_resolve_merges_cross_source_within_window_only():
+    usgs = indexed('usgs_1', {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.0, 'lng': -122.0, 'event_time': T0})
+    ref, queried = make_alerts_ref({'usgs_1': usgs})
+
+    near = indexed('gdacs_EQ_1', {'hazardType': 'earthquake', 'source': 'GDACS', 'lat': 38.3, 'lng': -122.2,
+                                  'event_time': T0 + 600})
+    late = indexed('gdacs_EQ_2', {'hazardType': 'earthquake', 'source': 'GDACS', 'lat': 38.0, 'lng': -122.0,
+                                  'event_time': T0 + 7200})
+    same_source = indexed('usgs_2', {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.01, 'lng': -122.0,
+                                     'event_time': T0 + 60})
+    far = indexed('gdacs_EQ_3', {'hazardType': 'earthquake', 'source': 'GDACS', 'lat': 40.0, 'lng': -122.0,
+                                 'event_time': T0})
+
+    found = {}
+    resolved = resolve_events(ref, {p_id: p for p_id, p in [('gdacs_EQ_1', near), ('gdacs_EQ_2', late),
+                                                              ('usgs_2', same_source), ('gdacs_EQ_3', far)]},
+                              found=found)
+
+    assert resolved == {'gdacs_EQ_1': 'usgs_1'}
+    assert found['usgs_1']['contributing_ids'] == ['usgs_1']
+    # Keys for the whole chunk are batched into `in` queries of at most 30
+    assert all(len(keys) <= 30 for keys in queried)
+
+
+def test_unresolved_hazards_are_not_indexed():
+    fields = index_fields('nws_1', {'hazardType': 'severe_weather', 'source': 'NWS', 'lat': 1.0, 'lng': 2.0})
+    assert fields == {'sources': ['NWS'], 'contributing_ids': ['nws_1']}
+    assert resolve_events(MagicMock(), {'nws_1': fields}) == {}
+
+
+def test_merge_fields_only_touches_canonical_when_contributors_change():
+    canonical = {'contributing_ids': ['gdacs_EQ_9', 'usgs_1']}
+    assert merge_fields([('usgs_1', {'source': 'USGS'})], canonical) == {}
+    assert set(merge_fields([('emsc_2', {'source': 'EMSC'})], canonical)) == {'sources', 'contributing_ids', 'updated_at'}
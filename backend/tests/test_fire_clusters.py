@@ -0,0 +1,133 @@
+import sys
+import os
+import time
+import numpy as np
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fire_clusters import cluster_candidates, cluster_labels, read_hotspots, STALE_AFTER_SECONDS
+
+HEADER = "latitude,longitude,bright_ti4,scan,track,acq_date,acq_time,satellite,instrument,confidence,version,bright_ti5,frp,daynight"
+
+
+def csv_rows(points, date='2026-10-17'):
+    rows = [f"{lat},{lng},330.1,0.4,0.4,{date},0930,N,VIIRS,{conf},2.0NRT,290.2,{frp},D"
+            for lat, lng, conf, frp in points]
+    return "\n".join([HEADER] + rows) + "\n"
+
+
+# Two fires ~50 km apart: a 3x3 block of 375 m pixels and a lone pixel
+FIRE_A = [(38.0 + i * 0.0034, -120.0 + j * 0.0043, 'n', 2.5) for i in range(3) for j in range(3)]
+FIRE_A[4] = (FIRE_A[4][0], FIRE_A[4][1], 'h', 12.0)
+FIRE_B = [(38.45, -120.0, 'l', 1.0)]
+
+
+def test_read_hotspots_maps_viirs_and_modis_confidence():
+    viirs = read_hotspots(csv_rows([(38.0, -120.0, 'l', 1.0), (38.1, -120.1, 'h', 2.0)]))
+    assert viirs['lat'].tolist() == [38.0, 38.1]
+    assert viirs['confidence'].tolist() == [30.0, 90.0]
+
+    modis = read_hotspots("latitude,longitude,acq_date,confidence,frp\n38.0,-120.0,2026-10-17,85,3.5\n")
+    assert modis['confidence'].tolist() == [85.0]
+    assert modis['frp'].tolist() == [3.5]
+
+    empty = read_hotspots(HEADER + "\n")
+    assert len(empty['lat']) == 0
+
+
+def test_cluster_labels_groups_adjacent_pixels():
+    columns = read_hotspots(csv_rows(FIRE_A + FIRE_B))
+    labels = cluster_labels(columns['lat'], columns['lng'], eps_km=1.0)
+
+    assert len(set(labels[:9])) == 1
+    assert labels[9] != labels[0]
+    # Requiring 3 neighbours turns the lone pixel into noise
+    assert cluster_labels(columns['lat'], columns['lng'], eps_km=1.0, min_pixels=3)[9] == -1
+
+
+def test_cluster_labels_matches_brute_force_components():
+    rng = np.random.default_rng(7)
+    lat = 38 + rng.random(300) * 0.2
+    lng = -120 + rng.random(300) * 0.2
+    labels = cluster_labels(lat, lng, eps_km=1.0)
+
+    # Connected components of the eps graph, computed the slow way
+    x = lng * 111.32 * np.cos(np.radians(lat))
+    y = lat * 111.32
+    adjacent = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :]) <= 1.0
+    for i in range(len(lat)):
+        for j in np.flatnonzero(adjacent[i]):
+            assert labels[i] == labels[j]
+    assert labels.min() >= 0
+
+
+def test_cluster_candidates_creates_then_updates_in_place():
+    first = dict(cluster_candidates(read_hotspots(csv_rows(FIRE_A + FIRE_B)), {}, now=1000.0))
+    assert len(first) == 2
+    big = next(payload for payload in first.values() if payload['pixel_count'] == 9)
+    assert big['kind'] == 'fire_cluster'
+    assert big['peak_confidence'] == 90.0
+    assert big['confidence'] == 'high'
+    assert big['total_frp'] == 32.0
+    assert big['bbox']['min_lat'] == 38.0 and big['bbox']['max_lng'] == -120.0 + 2 * 0.0043
+    assert 'timestamp' in big
+
+    # Next pass: the fire spread one pixel east, at lower confidence
+    big_id = next(doc_id for doc_id, payload in first.items() if payload['pixel_count'] == 9)
+    existing = {big_id: big}
+    spread = [(lat, lng, 'n', 1.0) for lat, lng, _, _ in FIRE_A] + [(38.0034, -119.9871, 'n', 1.0)]
+    second = dict(cluster_candidates(read_hotspots(csv_rows(spread)), existing, now=2000.0))
+
+    assert list(second) == [big_id]
+    update = second[big_id]
+    assert update['pixel_count'] == 10
+    assert update['peak_confidence'] == 90.0   # Peak never drops
+    assert update['first_seen'] == 1000.0
+    assert update['bbox']['max_lng'] == -119.9871
+    assert 'timestamp' not in update
+
+
+def test_cluster_candidates_deactivates_stale_clusters():
+    existing = {'firms_cluster_old': {'bbox': {'min_lat': 10.0, 'min_lng': 10.0, 'max_lat': 10.01, 'max_lng': 10.01},
+                                      'last_seen': 0.0}}
+    candidates = list(cluster_candidates(read_hotspots(HEADER + "\n"), existing, now=STALE_AFTER_SECONDS + 1))
+    assert candidates == [('firms_cluster_old', {'cluster_status': 'inactive'})]
+
+
+def test_parse_firms_loads_active_clusters():
+    from sources import parse_firms
+
+    db = MagicMock()
+    db.collection.return_value.where.return_value.where.return_value.stream.return_value = []
+    candidates = list(parse_firms(csv_rows(FIRE_A), db))
+
+    assert len(candidates) == 1
+    assert candidates[0][0].startswith('firms_cluster_20261017_')
+
+
+def test_parse_firms_exits_early_without_new_acquisitions():
+    from sources import parse_firms
+
+    db = MagicMock()
+    db.collection.return_value.where.return_value.where.return_value.stream.return_value = []
+    acquired = read_hotspots(csv_rows(FIRE_A))['acquired'].max()
+    assert acquired == 1_792_229_400.0   # 2026-10-17 09:30 UTC
+
+    assert list(parse_firms(csv_rows(FIRE_A), db, since=acquired)) == []
+    assert len(list(parse_firms(csv_rows(FIRE_A), db, since=acquired - 60))) == 1
+
+
+def test_parse_firms_deactivates_stale_clusters_without_new_acquisitions():
+    from sources import parse_firms
+
+    stale = MagicMock(id='firms_cluster_old')
+    stale.to_dict.return_value = {'bbox': {'min_lat': 10.0, 'min_lng': 10.0, 'max_lat': 10.01, 'max_lng': 10.01},
+                                  'last_seen': time.time() - STALE_AFTER_SECONDS - 60}
+    fresh = MagicMock(id='firms_cluster_recent')
+    fresh.to_dict.return_value = {'bbox': stale.to_dict.return_value['bbox'], 'last_seen': time.time()}
+    db = MagicMock()
+    db.collection.return_value.where.return_value.where.return_value.stream.return_value = [stale, fresh]
+    acquired = read_hotspots(csv_rows(FIRE_A))['acquired'].max()
+
+    assert list(parse_firms(csv_rows(FIRE_A), db, since=acquired)) == [('firms_cluster_old', {'cluster_status': 'inactive'})]
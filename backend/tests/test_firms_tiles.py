@@ -0,0 +1,94 @@
+import sys
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import firms_tiles
+from firms_tiles import TransactionBudget, fetch_tiles, parse_regions, tile_regions
+
+HEADER = "latitude,longitude,acq_date,confidence,frp"
+
+
+def test_parse_regions_and_tiling():
+    regions = parse_regions("us_west:-125,32,-114,49; alaska:-170,52,-130,72")
+    assert regions == [('us_west', (-125.0, 32.0, -114.0, 49.0)), ('alaska', (-170.0, 52.0, -130.0, 72.0))]
+    assert parse_regions("world") == [('world', (-180.0, -90.0, 180.0, 90.0))]
+
+    tiles = tile_regions(regions[:1], 10)
+    # 11 deg x 17 deg -> 2 columns x 2 rows, last row/column narrower
+    assert [bbox for _, bbox in tiles] == [(-125.0, 32.0, -115.0, 42.0), (-115.0, 32.0, -114.0, 42.0),
+                                           (-125.0, 42.0, -115.0, 49.0), (-115.0, 42.0, -114.0, 49.0)]
+    assert len(tile_regions(parse_regions("world"), 30)) == 12 * 6
+
+    try:
+        parse_regions("bad:10,0,5,1")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_transaction_budget_slides():
+    budget = TransactionBudget(limit=2, window=10)
+    assert budget.acquire(now=0) and budget.acquire(now=1)
+    assert not budget.acquire(now=5)
+    assert budget.acquire(now=10.5)
+    assert budget.remaining(now=10.5) == 0
+
+
+def _response(status, lines):
+    response = MagicMock(status_code=status)
+    response.iter_lines.return_value = iter(lines)
+    return response
+
+
+def test_fetch_tiles_merges_rows_concurrently_and_reports_per_tile():
+    bodies = {
+        '-10,0,0,10': [HEADER, "5.0,-5.0,2026-10-17,n,1.0", "5.0,0.0,2026-10-17,h,2.0"],
+        '0,0,10,10': [HEADER, "5.0,0.0,2026-10-17,h,2.0", "6.0,6.0,2026-10-17,l,1.0"],
+        '10,0,20,10': None,
+    }
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_get(url, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        lines = bodies[url.split('/')[-2]]
+        return _response(500, []) if lines is None else _response(200, lines)
+
+    tiles = [('t0', (-10, 0, 0, 10)), ('t1', (0, 0, 10, 10)), ('t2', (10, 0, 20, 10))]
+    with patch.object(firms_tiles.upstream, 'get', side_effect=fake_get), \
+         patch.object(firms_tiles, 'budget', TransactionBudget(limit=100)):
+        merged = fetch_tiles('KEY', tiles, 'VIIRS_SNPP_NRT', 1, timeout=5, concurrency=3)
+
+    assert peak[0] > 1
+    lines = merged.strip().split('\n')
+    # The edge pixel returned by both tiles appears once
+    assert lines == [HEADER, "5.0,-5.0,2026-10-17,n,1.0", "5.0,0.0,2026-10-17,h,2.0", "6.0,6.0,2026-10-17,l,1.0"]
+    assert [(t['tile'], t['status'], t['rows']) for t in merged.tiles] == [('t0', 'ok', 2), ('t1', 'ok', 2), ('t2', 'error', 0)]
+    assert all('duration_ms' in t for t in merged.tiles)
+
+
+def test_fetch_tiles_respects_budget_and_fails_when_nothing_fetched():
+    tiles = [('t0', (0, 0, 10, 10)), ('t1', (10, 0, 20, 10))]
+    with patch.object(firms_tiles.upstream, 'get', return_value=_response(200, [HEADER])) as get, \
+         patch.object(firms_tiles, 'budget', TransactionBudget(limit=1)):
+        merged = fetch_tiles('KEY', tiles, 'VIIRS_SNPP_NRT', 1, timeout=5, concurrency=1)
+    assert get.call_count == 1
+    assert [t['status'] for t in merged.tiles] == ['ok', 'rate_limited']
+
+    # FIRMS reports a bad key as a 200 with a text body
+    with patch.object(firms_tiles.upstream, 'get', side_effect=lambda url, **kw: _response(200, ["Invalid MAP_KEY."])), \
+         patch.object(firms_tiles, 'budget', TransactionBudget(limit=100)):
+        try:
+            fetch_tiles('KEY', tiles, 'VIIRS_SNPP_NRT', 1, timeout=5, concurrency=2)
+            assert False, "expected RuntimeError"
+        except RuntimeError as e:
+            assert 'Invalid MAP_KEY' in str(e)
@@ -0,0 +1,74 @@
+import sys
+import os
+import math
+import random
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo import MAX_COVERING_CELLS, encode_geohash, covering_cells, haversine_km, query_near
+
+
+def test_encode_geohash_known_values():
+    assert encode_geohash(42.6, -5.6, 5) == 'ezs42'
+    assert encode_geohash(57.64911, 10.40744, 11) == 'u4pruydqqvj'
+
+
+def test_haversine_corvallis_to_albany():
+    assert 14 < haversine_km(44.5646, -123.2620, 44.6365, -123.1059) < 15
+
+
+def test_covering_cells_contain_every_point_in_radius():
+    rng = random.Random(7)
+    for _ in range(300):
+        lat, lng = rng.uniform(-80, 80), rng.uniform(-180, 180)
+        radius = rng.choice([0.5, 5, 25, 100, 400])
+        cells = covering_cells(lat, lng, radius)
+        assert len(cells) <= MAX_COVERING_CELLS
+        # A point on the circle in a random direction must fall in a covered cell
+        bearing = rng.uniform(0, 2 * math.pi)
+        d_lat = radius * 0.999 * math.cos(bearing) / 111.32
+        d_lng = radius * 0.999 * math.sin(bearing) / (111.32 * math.cos(math.radians(lat + d_lat)))
+        point = encode_geohash(lat + d_lat, (lng + d_lng + 180) % 360 - 180)
+        assert any(point.startswith(cell) for cell in cells), (lat, lng, radius, cells)
+
+
+def test_query_near_filters_by_exact_distance():
+    near = MagicMock(id='near')
+    near.to_dict.return_value = {'lat': 44.57, 'lng': -123.27}
+    far = MagicMock(id='far')
+    far.to_dict.return_value = {'lat': 44.90, 'lng': -123.27}
+    collection = MagicMock()
+    collection.where.return_value.where.return_value.order_by.return_value.limit.return_value.stream.side_effect = lambda: iter([near, far])
+
+    results = list(query_near(collection, 44.5646, -123.2620, 5))
+
+    assert {doc.id for doc, _, _ in results} == {'near'}
+
+
+def test_covering_cells_use_finer_cells_for_small_radii():
+    cells = covering_cells(44.5646, -123.2620, 25)
+    assert len(cells[0]) >= 4
+    assert len(cells) <= 16
+
+
+def test_query_cell_pages_and_reports_truncation():
+    from geo import query_cell
+
+    docs = [MagicMock(id=f"a{i}") for i in range(5)]
+    base = MagicMock()
+    collection = MagicMock()
+    collection.where.return_value.where.return_value.order_by.return_value = base
+
+    def page(after):
+        start = 0 if after is None else docs.index(after) + 1
+        return lambda size: MagicMock(stream=lambda: iter(docs[start:start + size]))
+
+    base.limit.side_effect = page(None)
+    base.start_after.side_effect = lambda last: MagicMock(limit=MagicMock(side_effect=page(last)))
+
+    assert [doc.id for doc in query_cell(collection, 'c2', page_size=2)] == ['a0', 'a1', 'a2', 'a3', 'a4']
+
+    stats = {}
+    assert len(list(query_cell(collection, 'c2', limit=3, page_size=2, stats=stats))) == 3
+    assert stats['truncated']
@@ -0,0 +1,199 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import ingest
+from ingest import ingest_alerts
+
+
+def make_db(existing_ids=()):
+    """Build a Firestore mock whose get_all reports `existing_ids` as present."""
+    db = MagicMock()
+    db.collection.return_value.document.side_effect = lambda doc_id: MagicMock(id=doc_id)
+
+    def get_all(refs):
+        return [MagicMock(id=ref.id, exists=ref.id in existing_ids) for ref in refs]
+
+    db.get_all.side_effect = get_all
+    return db
+
+
+def test_ingest_skips_existing_and_duplicate_ids():
+    db = make_db(existing_ids={'usgs_a'})
+    candidates = [('usgs_a', {'title': 'A'}), ('usgs_b', {'title': 'B'}), ('usgs_b', {'title': 'B'})]
+
+    inserted = []
+    stats = ingest_alerts(db, 'usgs', candidates, inserted=inserted)
+
+    assert [doc_id for doc_id, _ in inserted] == ['usgs_b']
+    assert stats['candidates'] == 3
+    assert stats['existing'] == 1
+    assert stats['written'] == 1
+    assert stats['batches'] == 1
+    batch = db.batch.return_value
+    batch.set.assert_called_once()
+    batch.commit.assert_called_once()
+
+
+def test_ingest_chunks_lookups_and_batches_writes():
+    db = make_db()
+    candidates = ((f"firms_{i}", {'title': 'Hotspot'}) for i in range(1200))
+
+    stats = ingest_alerts(db, 'firms', candidates)
+
+    assert stats['written'] == 1200
+    # 1200 new docs -> one lookup and one batch per chunk of 500, 500, 200
+    assert stats['batches'] == 3
+    assert db.get_all.call_count == -(-1200 // ingest.EXISTENCE_CHUNK_SIZE)
+
+
+def test_seen_ids_skip_firestore_lookups_on_repeat_runs(tmp_path):
+    from seen_ids import SeenIdRegistry
+
+    path = str(tmp_path / "seen.json")
+    seen = SeenIdRegistry(path=path)
+    db = make_db(existing_ids={'usgs_old'})
+    feed = [('usgs_old', {}), ('usgs_new', {})]
+
+    first = ingest_alerts(db, 'usgs', feed, seen=seen)
+    assert first['skipped_seen'] == 0
+    assert first['written'] == 1
+
+    second = ingest_alerts(db, 'usgs', feed + [('usgs_newer', {})], seen=seen)
+    assert second['skipped_seen'] == 2
+    assert second['written'] == 1
+    # Only the one unknown ID reached Firestore on the second run
+    assert [ref.id for ref in db.get_all.call_args.args[0]] == ['usgs_newer']
+
+    seen.save()
+    restored = SeenIdRegistry(path=path)
+    assert restored.filter_unseen('usgs', ['usgs_old', 'usgs_new', 'usgs_newer', 'usgs_x']) == ['usgs_x']
+    assert restored.stats()['usgs']['hits'] == 3
+
+
+def test_seen_ids_respect_ttl_and_size_bound():
+    from seen_ids import SeenIdRegistry
+
+    seen = SeenIdRegistry(ttl=0)
+    seen.mark('nws', ['nws_a'])
+    assert seen.filter_unseen('nws', ['nws_a']) == ['nws_a']
+
+    bounded = SeenIdRegistry(max_entries=2)
+    bounded.mark('firms', ['firms_1', 'firms_2', 'firms_3'])
+    assert bounded.filter_unseen('firms', ['firms_1', 'firms_2', 'firms_3']) == ['firms_1']
+    assert bounded.stats()['firms']['evictions'] == 1
+
+
+def test_upsert_merges_existing_and_bypasses_seen(tmp_path):
+    from seen_ids import SeenIdRegistry
+
+    seen = SeenIdRegistry(path=str(tmp_path / "seen.json"))
+    seen.mark('firms', ['cluster_old'])
+    db = make_db(existing_ids={'cluster_old'})
+
+    inserted = []
+    stats = ingest_alerts(db, 'firms', [('cluster_old', {'pixel_count': 5}), ('cluster_new', {'pixel_count': 1})],
+                          seen=seen, inserted=inserted, upsert=True)
+
+    assert stats['skipped_seen'] == 0
+    assert stats['written'] == 1
+    assert stats['updated'] == 1
+    # Only brand-new alerts feed user matching
+    assert [doc_id for doc_id, _ in inserted] == ['cluster_new']
+    calls = {call.args[0].id: call.kwargs for call in db.batch.return_value.set.call_args_list}
+    assert calls == {'cluster_new': {}, 'cluster_old': {'merge': True}}
+
+
+def test_resolve_folds_cross_source_duplicates_into_canonical():
+    db = make_db()
+    db.collection.return_value.where.return_value.limit.return_value.stream.return_value = []
+    usgs = ('usgs_1', {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.0, 'lng': -122.0, 'event_time': 1.0e9})
+    inserted = []
+    with patch.object(ingest, 'resolve_events', return_value={'usgs_1': 'gdacs_EQ_9'}):
+        stats = ingest_alerts(db, 'usgs', [usgs], inserted=inserted, resolve=True)
+
+    assert stats['written'] == 0
+    assert stats['merged'] == 1
+    assert inserted == []
+    update = db.batch.return_value.update.call_args
+    assert update.args[0].id == 'gdacs_EQ_9'
+    assert set(update.args[1]) == {'sources', 'contributing_ids', 'updated_at'}
+    # The folded alert is kept as a redirect, not as a second alert
+    redirect = db.batch.return_value.set.call_args
+    db.collection.assert_any_call('alert_redirects')
+    assert redirect.args[0].id == 'usgs_1'
+    assert redirect.args[1]['canonical_id'] == 'gdacs_EQ_9'
+
+
+def test_folds_in_a_full_chunk_stay_within_the_batch_limit():
+    db = make_db()
+    batches = []
+    db.batch.side_effect = lambda: batches.append(MagicMock()) or batches[-1]
+    quakes = [(f'usgs_{i}', {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.0, 'lng': -122.0,
+                             'event_time': 1.0e9}) for i in range(ingest.EXISTENCE_CHUNK_SIZE)]
+    folds = {f'usgs_{i}': f'gdacs_EQ_{i}' for i in range(50)}
+    with patch.object(ingest, 'resolve_events', return_value=folds):
+        stats = ingest_alerts(db, 'usgs', quakes, resolve=True)
+
+    sizes = [len(batch.set.call_args_list) + len(batch.update.call_args_list) for batch in batches]
+    assert sum(sizes) == ingest.EXISTENCE_CHUNK_SIZE + 50
+    assert max(sizes) <= ingest.FIRESTORE_BATCH_LIMIT
+    assert stats['batches'] == len(batches) == 2
+    assert all(batch.commit.call_count == 1 for batch in batches)
+    assert stats['written'] == ingest.EXISTENCE_CHUNK_SIZE - 50 and stats['merged'] == 50
+
+
+def test_redirected_alerts_are_skipped_or_updated_in_place():
+    redirect = {'canonical_id': 'gdacs_EQ_9', 'version': 2.0, 'source': 'USGS'}
+    collections = {'alerts': MagicMock(), 'alert_redirects': MagicMock()}
+    for name, ref in collections.items():
+        ref.document.side_effect = lambda doc_id, name=name: MagicMock(id=doc_id, collection=name)
+    db = MagicMock()
+    db.collection.side_effect = collections.__getitem__
+    db.get_all.side_effect = lambda refs: [
+        MagicMock(id=ref.id, exists=ref.collection == 'alert_redirects', **{'to_dict.return_value': redirect})
+        for ref in refs]
+    quake = {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.0, 'lng': -122.0, 'event_time': 1.0e9}
+
+    with patch.object(ingest, 'resolve_events') as mock_resolve:
+        unchanged = ingest_alerts(db, 'usgs', [('usgs_1', {**quake, 'version': 2.0})], resolve=True)
+        revised = ingest_alerts(db, 'usgs', [('usgs_1', {**quake, 'version': 3.0})], resolve=True)
+
+    mock_resolve.assert_not_called()
+    assert unchanged['existing'] == 1 and unchanged['batches'] == 0
+    assert revised['updated'] == 1 and revised['merged'] == 0
+    (ref, fields), kwargs = db.batch.return_value.set.call_args
+    assert (ref.collection, ref.id, kwargs) == ('alert_redirects', 'usgs_1', {'merge': True})
+    assert fields['version'] == 3.0
+    # The canonical alert users query carries the revision too
+    (ref, fields), _ = db.batch.return_value.update.call_args
+    assert (ref.collection, ref.id) == ('alerts', 'gdacs_EQ_9')
+    assert fields['latest_contribution']['version'] == 3.0
+    assert 'updated_at' in fields
+    assert db.batch.return_value.update.call_count == 1
+
+
+def test_upsert_sources_are_indexed_but_not_folded():
+    db = make_db()
+    cluster = ('firms_cluster_1', {'hazardType': 'wildfire', 'source': 'NASA FIRMS', 'lat': 40.0, 'lng': -120.0})
+    with patch.object(ingest, 'resolve_events') as mock_resolve:
+        stats = ingest_alerts(db, 'firms', [cluster], upsert=True, resolve=True)
+
+    mock_resolve.assert_not_called()
+    assert stats['written'] == 1
+    assert db.batch.return_value.set.call_args.args[1]['event_key'].startswith('wildfire:')
+
+
+def test_resolve_indexes_new_alerts():
+    db = make_db()
+    usgs = ('usgs_1', {'hazardType': 'earthquake', 'source': 'USGS', 'lat': 38.0, 'lng': -122.0, 'event_time': 1.0e9})
+    with patch.object(ingest, 'resolve_events', return_value={}):
+        stats = ingest_alerts(db, 'usgs', [usgs], resolve=True)
+
+    assert stats['written'] == 1
+    payload = db.batch.return_value.set.call_args.args[1]
+    assert payload['event_key'].startswith('earthquake:')
+    assert payload['sources'] == ['USGS']
+    assert payload['contributing_ids'] == ['usgs_1']
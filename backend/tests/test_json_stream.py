@@ -0,0 +1,50 @@
+import sys
+import os
+import json
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from json_stream import iter_json_array
+
+
+def byte_chunks(text, size):
+    data = text.encode('utf-8')
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+DOC = {
+    "type": "FeatureCollection",
+    "metadata": {"title": "Zürich \"quoted\" [not the array]", "count": 3},
+    "features": [
+        {"id": "a", "properties": {"mag": 4.5, "place": "Tōkyō"}, "geometry": {"coordinates": [139.7, 35.6, 10]}},
+        {"id": "b", "properties": {"mag": 1.25e1}, "geometry": None},
+        {"id": "c", "properties": {"tags": [[], {}, "]"]}},
+    ],
+    "bbox": [1, 2, 3]
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 1 << 20])
+def test_yields_array_items_for_any_chunking(chunk_size):
+    items = list(iter_json_array(byte_chunks(json.dumps(DOC, ensure_ascii=False), chunk_size), 'features'))
+    assert items == DOC['features']
+
+
+def test_items_are_yielded_before_the_stream_ends():
+    def chunks():
+        yield b'{"events": [{"id": 1}, '
+        raise AssertionError("read past the first item")
+
+    assert next(iter_json_array(chunks(), 'events')) == {"id": 1}
+
+
+def test_missing_or_empty_key_yields_nothing():
+    assert list(iter_json_array([b'{"type": "FeatureCollection", "events": [1]}'], 'features')) == []
+    assert list(iter_json_array([b'{"features": []}'], 'features')) == []
+    assert list(iter_json_array([b'{}'], 'features')) == []
+
+
+def test_truncated_stream_raises():
+    with pytest.raises(ValueError):
+        list(iter_json_array([b'{"features": [{"id": 1}, {"id": '], 'features'))
@@ -0,0 +1,123 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from geo import encode_geohash
+from matching import match_and_notify
+
+NOW = 1_700_000_000
+
+
+def user_doc(uid, lat, lng, **extra):
+    doc = MagicMock(id=uid)
+    doc.to_dict.return_value = {'last_lat': lat, 'last_lng': lng, 'geohash': encode_geohash(lat, lng),
+                                'fcm_token': f'token-{uid}', **extra}
+    return doc
+
+
+USERS = [
+    user_doc('near_a', 44.56, -123.26),
+    user_doc('near_both', 44.60, -123.10),
+    user_doc('throttled', 44.57, -123.25, last_alert_push_at=NOW - 60),
+    user_doc('far', 47.60, -122.33),
+    user_doc('no_token', 44.56, -123.26, fcm_token=None),
+]
+ALERTS = [
+    ('usgs_a', {'title': 'Earthquake: M4.1', 'message': 'Near Corvallis', 'hazardType': 'earthquake', 'lat': 44.56, 'lng': -123.20}),
+    ('usgs_b', {'title': 'Earthquake: M3.2', 'message': 'Near Albany', 'hazardType': 'earthquake', 'lat': 44.63, 'lng': -123.00}),
+]
+
+
+def fake_query_cell(collection_ref, cell):
+    return [doc for doc in USERS if doc.to_dict()['geohash'].startswith(cell)]
+
+
+def make_db(docs):
+    """Firestore mock whose user refs read back the given docs inside a transaction."""
+    db = MagicMock()
+    by_id = {doc.id: doc for doc in docs}
+    db.collection.return_value.document.side_effect = lambda uid: MagicMock(
+        id=uid, **{'get.return_value': by_id[uid]})
+    return db
+
+
+def transaction_updates(db):
+    return {call.args[0].id: call.args[1] for call in db.transaction.return_value.update.call_args_list}
+
+
+def test_grid_join_notifies_each_nearby_user_once_per_window():
+    db = make_db(USERS)
+    report_stub = lambda db, targets, title, body, data: {'success': len(targets), 'failure': 0}
+
+    with patch('matching.query_cell', side_effect=fake_query_cell) as mock_query, \
+         patch('matching.dispatch', side_effect=report_stub) as mock_dispatch:
+        report = match_and_notify(db, ALERTS, radius_km=15, window=900, now=NOW)
+
+    sent = {call.args[2]: (call.args[1], call.args[4]) for call in mock_dispatch.call_args_list}
+    assert sent['Earthquake: M4.1'][0] == {'token-near_a': 'near_a'}
+    assert sent['Earthquake: M4.1'][1]['alert_id'] == 'usgs_a'
+    assert sent['2 new alerts near you'][0] == {'token-near_both': 'near_both'}
+    assert report['matched_users'] == 3
+    assert report['throttled'] == 1
+    assert report['notified'] == report['delivered'] == 2
+    # Users are read per covering cell, not per (alert, user) pair
+    cells = [call.args[1] for call in mock_query.call_args_list]
+    assert len(cells) == len(set(cells))
+    updates = transaction_updates(db)
+    assert set(updates) == {'near_a', 'near_both', 'throttled'}
+    assert updates['near_a']['last_alert_push_at'] == updates['near_both']['last_alert_push_at'] == NOW
+    # The throttled user's match is queued for a digest, not dropped
+    queued = updates['throttled']
+    assert 'last_alert_push_at' not in queued
+    assert queued['alert_digest_due'] == NOW - 60 + 900
+    assert [entry['id'] for entry in queued['pending_alerts'].values] == ['usgs_a']
+
+
+def test_queued_alerts_are_sent_as_a_digest_once_the_window_ends():
+    pending = [{'id': 'usgs_a', 'title': 'Earthquake: M4.1', 'message': 'Near Corvallis',
+                'hazardType': 'earthquake', 'lat': 44.56, 'lng': -123.20},
+               {'id': 'gdacs_b', 'title': 'Flood Alert', 'message': 'Willamette River',
+                'hazardType': 'flood', 'lat': 44.6, 'lng': -123.1}]
+    due_user = user_doc('waiting', 45.0, -122.0, last_alert_push_at=NOW - 1000,
+                        pending_alerts=pending, alert_digest_due=NOW - 100)
+    db = make_db([due_user])
+    db.collection.return_value.where.return_value.limit.return_value.stream.return_value = [due_user]
+    report_stub = lambda db, targets, title, body, data: {'success': len(targets), 'failure': 0}
+
+    with patch('matching.query_cell', return_value=[]), \
+         patch('matching.dispatch', side_effect=report_stub) as mock_dispatch:
+        report = match_and_notify(db, [], radius_km=15, window=900, now=NOW)
+
+    (_, targets, title, body, data), = [call.args for call in mock_dispatch.call_args_list]
+    assert targets == {'token-waiting': 'waiting'}
+    assert title == '2 new alerts near you'
+    assert data['alert_ids'] == 'gdacs_b,usgs_a'
+    assert report['digests'] == 1 and report['delivered'] == 1
+    assert transaction_updates(db)['waiting']['last_alert_push_at'] == NOW
+
+
+def test_concurrent_run_inside_the_window_queues_instead_of_pushing():
+    # Listed as due by the query, but another source's run pushed meanwhile
+    stale = user_doc('raced', 44.56, -123.26, last_alert_push_at=NOW - 1000, alert_digest_due=NOW - 100,
+                     pending_alerts=[{'id': 'old', 'title': 'Old', 'lat': 44.5, 'lng': -123.2}])
+    fresh = user_doc('raced', 44.56, -123.26, last_alert_push_at=NOW - 5)
+    db = make_db([fresh])
+    db.collection.return_value.where.return_value.limit.return_value.stream.return_value = [stale]
+
+    with patch('matching.query_cell', return_value=[fresh]), patch('matching.dispatch') as mock_dispatch:
+        report = match_and_notify(db, ALERTS[:1], radius_km=15, window=900, now=NOW)
+
+    mock_dispatch.assert_not_called()
+    assert report['throttled'] == 1
+    fields = transaction_updates(db)['raced']
+    assert 'pending_alerts' in fields and 'last_alert_push_at' not in fields
+    assert fields['alert_digest_due'] == NOW - 5 + 900
+
+
+def test_no_matches_sends_nothing():
+    with patch('matching.query_cell', return_value=[]), patch('matching.dispatch') as mock_dispatch:
+        report = match_and_notify(MagicMock(), ALERTS, radius_km=15, now=NOW)
+    mock_dispatch.assert_not_called()
+    assert report['notified'] == 0
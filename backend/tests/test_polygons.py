@@ -0,0 +1,50 @@
+import sys
+import os
+import math
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from polygons import compact_geometry, contains, point_cells, simplify_ring
+
+
+def circle(lng, lat, radius, vertices):
+    ring = [[lng + radius * math.cos(2 * math.pi * i / vertices), lat + radius * math.sin(2 * math.pi * i / vertices)]
+            for i in range(vertices)]
+    return ring + [ring[0]]
+
+
+def shoelace(points):
+    x, y = points[:, 0], points[:, 1]
+    return abs(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) / 2
+
+
+def test_simplify_ring_keeps_shape_within_vertex_budget():
+    ring = circle(-123.0, 44.5, 0.5, 2000)
+    simplified = simplify_ring(ring, max_vertices=48)
+
+    assert len(simplified) - 1 <= 48
+    assert np.array_equal(simplified[0], simplified[-1])
+    assert abs(shoelace(simplified) / shoelace(np.asarray(ring)) - 1) < 0.02
+
+
+def test_compact_geometry_is_firestore_safe_and_tests_points():
+    # A county-sized warning with a hole, plus a second part to the east
+    geometry = {'type': 'MultiPolygon', 'coordinates': [
+        [circle(-123.0, 44.5, 0.5, 500), circle(-123.0, 44.5, 0.1, 50)],
+        [circle(-121.0, 44.5, 0.2, 300)],
+    ]}
+    shape = compact_geometry(geometry, max_vertices=64)
+
+    for ring in shape['geometry']['rings']:
+        assert all(isinstance(value, float) for value in ring['coords'])  # no nested arrays
+    assert sum(len(ring['coords']) // 2 - 1 for ring in shape['geometry']['rings']) <= 64 + 4
+    assert shape['bbox']['min_lng'] < -123.4 and shape['bbox']['max_lng'] > -120.9
+    assert -123.0 < shape['centroid']['lng'] < -122.0
+    alert = {'geometry': shape['geometry'], 'bbox': shape['bbox']}
+    assert contains(alert, 44.5, -122.7)       # inside the first part
+    assert not contains(alert, 44.5, -123.0)   # inside the hole
+    assert contains(alert, 44.5, -121.0)       # inside the second part
+    assert not contains(alert, 44.5, -122.0)   # between the parts
+    assert not contains(alert, 50.0, -122.7)   # outside the bbox
+    assert set(point_cells(44.5, -122.7)) & set(shape['cover_cells'])
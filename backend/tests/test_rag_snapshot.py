@@ -0,0 +1,64 @@
+import sys
+import os
+import json
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from rag_snapshot import RagSnapshot, playbook_hashes, warm, SNAPSHOT_VERSION
+
+PLAYBOOKS = [
+    {'id': 'mock_playbook_flood.txt', 'hazard': 'flood', 'text': 'Avoid flood water.'},
+    {'id': 'mock_playbook_tsunami.txt', 'hazard': 'tsunami', 'text': 'Move to high ground.'},
+]
+
+
+def test_snapshot_round_trips_and_drops_entries_whose_playbook_changed(tmp_path):
+    path = str(tmp_path / 'rag_snapshot.json')
+    snapshot = RagSnapshot(path, playbook_hashes(PLAYBOOKS))
+    snapshot.put('flood', 'Avoid flood water.')
+    snapshot.put('tsunami', 'Move to high ground.')
+    snapshot.put('sinkhole', None)  # no playbook: a cached "no context" answer
+    snapshot.save()
+
+    reloaded = RagSnapshot(path, playbook_hashes(PLAYBOOKS))
+    assert reloaded.get('flood') == (True, 'Avoid flood water.')
+    assert reloaded.get('sinkhole') == (True, None)
+    assert reloaded.get('wildfire') == (False, None)
+
+    edited = [dict(PLAYBOOKS[0], text='Avoid flood water. Never drive through it.'), PLAYBOOKS[1]]
+    after_edit = RagSnapshot(path, playbook_hashes(edited))
+    assert after_edit.get('flood') == (False, None)
+    assert after_edit.get('tsunami') == (True, 'Move to high ground.')
+
+
+def test_snapshot_ignores_other_versions_and_corrupt_files(tmp_path):
+    path = tmp_path / 'rag_snapshot.json'
+    path.write_text(json.dumps({'version': SNAPSHOT_VERSION + 1, 'entries': {
+        'flood': {'context': 'old', 'playbook_hash': playbook_hashes(PLAYBOOKS)['flood']}}}))
+    assert RagSnapshot(str(path), playbook_hashes(PLAYBOOKS)).get('flood') == (False, None)
+
+    path.write_text('{"version": 1, "entr')
+    assert RagSnapshot(str(path), playbook_hashes(PLAYBOOKS)).stats()['size'] == 0
+
+
+def test_warm_computes_missing_hazards_concurrently_and_skips_failures(tmp_path):
+    path = str(tmp_path / 'rag_snapshot.json')
+    snapshot = RagSnapshot(path, playbook_hashes(PLAYBOOKS))
+    snapshot.put('flood', 'cached')
+    barrier = threading.Barrier(2, timeout=5)
+
+    def compute(hazard):
+        barrier.wait()  # Deadlocks unless both hazards run at the same time
+        if hazard == 'tsunami':
+            raise RuntimeError('embedding API down')
+        return f'{hazard} context'
+
+    result = warm(snapshot, {'flood', 'tsunami', 'wildfire'}, compute)
+
+    assert result['warmed'] == 1
+    assert result['failed'] == ['tsunami']
+    assert result['cached'] == 1
+    reloaded = RagSnapshot(path, playbook_hashes(PLAYBOOKS))
+    assert reloaded.get('wildfire') == (True, 'wildfire context')
+    assert reloaded.get('tsunami') == (False, None)
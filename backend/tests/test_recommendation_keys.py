@@ -0,0 +1,50 @@
+import sys
+import os
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from recommendation_keys import (
+    HazardHitCounter, alert_level, coarse_region, is_coastal, magnitude_bucket, recommendation_key,
+)
+
+
+def test_signals_are_bucketed():
+    assert magnitude_bucket("Earthquake: M4.6") == '4'
+    assert magnitude_bucket("Magnitude 7.9 offshore") == '7'
+    assert magnitude_bucket("M 8.3") == '8+'
+    assert magnitude_bucket("Heavy rain expected") is None
+    assert alert_level("Orange Alert: Tropical Cyclone") == 'severe'
+    assert alert_level("Flood Watch in effect") == 'moderate'
+    assert alert_level("Green Alert: Drought") == 'minor'
+    assert alert_level("No specific details provided.") is None
+
+
+def test_key_ignores_free_text_and_street_address():
+    a = recommendation_key('earthquake', "Earthquake: M4.6 near 12 Main St", 'Corvallis, Oregon', False)
+    b = recommendation_key('earthquake', "m4.2, felt strongly downtown", 'corvallis, oregon', False)
+    c = recommendation_key('earthquake', "Earthquake: M5.0", 'Corvallis, Oregon', False)
+    d = recommendation_key('earthquake', "Earthquake: M4.6", 'Corvallis, Oregon', True)
+    assert a == b
+    assert len({a, c, d}) == 3
+
+
+def test_region_and_coastal_flag():
+    features = [
+        {'place_name': '1 Beach Loop Dr, Bandon, Oregon', 'place_type': ['address']},
+        {'place_name': 'Bandon, Oregon, United States', 'place_type': ['place']},
+        {'place_name': 'Oregon, United States', 'place_type': ['region']},
+    ]
+    assert coarse_region(features, 43.1, -124.4) == 'Bandon, Oregon, United States'
+    assert coarse_region([], 43.1, -124.4) == 'area near 43, -124'
+    assert is_coastal(*(f['place_name'] for f in features))
+    assert not is_coastal('Portland, Oregon', 'Boise, Idaho')
+
+
+def test_hit_counter_reports_per_hazard_rates():
+    counter = HazardHitCounter()
+    for hit in (False, True, True, True):
+        counter.record('flood', hit)
+    counter.record('wildfire', False)
+    stats = counter.stats()
+    assert stats['by_hazard']['flood'] == {'hits': 3, 'misses': 1, 'hit_rate': 0.75}
+    assert stats['hit_rate'] == 0.6
@@ -0,0 +1,51 @@
+import sys
+import os
+import numpy as np
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from retrieval import LocalVectorIndex
+from playbooks import hazard_for_filename, load_playbooks
+
+
+def make_index():
+    rng = np.random.default_rng(0)
+    records = [
+        {'id': f'mock_playbook_{h}_{i}.txt', 'hazard': h, 'text': f'{h} playbook {i}', 'values': rng.normal(size=16)}
+        for i, h in enumerate(['flood', 'wildfire', 'flood', 'earthquake'])
+    ]
+    return LocalVectorIndex.from_records(records), records
+
+
+def test_query_honours_hazard_filter_and_ranks_by_cosine():
+    index, records = make_index()
+    target = records[2]['values'] * 3.0  # Same direction, different norm
+
+    result = index.query(vector=target, top_k=1, include_metadata=True, filter={"hazard": {"$eq": "flood"}})
+    assert result.matches[0].id == records[2]['id']
+    assert result.matches[0].score == pytest.approx(1.0, abs=1e-5)
+    assert result.matches[0].metadata['text'] == 'flood playbook 2'
+
+    both = index.query(vector=target, top_k=5, filter={"hazard": "flood"})
+    assert [m.id for m in both.matches][0] == records[2]['id']
+    assert len(both.matches) == 2
+
+    assert index.query(vector=target, top_k=1, filter={"hazard": {"$eq": "tsunami"}}).matches == []
+
+
+def test_snapshot_roundtrip(tmp_path):
+    index, records = make_index()
+    path = str(tmp_path / "index.npz")
+    index.save(path)
+
+    restored = LocalVectorIndex.load(path)
+    query = records[1]['values']
+    assert restored.query(vector=query, top_k=1).matches[0].id == records[1]['id']
+
+
+def test_playbook_corpus_is_tagged_with_hazards():
+    playbooks = load_playbooks()
+    assert len(playbooks) >= 30
+    assert hazard_for_filename('mock_playbook_volcanic_eruption.txt') == 'volcanic_eruption'
+    assert all(p['hazard'] != 'general' for p in playbooks)
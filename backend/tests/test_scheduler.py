@@ -0,0 +1,41 @@
+import sys
+import os
+import time
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from scheduler import SyncScheduler
+from sources import SourceBusyError
+
+
+def test_failures_back_off_exponentially_and_reset_on_success():
+    run = MagicMock(side_effect=[Exception("upstream 503"), Exception("upstream 503"), {'written': 4, 'candidates': 9}])
+    sched = SyncScheduler(run=run, jitter=0.0)
+    interval = sched._state['usgs']['interval']
+
+    sched.run_once('usgs')
+    first_delay = sched._state['usgs']['next_run_at'] - time.time()
+    sched.run_once('usgs')
+    second_delay = sched._state['usgs']['next_run_at'] - time.time()
+
+    assert round(first_delay) == 2 * interval
+    assert round(second_delay) == 4 * interval
+    assert sched._state['usgs']['consecutive_failures'] == 2
+
+    sched.run_once('usgs')
+    state = sched._state['usgs']
+    assert state['consecutive_failures'] == 0
+    assert state['last_items'] == 4
+    assert round(state['next_run_at'] - time.time()) == interval
+
+
+def test_busy_source_is_skipped_without_counting_as_failure():
+    sched = SyncScheduler(run=MagicMock(side_effect=SourceBusyError("USGS sync is already running")))
+
+    sched.run_once('usgs')
+
+    status = sched.status()['sources']['usgs']
+    assert status['last_status'] == 'skipped'
+    assert status['consecutive_failures'] == 0
+    assert status['next_run_at'] is not None
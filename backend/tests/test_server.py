@@ -2,6 +2,8 @@ import pytest
 import json
 import sys
 import os
+import tempfile
+import threading
 from unittest.mock import MagicMock, patch
 
 # --- STEP 1: Mock External Modules BEFORE Import ---
@@ -20,6 +22,9 @@ sys.modules["openai"] = mock_openai_module
 os.environ['PINECONE_API_KEY'] = 'testing'
 os.environ['OPENAI_API_KEY'] = 'testing'
 os.environ['MAPBOX_ACCESS_TOKEN'] = 'testing'
+os.environ['RAG_WARM_ON_START'] = '0'
+os.environ['RAG_SNAPSHOT_PATH'] = os.path.join(tempfile.mkdtemp(), 'rag_snapshot.json')
+os.environ['CACHE_SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'cache.sqlite3')
 
 # --- STEP 3: Add Backend Path and Import Server ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -215,4 +220,302 @@ def test_push_notification_firebase_error(client, auth_headers, mock_messaging):
     # 3. Assertions
     assert response.status_code == 500
     data = response.get_json()
-    assert "Invalid registration token" in data["error"]
\ No newline at end of file
+    assert "Invalid registration token" in data["error"]
+
+
+def test_sync_all_reports_per_source(client):
+    """The fan-out endpoint returns one entry per requested source."""
+    report = {
+        'usgs': {'status': 'success', 'written': 2},
+        'nws': {'status': 'error', 'message': 'upstream down'},
+    }
+    with patch('server.run_all', return_value=report) as mock_run_all:
+        response = client.post("/api/sync/all?sources=usgs,nws")
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["status"] == "partial"
+    assert data["sources"]["usgs"]["written"] == 2
+    mock_run_all.assert_called_once_with(server.db, ['usgs', 'nws'])
+
+def test_sync_all_rejects_unknown_source(client):
+    response = client.post("/api/sync/all?sources=usgs,weather_underground")
+    assert response.status_code == 400
+
+def test_nearby_alerts_sorted_newest_first(client, auth_headers):
+    import datetime
+    older = MagicMock(id='usgs_old')
+    older.to_dict.return_value = {'title': 'Old', 'lat': 44.56, 'lng': -123.26,
+                                  'timestamp': datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)}
+    newer = MagicMock(id='nws_new')
+    newer.to_dict.return_value = {'title': 'New', 'lat': 44.57, 'lng': -123.25,
+                                  'timestamp': datetime.datetime(2026, 2, 1, tzinfo=datetime.timezone.utc)}
+    matches = [(older, older.to_dict(), 0.5), (newer, newer.to_dict(), 1.2)]
+
+    with patch('server.query_near', return_value=iter(matches)):
+        response = client.get("/api/alerts/nearby?lat=44.5646&lng=-123.262&radius_km=10", headers=auth_headers)
+
+    assert response.status_code == 200
+    alerts = response.get_json()["alerts"]
+    assert [a["id"] for a in alerts] == ['nws_new', 'usgs_old']
+    assert alerts[0]["distance_km"] == 1.2
+
+def test_nearby_alerts_validates_coordinates(client, auth_headers):
+    response = client.get("/api/alerts/nearby?lat=123&lng=0", headers=auth_headers)
+    assert response.status_code == 400
+
+def _alert_doc(doc_id, minute):
+    import datetime
+    ts = datetime.datetime(2026, 3, 1, 12, minute, tzinfo=datetime.timezone.utc)
+    data = {'title': doc_id, 'timestamp': ts, 'updated_at': ts}
+    doc = MagicMock(id=doc_id)
+    doc.to_dict.side_effect = lambda: dict(data)
+    doc.get.side_effect = data.get
+    return doc
+
+def test_notifications_delta_sync_and_etag(client, auth_headers):
+    from pagination import encode_cursor, decode_cursor
+    changed = [_alert_doc('usgs_a', 5), _alert_doc('nws_b', 6)]
+    query = server.db.collection.return_value.order_by.return_value.order_by.return_value.start_after.return_value
+    query.limit.return_value.stream.side_effect = lambda: iter(changed)
+
+    since = encode_cursor(_alert_doc('x', 1).get('updated_at'), 'x')
+    response = client.get(f"/api/notifications?since={since}", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [n['id'] for n in data['notifications']] == ['usgs_a', 'nws_b']
+    assert decode_cursor(data['sync_cursor'])[1] == 'nws_b'
+    start_after = server.db.collection.return_value.order_by.return_value.order_by.return_value.start_after
+    assert start_after.call_args.args[0]['__name__'] == 'x'
+
+    # Same poll with the ETag: nothing on the wire
+    etag = response.headers['ETag']
+    repeat = client.get(f"/api/notifications?since={since}", headers={**auth_headers, 'If-None-Match': etag})
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+
+def test_notifications_rejects_bad_cursor(client, auth_headers):
+    response = client.get("/api/notifications?cursor=not-a-cursor", headers=auth_headers)
+    assert response.status_code == 400
+
+def test_reverse_geocode_is_shared_across_nearby_points(client):
+    server.reverse_geocode_cache.clear()
+    mapbox_response = MagicMock(status_code=200)
+    mapbox_response.json.return_value = {'features': [{'place_name': 'Corvallis, Oregon', 'place_type': ['place']}]}
+
+    with patch('server.upstream.get', return_value=mapbox_response) as mock_get:
+        assert server.get_region(44.5646, -123.2620) == ('Corvallis, Oregon', False)
+        assert server.get_region(44.5646, -123.2620, 'Tsunami warning') == ('Corvallis, Oregon', True)
+        response = client.get("/reverse?lat=44.56462&lng=-123.26203")
+
+    assert response.get_json()['results'][0]['place_name'] == 'Corvallis, Oregon'
+    mock_get.assert_called_once()
+    server.reverse_geocode_cache.clear()
+
+def test_directions_cache_normalizes_queries(client):
+    server.directions_cache.clear()
+    mapbox_response = MagicMock(status_code=200)
+    mapbox_response.json.return_value = {'routes': [{'distance': 20000}]}
+
+    with patch('server.upstream.get', return_value=mapbox_response) as mock_get:
+        first = client.get("/directions?start=Corvallis,OR&end=Albany,OR")
+        second = client.get("/directions?start=%20corvallis%2C%20%20or&end=ALBANY,OR&profile=Driving")
+        coords = client.get("/directions?start=-123.26201,44.56461&end=-123.10591,44.63651")
+        coords_again = client.get("/directions?start=-123.262013,44.564608&end=-123.105909,44.636512")
+
+    assert first.get_json() == second.get_json()
+    assert coords.get_json() == coords_again.get_json()
+    assert mock_get.call_count == 2
+    assert server.normalize_place("  Corvallis ,OR ") == "corvallis, or"
+    server.directions_cache.clear()
+
+def test_local_index_is_a_drop_in_for_pinecone(mock_rag_dependencies):
+    from retrieval import LocalVectorIndex
+    local_index = LocalVectorIndex.from_records([
+        {'id': 'mock_playbook_tsunami.txt', 'hazard': 'tsunami', 'text': 'Move to high ground.', 'values': [0.1] * 1536},
+        {'id': 'mock_playbook_flood.txt', 'hazard': 'flood', 'text': 'Avoid flood water.', 'values': [0.2] * 1536},
+    ])
+    server.cache.clear()
+    with patch('server.index', local_index):
+        assert server.get_retrieved_context('tsunami') == 'Move to high ground.'
+    server.cache.clear()
+
+def test_playbook_edit_invalidates_retrieved_context(tmp_path):
+    from rag_snapshot import RagSnapshot
+    path = str(tmp_path / 'snapshot.json')
+    server.cache.clear()
+    with patch('server.retrieve_context', return_value='Old flood steps.'):
+        with patch('server.rag_snapshot', RagSnapshot(path, {'flood': 'hash-1'})):
+            assert server.get_retrieved_context('flood') == 'Old flood steps.'
+    # The playbook changed: its hash no longer matches, so the context is retrieved again
+    with patch('server.retrieve_context', return_value='New flood steps.'):
+        with patch('server.rag_snapshot', RagSnapshot(path, {'flood': 'hash-2'})):
+            assert server.get_retrieved_context('flood') == 'New flood steps.'
+    server.cache.clear()
+
+def test_recommendations_are_cached_on_normalized_signals(client, auth_headers, mock_rag_dependencies):
+    mock_openai, _ = mock_rag_dependencies
+    server.cache.clear()
+    server.reverse_geocode_cache.clear()
+    mapbox_response = MagicMock(status_code=200)
+    mapbox_response.json.return_value = {'features': [
+        {'place_name': '12 Main St, Corvallis, Oregon', 'place_type': ['address']},
+        {'place_name': 'Corvallis, Oregon, United States', 'place_type': ['place']},
+    ]}
+
+    def post(lat, lng, description):
+        payload = {"hazard": "earthquake", "user_lat": lat, "user_lng": lng, "event_description": description}
+        return client.post("/api/generate_prompt", data=json.dumps(payload),
+                           content_type="application/json", headers=auth_headers)
+
+    with patch('server.upstream.get', return_value=mapbox_response):
+        assert post(44.5646, -123.2620, "Earthquake: M4.6 near Corvallis").status_code == 200
+        assert post(44.5700, -123.2800, "M 4.1 felt downtown, 3 km deep").status_code == 200
+        assert post(44.5646, -123.2620, "Earthquake: M6.2 near Corvallis").status_code == 200
+
+    assert mock_openai.chat.completions.create.call_count == 2
+    user_message = mock_openai.chat.completions.create.call_args.kwargs['messages'][1]['content']
+    assert 'Location: Corvallis, Oregon, United States' in user_message
+    stats = server.recommendation_hits.stats()['by_hazard']['earthquake']
+    assert stats['hits'] >= 1
+    server.cache.clear()
+    server.reverse_geocode_cache.clear()
+
+def test_recommendation_leader_rechecks_cache_before_generating(mock_rag_dependencies):
+    mock_openai, _ = mock_rag_dependencies
+    cached = {"severity": "High", "message": "Move inland.", "actions": [], "source": "Cache"}
+    # Miss on the caller's lookup, then a hit once it leads the flight: an earlier leader just finished
+    with patch.object(server.cache, 'get', side_effect=[None, cached]):
+        assert server.get_recommendation('flood', '', 'context', ('Salem, Oregon', False)) == cached
+    mock_openai.chat.completions.create.assert_not_called()
+
+def test_generate_prompt_streams_partial_fields_then_final(client, auth_headers, mock_rag_dependencies):
+    mock_openai, _ = mock_rag_dependencies
+    server.cache.clear()
+    completion = json.dumps({"severity": "High", "message": "Evacuate the valley now.",
+                             "actions": ["Go uphill"], "source": "USGS"})
+    chunks = [MagicMock(choices=[MagicMock(delta=MagicMock(content=completion[i:i + 8]))])
+              for i in range(0, len(completion), 8)]
+    mock_openai.chat.completions.create.return_value = iter(chunks)
+    payload = {"hazard": "flood", "user_lat": 44.95, "user_lng": -123.03}
+
+    with patch('server.reverse_geocode_features', return_value=[]):
+        response = client.post("/api/generate_prompt?stream=1", data=json.dumps(payload),
+                               content_type="application/json", headers=auth_headers)
+        body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    frames = [frame.split('\n') for frame in body.strip().split('\n\n')]
+    events = [(lines[0][len('event: '):], json.loads(lines[1][len('data: '):])) for lines in frames]
+    names = [name for name, _ in events]
+    assert names[0] == 'severity' and names[-1] == 'final'
+    assert ''.join(data['delta'] for name, data in events if name == 'message') == "Evacuate the valley now."
+    assert events[-1][1]['recommendation']['actions'] == ["Go uphill"]
+    assert mock_openai.chat.completions.create.call_args.kwargs['stream'] is True
+    server.cache.clear()
+
+def test_generate_prompt_batch_dedupes_and_keeps_input_order(client, auth_headers, mock_rag_dependencies):
+    mock_openai, _ = mock_rag_dependencies
+    server.cache.clear()
+    payload = {"user_lat": 44.95, "user_lng": -123.03, "items": [
+        {"hazard": "flood", "event_description": "Flood Watch"},
+        {"hazard": "unknown_thing"},
+        {"hazard": "FLOOD", "event_description": "Flood Watch"},
+        {"hazard": "wildfire", "event_description": "Red Flag Warning"},
+    ]}
+
+    with patch('server.reverse_geocode_features', return_value=[]) as mock_geocode:
+        response = client.post("/api/generate_prompt/batch", data=json.dumps(payload),
+                               content_type="application/json", headers=auth_headers)
+
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [r['hazard'] for r in results] == ['Flood', 'Unknown Thing', 'Flood', 'Wildfire']
+    assert [r['status'] for r in results] == ['success', 'warning', 'success', 'success']
+    assert results[0] == results[2]
+    mock_geocode.assert_called_once()
+    assert mock_openai.chat.completions.create.call_count == 2
+    server.cache.clear()
+
+def test_generate_prompt_batch_validates_items(client, auth_headers):
+    response = client.post("/api/generate_prompt/batch", data=json.dumps({"user_lat": 44.95, "user_lng": -123.03, "items": []}),
+                           content_type="application/json", headers=auth_headers)
+    assert response.status_code == 400
+    assert 'items' in response.get_json()['messages']
+
+def test_user_location_is_stored_with_geohash(client, auth_headers):
+    server.db.reset_mock()
+    response = client.post("/api/users/location", data=json.dumps({"lat": 44.5646, "lng": -123.2620}),
+                           content_type="application/json", headers=auth_headers)
+
+    assert response.status_code == 200
+    server.db.collection.assert_called_with('users')
+    server.db.collection.return_value.document.assert_called_with('test_firebase_uid_123')
+    fields, = server.db.collection.return_value.document.return_value.set.call_args.args
+    assert fields['geohash'] == server.encode_geohash(44.5646, -123.2620)
+    assert server.db.collection.return_value.document.return_value.set.call_args.kwargs == {'merge': True}
+
+def test_push_area_dispatches_to_nearby_users(client, auth_headers, mock_auth):
+    mock_auth.return_value = {'uid': 'test_firebase_uid_123', 'admin': True}
+    targets = {'token-a': 'uid-a', 'token-b': 'uid-b'}
+    report = {'targets': 2, 'success': 2, 'failure': 0, 'pruned': 0, 'total_ms': 1.0, 'batches': []}
+    payload = {"title": "Wildfire", "message": "Evacuate now", "lat": 44.56, "lng": -123.26, "radius_km": 5}
+
+    with patch('server.resolve_targets', return_value=targets) as mock_resolve, \
+         patch('server.dispatch', return_value=report) as mock_dispatch:
+        response = client.post("/api/push/area", data=json.dumps(payload),
+                               content_type="application/json", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['report']['success'] == 2
+    mock_resolve.assert_called_once_with(server.db, 44.56, -123.26, 5.0)
+    assert mock_dispatch.call_args.args[1] == targets
+
+def test_push_area_rejects_non_admin_users(client, auth_headers):
+    payload = {"title": "Wildfire", "message": "Evacuate now", "lat": 44.56, "lng": -123.26, "radius_km": 500}
+
+    with patch('server.resolve_targets') as mock_resolve, patch('server.dispatch') as mock_dispatch:
+        response = client.post("/api/push/area", data=json.dumps(payload),
+                               content_type="application/json", headers=auth_headers)
+
+    assert response.status_code == 403
+    mock_resolve.assert_not_called()
+    mock_dispatch.assert_not_called()
+
+def test_affecting_alerts_tests_point_in_polygon(client, auth_headers):
+    from polygons import compact_geometry
+    square = compact_geometry({'type': 'Polygon', 'coordinates': [[[-124, 44], [-123, 44], [-123, 45], [-124, 45], [-124, 44]]]})
+    triangle = compact_geometry({'type': 'Polygon', 'coordinates': [[[-124, 44], [-123, 44], [-124, 45], [-124, 44]]]})
+    docs = []
+    for doc_id, shape in (('nws_square', square), ('nws_triangle', triangle)):
+        doc = MagicMock(id=doc_id)
+        doc.to_dict.return_value = {'title': doc_id, 'geometry': shape['geometry'], 'bbox': shape['bbox']}
+        docs.append(doc)
+    server.db.reset_mock()
+    server.db.collection.return_value.where.return_value.stream.return_value = docs
+
+    response = client.get("/api/alerts/affecting?lat=44.8&lng=-123.2", headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [alert['id'] for alert in body['alerts']] == ['nws_square']
+    assert body['candidates'] == 2
+
+
+def test_playbook_index_and_rag_warm_start_lazily(client):
+    """Importing server opens no Pinecone connection; both start on first use."""
+    with patch.object(server, 'index', None), \
+         patch('server.load_playbook_index', return_value='loaded') as mock_load:
+        assert server.get_playbook_index() == 'loaded'
+        assert server.get_playbook_index() == 'loaded'
+    mock_load.assert_called_once()
+
+    with patch.dict(server.app.config, {'RAG_WARM_ON_START': True}), \
+         patch.object(server, '_rag_warm_started', threading.Event()), \
+         patch('server.threading.Thread') as mock_thread:
+        client.get('/')
+        client.get('/')
+    mock_thread.assert_called_once()
+    assert mock_thread.call_args.kwargs['target'] is server.warm_rag_cache
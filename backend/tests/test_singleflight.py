@@ -0,0 +1,84 @@
+import sys
+import os
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, count):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(flight.do(key, fn))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def wait_for_waiters(flight, count):
+    deadline = time.time() + 5
+    while flight.stats()['coalesced'] < count and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test')
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return {'context': 'Move to high ground.'}
+
+    threads, results, errors = run_concurrently(flight, 'tsunami', fetch, 8)
+    wait_for_waiters(flight, 7)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert errors == []
+    assert results == [{'context': 'Move to high ground.'}] * 8
+    stats = flight.stats()
+    assert stats['executions'] == 1 and stats['coalesced'] == 7
+    assert stats['in_flight'] == 0
+
+
+def test_leader_error_is_shared_and_not_remembered():
+    flight = SingleFlight('test')
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError('upstream down')
+
+    threads, results, errors = run_concurrently(flight, 'k', failing, 3)
+    wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == []
+    assert [str(e) for e in errors] == ['upstream down'] * 3
+    assert flight.stats()['errors'] == 1
+    # The next call runs again instead of replaying the failure
+    assert flight.do('k', lambda: 'recovered') == 'recovered'
+
+
+def test_distinct_keys_run_independently():
+    flight = SingleFlight('test')
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('a', lambda: 2) == 2
+    with pytest.raises(ValueError):
+        flight.do('b', lambda: int('x'))
+    assert flight.stats()['coalesced'] == 0
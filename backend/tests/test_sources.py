@@ -0,0 +1,70 @@
+import sys
+import os
+import math
+import time
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sources
+
+
+def test_run_all_isolates_slow_and_failing_sources():
+    def fake_run_source(db, name):
+        if name == 'eonet':
+            time.sleep(0.5)
+        if name == 'firms':
+            raise sources.SourceConfigError('NASA_FIRMS_KEY missing from .env')
+        return {'written': 1, 'fetch_ms': 1.0, 'parse_ms': 1.0, 'write_ms': 1.0}
+
+    with patch.object(sources, 'run_source', side_effect=fake_run_source), \
+         patch.object(sources.SOURCES['eonet'], 'deadline', 0.1):
+        start = time.perf_counter()
+        report = sources.run_all(MagicMock())
+        elapsed = time.perf_counter() - start
+
+    assert report['usgs']['status'] == 'success'
+    assert report['gdacs']['written'] == 1
+    assert report['eonet']['status'] == 'timeout'
+    assert report['firms']['status'] == 'error'
+    assert elapsed < 0.5
+
+
+def test_parse_gdacs_filters_low_alert_levels():
+    data = {'features': [
+        {'properties': {'eventid': 1, 'eventtype': 'EQ', 'alertlevel': 'Green'},
+         'geometry': {'type': 'Point', 'coordinates': [10.0, 20.0]}},
+        {'properties': {'eventid': 2, 'eventtype': 'FL', 'alertlevel': 'Red'},
+         'geometry': {'type': 'Point', 'coordinates': [30.0, 40.0]}},
+    ]}
+
+    candidates = list(sources.parse_gdacs(data['features']))
+
+    assert [doc_id for doc_id, _ in candidates] == ['gdacs_FL_2']
+    assert candidates[0][1]['hazardType'] == 'flood'
+    assert candidates[0][1]['lat'] == 40.0
+
+
+def test_run_source_refuses_overlapping_runs():
+    source = sources.SOURCES['usgs']
+    with source.lock:
+        try:
+            sources.run_source(MagicMock(), 'usgs')
+            assert False, "expected SourceBusyError"
+        except sources.SourceBusyError:
+            pass
+
+
+def test_parse_nws_keeps_simplified_polygon_and_centroid():
+    ring = [[-123.0 + 0.5 * math.cos(i / 400 * 2 * math.pi), 44.5 + 0.5 * math.sin(i / 400 * 2 * math.pi)]
+            for i in range(400)]
+    features = [{'properties': {'id': 'w1', 'severity': 'Extreme', 'event': 'Tornado Warning'},
+                 'geometry': {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]}}]
+
+    (doc_id, payload), = sources.parse_nws(features)
+
+    assert doc_id == 'nws_w1'
+    assert abs(payload['lat'] - 44.5) < 0.01 and abs(payload['lng'] + 123.0) < 0.01
+    assert len(payload['geometry']['rings'][0]['coords']) <= 2 * (sources.NWS_MAX_VERTICES + 1)
+    assert payload['bbox']['max_lat'] > 44.9
+    assert payload['cover_cells']
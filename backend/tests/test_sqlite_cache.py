@@ -0,0 +1,107 @@
+import sys
+import os
+import multiprocessing
+import sqlite3
+from unittest.mock import patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask_caching import Cache
+from sqlite_cache import SQLiteCache
+
+
+def _write_from_other_process(path):
+    SQLiteCache(path).set('shared', {'severity': 'Critical'})
+
+
+def test_get_set_add_delete_and_expiry(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), default_timeout=60)
+    assert cache.get('missing') is None
+    assert cache.set('k', ['a', 1])
+    assert cache.get('k') == ['a', 1]
+    assert cache.add('k', 'other') is False
+    assert cache.has('k')
+
+    with patch('sqlite_cache.time.time', return_value=10 ** 12):
+        assert cache.get('k') is None  # expired
+        assert cache.add('k', 'fresh', timeout=0)
+    assert cache.get('k') == 'fresh'
+    assert cache.delete('k')
+    assert not cache.has('k')
+
+
+def test_evicts_least_recently_used_beyond_threshold(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), threshold=3)
+    for i, key in enumerate(['a', 'b', 'c']):
+        with patch('sqlite_cache.time.time', return_value=1000 + i):
+            cache.set(key, key, timeout=0)
+    with patch('sqlite_cache.time.time', return_value=1010):
+        cache.get('a')  # 'b' is now the least recently used
+        cache.set('d', 'd', timeout=0)
+
+    assert cache.get('b') is None
+    assert [cache.get(k) for k in 'acd'] == ['a', 'c', 'd']
+    stats = cache.stats()
+    assert stats['size'] == 3
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 4 and stats['misses'] == 1
+
+
+def test_reads_do_not_take_the_write_lock(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path)
+    cache.set('k', 'v', timeout=0)
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute('BEGIN IMMEDIATE')  # Another worker holds the write lock
+    try:
+        with patch('sqlite_cache.FLUSH_EVERY', 10 ** 6):
+            assert cache.get('k') == 'v'
+            assert cache.get('missing') is None
+            assert cache.has('k')
+    finally:
+        writer.execute('ROLLBACK')
+        writer.close()
+    stats = cache.stats()  # Buffered counts are written here
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_flask_default_path_is_the_instance_folder(tmp_path):
+    app = Flask(__name__, instance_path=str(tmp_path / 'instance'))
+    app.config['CACHE_TYPE'] = 'sqlite_cache.SQLiteCache'
+    Cache(app)
+    path = tmp_path / 'instance' / 'guardianly_cache.sqlite3'
+    assert path.exists()
+    assert oct(path.stat().st_mode & 0o777) == oct(0o600)
+
+
+def test_entries_and_counters_are_shared_across_processes(tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    cache = SQLiteCache(path)
+    process = multiprocessing.get_context('spawn').Process(target=_write_from_other_process, args=(path,))
+    process.start()
+    process.join(30)
+
+    assert process.exitcode == 0
+    assert cache.get('shared') == {'severity': 'Critical'}
+    assert cache.stats()['hits'] == 1
+
+
+def test_plugs_into_flask_caching_memoize(tmp_path):
+    app = Flask(__name__)
+    app.config.update(CACHE_TYPE='sqlite_cache.SQLiteCache', CACHE_SQLITE_PATH=str(tmp_path / 'cache.sqlite3'),
+                      CACHE_THRESHOLD=100)
+    cache = Cache(app)
+    calls = []
+
+    @cache.memoize(timeout=60)
+    def context_for(hazard):
+        calls.append(hazard)
+        return f'{hazard} playbook'
+
+    with app.app_context():
+        assert context_for('flood') == 'flood playbook'
+        assert context_for('flood') == 'flood playbook'
+    assert calls == ['flood']
+    assert isinstance(cache.cache, SQLiteCache)
+    assert cache.cache.threshold == 100
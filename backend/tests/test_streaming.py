@@ -0,0 +1,31 @@
+import sys
+import os
+import json
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from streaming import PartialJSONFields, sse_event
+
+
+def test_fields_are_reported_while_streaming():
+    completion = json.dumps({
+        'severity': 'High',
+        'message': 'Move to "high ground" now.\nAvoid the coast.',
+        'actions': ['Evacuate'],
+        'source': 'NWS',
+    })
+    fields = PartialJSONFields(['severity', 'message'])
+    updates = []
+    for i in range(0, len(completion), 3):  # Tiny chunks split escapes mid-way
+        updates.extend(fields.feed(completion[i:i + 3]))
+
+    severities = [(value, complete) for field, value, complete in updates if field == 'severity']
+    assert severities[-1] == ('High', True)
+    messages = [value for field, value, _ in updates if field == 'message']
+    assert all(later.startswith(earlier) for earlier, later in zip(messages, messages[1:]))
+    assert messages[-1] == 'Move to "high ground" now.\nAvoid the coast.'
+    assert json.loads(fields.text)['actions'] == ['Evacuate']
+
+
+def test_sse_event_frame():
+    assert sse_event('severity', {'severity': 'Low'}) == 'event: severity\ndata: {"severity": "Low"}\n\n'
@@ -0,0 +1,54 @@
+import sys
+import os
+import time
+from unittest.mock import MagicMock
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from token_cache import TokenCache
+
+
+def test_repeat_tokens_skip_verification_until_exp():
+    cache = TokenCache()
+    verifier = MagicMock(return_value={'uid': 'u1', 'exp': time.time() + 3600})
+
+    assert cache.verify('tok', verifier)['uid'] == 'u1'
+    assert cache.verify('tok', verifier)['uid'] == 'u1'
+    assert verifier.call_count == 1
+
+    expired = TokenCache()
+    expired_verifier = MagicMock(return_value={'uid': 'u1', 'exp': time.time() - 1})
+    expired.verify('tok', expired_verifier)
+    expired.verify('tok', expired_verifier)
+    assert expired_verifier.call_count == 2
+
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 1 and stats['hit_rate'] == 0.5
+
+
+def test_failed_verification_is_not_cached():
+    cache = TokenCache()
+    verifier = MagicMock(side_effect=[ValueError("Token expired"), {'uid': 'u1', 'exp': time.time() + 60}])
+
+    with pytest.raises(ValueError):
+        cache.verify('tok', verifier)
+    assert cache.verify('tok', verifier)['uid'] == 'u1'
+
+
+def test_lru_bound_and_revocation_mode():
+    cache = TokenCache(max_entries=2)
+    verifier = MagicMock(side_effect=lambda token: {'uid': token, 'exp': time.time() + 3600})
+    for token in ['a', 'b', 'a', 'c']:
+        cache.verify(token, verifier)
+    # 'b' was least recently used when 'c' arrived
+    cache.verify('b', verifier)
+    assert verifier.call_count == 4
+    assert cache.stats()['evictions'] >= 1
+
+    revoking = TokenCache(check_revoked=True, revocation_recheck=0)
+    strict = MagicMock(return_value={'uid': 'u1', 'exp': time.time() + 3600})
+    revoking.verify('tok', strict)
+    revoking.verify('tok', strict)
+    assert strict.call_count == 2
+    assert strict.call_args.kwargs == {'check_revoked': True}
@@ -0,0 +1,45 @@
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from upstream import UpstreamClient
+
+FEED = "https://earthquake.usgs.gov/earthquakes/feed/v1.0/summary/all_hour.geojson"
+
+
+def make_response(status_code, body=b'', headers=None):
+    response = MagicMock(status_code=status_code, content=body, headers=headers or {})
+    response.ok = status_code < 400
+    return response
+
+
+def test_conditional_get_replays_validators_only_after_commit():
+    client = UpstreamClient()
+    session = MagicMock()
+    client._session = MagicMock(return_value=session)
+    session.get.return_value = make_response(200, b'{"features": []}', {'ETag': '"abc"'})
+
+    client.get(FEED, source='usgs', conditional=True)
+    # Not committed yet: a failed ingest must not lead to a 304 next time
+    client.get(FEED, source='usgs', conditional=True)
+    assert 'If-None-Match' not in session.get.call_args.kwargs['headers']
+
+    client.commit('usgs')
+    session.get.return_value = make_response(304)
+    assert client.get(FEED, source='usgs', conditional=True) is None
+    assert session.get.call_args.kwargs['headers']['If-None-Match'] == '"abc"'
+
+    stats = client.stats()['usgs']
+    assert stats['requests'] == 3
+    assert stats['not_modified'] == 1
+    assert stats['bytes_saved'] == len(b'{"features": []}')
+    assert stats['not_modified_rate'] == round(1 / 3, 3)
+
+
+def test_sessions_are_pooled_per_host():
+    client = UpstreamClient()
+    first = client._session(FEED)
+    assert client._session("https://earthquake.usgs.gov/other.geojson") is first
+    assert client._session("https://api.weather.gov/alerts") is not first
@@ -0,0 +1,99 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sources
+from seen_ids import SeenIdRegistry
+from watermarks import VersionTracker, WatermarkStore
+
+
+def test_store_only_moves_forward_and_persists(tmp_path):
+    path = str(tmp_path / "marks.json")
+    store = WatermarkStore(path=path)
+    store.advance('usgs', 100.0)
+    store.advance('usgs', 50.0)
+    store.advance('usgs', None)
+    assert store.get('usgs') == 100.0
+    store.save()
+    assert WatermarkStore(path=path).get('usgs') == 100.0
+
+
+def test_tracker_records_highest_version():
+    tracker = VersionTracker()
+    items = list(tracker.observe([('a', {'version': 5.0}), ('b', {}), ('c', {'version': 9.0})]))
+    assert [doc_id for doc_id, _ in items] == ['a', 'b', 'c']
+    assert tracker.high == 9.0
+
+
+def test_seen_filter_lets_newer_versions_through(tmp_path):
+    seen = SeenIdRegistry(path=str(tmp_path / "seen.json"))
+    seen.mark('usgs', ['usgs_a', 'usgs_b'], {'usgs_a': 1.0})
+    assert seen.filter_unseen('usgs', ['usgs_a', 'usgs_b'], {'usgs_a': 1.0}) == []
+    assert seen.filter_unseen('usgs', ['usgs_a', 'usgs_b'], {'usgs_a': 2.0}) == ['usgs_a']
+    seen.save()
+    restored = SeenIdRegistry(path=str(tmp_path / "seen.json"))
+    assert restored.filter_unseen('usgs', ['usgs_a', 'usgs_b'], {'usgs_a': 1.0}) == []
+
+
+def _quake(eq_id, mag, updated_ms):
+    return {'id': eq_id, 'geometry': {'coordinates': [-122.0, 38.0, 5.0]},
+            'properties': {'mag': mag, 'place': 'Somewhere', 'url': 'u', 'time': updated_ms - 1000, 'updated': updated_ms}}
+
+
+def test_parse_usgs_skips_items_at_or_below_watermark():
+    features = [_quake('old', 3.0, 1_792_000_000_000), _quake('revised', 3.4, 1_792_000_600_000)]
+    candidates = list(sources.parse_usgs(features, since=1_792_000_300.0))
+    assert [doc_id for doc_id, _ in candidates] == ['usgs_revised']
+    assert candidates[0][1]['version'] == 1_792_000_600.0
+
+
+def test_eonet_keeps_full_lookback_for_late_published_events():
+    store = WatermarkStore()
+    store.advance('eonet', 1_700_000_000.0)
+    response = MagicMock()
+    with patch('sources.watermarks', store), patch('sources.upstream.get', return_value=response) as mock_get, \
+         patch('sources.stream_items', return_value=[]):
+        sources.fetch_eonet()
+        # Published after the last run, but observed three days before the watermark
+        late = {'id': 'EONET_1', 'title': 'Wildfire', 'categories': [{'id': 'wildfires'}],
+                'geometries': [{'date': '2023-11-11T22:13:20Z', 'coordinates': [-120.0, 40.0]}]}
+        parsed = list(sources.parse_eonet([late], since=sources.since('eonet')))
+    assert f'days={sources.EONET_MAX_DAYS}' in mock_get.call_args.args[0]
+    assert [doc_id for doc_id, _ in parsed] == ['eonet_EONET_1']
+
+
+def test_parse_nws_folds_updates_into_original_alert():
+    feature = {'properties': {'id': 'urn:update2', 'severity': 'Severe', 'event': 'Flood Warning',
+                              'sent': '2026-10-17T12:00:00Z',
+                              'references': [{'identifier': 'urn:update1', 'sent': '2026-10-17T10:00:00Z'},
+                                             {'identifier': 'urn:original', 'sent': '2026-10-17T08:00:00Z'}]},
+               'geometry': None}
+    [(doc_id, payload)] = list(sources.parse_nws([feature]))
+    assert doc_id == 'nws_urn:original'
+    assert payload['version'] == sources.parse_event_time('2026-10-17T12:00:00Z')
+
+
+def test_revisions_become_in_place_updates_and_advance_watermark(tmp_path):
+    db = MagicMock()
+    db.collection.return_value.document.side_effect = lambda doc_id: MagicMock(id=doc_id)
+    stored = MagicMock(id='usgs_revised', exists=True)
+    stored.to_dict.return_value = {'version': 1_792_000_000.0, 'title': 'Earthquake: M3.0'}
+    db.get_all.side_effect = lambda refs: [stored if r.id == 'usgs_revised' else MagicMock(id=r.id, exists=False)
+                                           for r in refs]
+
+    store = WatermarkStore()
+    with patch.object(sources, 'watermarks', store), \
+         patch.object(sources, 'seen_ids', SeenIdRegistry()), \
+         patch.object(sources.SOURCES['usgs'], 'fetch', return_value=[_quake('revised', 3.4, 1_792_000_600_000)]), \
+         patch.dict(os.environ, {'ALERT_RESOLUTION_ENABLED': '0'}):
+        stats = sources.run_source(db, 'usgs')
+
+    assert stats['written'] == 0
+    assert stats['updated'] == 1
+    assert store.get('usgs') == 1_792_000_600.0
+    write = db.batch.return_value.set.call_args
+    assert write.kwargs == {'merge': True}
+    assert write.args[1]['title'] == 'Earthquake: M3.4'
+    assert 'timestamp' not in write.args[1]
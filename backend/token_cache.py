@@ -0,0 +1,95 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# --- Verified Token Cache ---
+# auth.verify_id_token does a full RSA signature check (plus an occasional
+# certificate refresh) on every authenticated request. Polling clients send
+# the same ID token for up to an hour, so the decoded claims are cached in a
+# bounded LRU keyed by a SHA-256 of the token and dropped at the token's
+# `exp`. Failed verifications are never cached.
+#
+# TOKEN_CHECK_REVOKED=1 opts into revocation checks: tokens are verified with
+# check_revoked=True and cached claims are re-verified at least every
+# TOKEN_REVOCATION_RECHECK_SECONDS, bounding how long a revoked token works.
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_REVOCATION_RECHECK = 300
+
+
+class TokenCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, check_revoked=False,
+                 revocation_recheck=DEFAULT_REVOCATION_RECHECK):
+        self.max_entries = max_entries
+        self.check_revoked = check_revoked
+        self.revocation_recheck = revocation_recheck
+        self._entries = OrderedDict()  # token hash -> (claims, valid_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verifications = 0
+        self.verify_ms_total = 0.0
+
+    def verify(self, token, verifier):
+        """Return the token's claims, calling verifier(token, ...) only on a cache miss."""
+        key = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                claims, valid_until = entry
+                if now < valid_until:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return claims
+                del self._entries[key]
+            self.misses += 1
+
+        start = time.perf_counter()
+        if self.check_revoked:
+            claims = verifier(token, check_revoked=True)
+        else:
+            claims = verifier(token)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        valid_until = float(claims.get('exp', now))
+        if self.check_revoked:
+            valid_until = min(valid_until, now + self.revocation_recheck)
+
+        with self._lock:
+            self.verifications += 1
+            self.verify_ms_total += elapsed_ms
+            if valid_until > now:
+                self._entries[key] = (claims, valid_until)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'evictions': self.evictions,
+                'avg_verify_ms': round(self.verify_ms_total / self.verifications, 2) if self.verifications else 0.0,
+                'check_revoked': self.check_revoked,
+            }
+
+
+token_cache = TokenCache(
+    max_entries=int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)),
+    check_revoked=os.environ.get('TOKEN_CHECK_REVOKED') == '1',
+    revocation_recheck=int(os.environ.get('TOKEN_REVOCATION_RECHECK_SECONDS', DEFAULT_REVOCATION_RECHECK)),
+)
@@ -0,0 +1,116 @@
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+
+# --- Shared Upstream HTTP Client ---
+# One keep-alive requests.Session per upstream host, so repeat calls to USGS,
+# NWS, GDACS, EONET, FIRMS and Mapbox reuse their TCP/TLS connections instead
+# of opening a new one for every request.
+#
+# Sync feeds are fetched conditionally: the ETag / Last-Modified validators of
+# the last successfully ingested response are replayed as If-None-Match /
+# If-Modified-Since, and a 304 lets the caller skip parsing and Firestore
+# dedup entirely. Validators only become active once the caller confirms the
+# payload was ingested (commit()), so a failed write is never hidden by a 304.
+
+POOL_MAXSIZE = 8  # Matches the gunicorn thread count
+
+
+class UpstreamClient:
+    def __init__(self, pool_maxsize=POOL_MAXSIZE):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._validators = {}   # url -> {'etag', 'last_modified', 'size'}
+        self._pending = {}      # source -> (url, validators) awaiting commit()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _session(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._sessions[host] = session
+            return session
+
+    def _source_stats(self, source):
+        return self._stats.setdefault(source, {
+            'requests': 0,
+            'not_modified': 0,
+            'bytes_received': 0,
+            'bytes_saved': 0,
+        })
+
+    def get(self, url, source='other', conditional=False, **kwargs):
+        """
+        GET through the pooled session for the URL's host. With conditional=True
+        the stored validators are sent and None is returned on 304 Not Modified.
+        """
+        headers = dict(kwargs.pop('headers', None) or {})
+        if conditional:
+            with self._lock:
+                validators = self._validators.get(url, {})
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+
+        response = self._session(url).get(url, headers=headers, **kwargs)
+
+        with self._lock:
+            stats = self._source_stats(source)
+            stats['requests'] += 1
+            if conditional and response.status_code == 304:
+                stats['not_modified'] += 1
+                stats['bytes_saved'] += self._validators.get(url, {}).get('size', 0)
+                return None
+
+        if conditional and response.ok:
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'size': 0,  # Filled in by record_bytes() as the body is read
+            }
+            with self._lock:
+                if validators['etag'] or validators['last_modified']:
+                    self._pending[source] = (url, validators)
+                else:
+                    self._pending.pop(source, None)
+
+        if not kwargs.get('stream'):
+            self.record_bytes(source, len(response.content))
+        return response
+
+    def record_bytes(self, source, size):
+        """Count body bytes for a source; streamed responses report as they read."""
+        with self._lock:
+            self._source_stats(source)['bytes_received'] += size
+            pending = self._pending.get(source)
+            if pending:
+                pending[1]['size'] += size
+
+    def commit(self, source):
+        """Activate the validators of the source's last response once it has been ingested."""
+        with self._lock:
+            pending = self._pending.pop(source, None)
+            if pending:
+                url, validators = pending
+                self._validators[url] = validators
+
+    def stats(self):
+        with self._lock:
+            report = {}
+            for source, stats in self._stats.items():
+                report[source] = {
+                    **stats,
+                    'not_modified_rate': round(stats['not_modified'] / stats['requests'], 3) if stats['requests'] else 0.0,
+                }
+            return report
+
+
+upstream = UpstreamClient()
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+
+# --- Per-Source Sync Watermarks ---
+# Each source remembers the newest upstream version it has ingested (USGS
+# `updated`, GDACS `datemodified`, EONET's latest geometry date, NWS `sent`,
+# FIRMS acquisition time), as epoch seconds. Fetchers narrow their upstream
+# query with it where the API allows (USGS updatedafter, FIRMS day range;
+# EONET keeps its full lookback because it publishes late). Parsers skip items whose version is not newer than the
+# watermark minus the source's lag, before building any payload.
+# A watermark only moves forward, and only after a run's writes have been
+# committed. Set WATERMARKS_PATH to keep them across restarts.
+
+
+class WatermarkStore:
+    def __init__(self, path=None):
+        self.path = path
+        self._marks = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        if path:
+            self.load()
+
+    def get(self, source):
+        with self._lock:
+            return self._marks.get(source)
+
+    def advance(self, source, version):
+        """Raise the source's watermark to version; older versions are ignored."""
+        if version is None:
+            return
+        with self._lock:
+            current = self._marks.get(source)
+            if current is None or version > current:
+                self._marks[source] = version
+
+    def stats(self):
+        with self._lock:
+            return dict(self._marks)
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Watermarks not loaded from {self.path}: {e}")
+            return
+        with self._lock:
+            self._marks.update({source: float(value) for source, value in data.items()})
+
+    def save(self):
+        """Write the watermarks to WATERMARKS_PATH atomically. No-op without a path."""
+        if not self.path:
+            return
+        with self._lock:
+            data = dict(self._marks)
+        with self._save_lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+
+
+class VersionTracker:
+    """Passes candidates through while recording the highest payload 'version'."""
+
+    def __init__(self):
+        self.high = None
+
+    def observe(self, candidates):
+        for doc_id, payload in candidates:
+            version = payload.get('version')
+            if version is not None and (self.high is None or version > self.high):
+                self.high = version
+            yield doc_id, payload
+
+
+watermarks = WatermarkStore(path=os.environ.get('WATERMARKS_PATH'))